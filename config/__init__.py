@@ -1,7 +1,10 @@
 from pathlib import Path
 import os
-from groq import Groq
+import functools
+import threading
+from groq import Groq, AsyncGroq
 import redis
+import redis.asyncio
 from dotenv import load_dotenv, find_dotenv
 
 _ = load_dotenv(find_dotenv())
@@ -9,13 +12,52 @@ _ = load_dotenv(find_dotenv())
 BASE_DIR = Path(__file__).absolute().parent.parent
 
 PROMPT_DIR = BASE_DIR / "gen_ai" / "prompt" / "templates"
-client = Groq(
-    api_key=os.environ.get("GROQ_API_KEY")
-)
-
-redis_client = redis.Redis(
-    host=os.environ.get("REDIS_HOST"), 
-    port=int(os.environ.get("REDIS_PORT")),
-    # db=os.environ.get("REDIS_DB"),
-    password=os.environ.get("REDIS_PASSWORD")
-)
\ No newline at end of file
+
+
+def lazy(factory):
+    """
+    Turn a factory into an accessor that creates its resource on first call.
+
+    The resource is created once even when several threads ask for it at the same time,
+    and `accessor.initialized()` tells whether it exists yet.
+    """
+    lock = threading.Lock()
+    instance = []
+
+    @functools.wraps(factory)
+    def accessor():
+        if not instance:
+            with lock:
+                if not instance:
+                    instance.append(factory())
+        return instance[0]
+
+    accessor.initialized = lambda: bool(instance)
+    return accessor
+
+
+@lazy
+def get_groq_client() -> Groq:
+    return Groq(
+        api_key=os.environ.get("GROQ_API_KEY")
+    )
+
+
+@lazy
+def get_redis_client() -> redis.Redis:
+    # Imported here because config.redis_client reads the app config, which imports this package
+    from config.redis_client import build_redis_client
+    return build_redis_client()
+
+
+@lazy
+def get_async_groq_client() -> AsyncGroq:
+    return AsyncGroq(
+        api_key=os.environ.get("GROQ_API_KEY")
+    )
+
+
+@lazy
+def get_async_redis_client() -> redis.asyncio.Redis:
+    from config.redis_client import build_async_redis_client
+    return build_async_redis_client()
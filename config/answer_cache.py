@@ -0,0 +1,227 @@
+import json
+import base64
+import hashlib
+import threading
+import numpy as np
+from typing import Callable, Dict, List, NamedTuple, Union
+from config.config_helper import Configuration
+from config.lru_cache import LRUCache
+from config.redis_client import PipelineStep
+from config.logger import Logger
+
+logger = Logger(__name__)
+
+config = Configuration().get_config('answer_cache')
+
+
+class AnswerEntry(NamedTuple):
+    query_vector: np.ndarray
+    answer: str
+    generation: int
+
+
+def _encode(entry: AnswerEntry) -> str:
+    return json.dumps({
+        "vector": base64.b64encode(entry.query_vector.astype(np.float32).tobytes()).decode(),
+        "answer": entry.answer,
+        "generation": entry.generation,
+    })
+
+
+def _decode(entry: Union[str, bytes]) -> AnswerEntry:
+    entry = json.loads(entry)
+    return AnswerEntry(
+        np.frombuffer(base64.b64decode(entry["vector"]), dtype=np.float32),
+        entry["answer"],
+        entry["generation"]
+    )
+
+
+class InMemoryAnswerStore:
+    """
+    Answer entries held in this process, for tests and single-process deployments.
+    Keys are evicted least recently used first, and after `ttl_seconds`. Its steps send
+    nothing to Redis and run when the request's pipeline has been executed.
+    """
+    def __init__(self, max_keys: int, max_entries_per_key: int, ttl_seconds: float):
+        self.__keys = LRUCache(max_keys, ttl_seconds)
+        self.__max_entries_per_key = max_entries_per_key
+        self.__lock = threading.Lock()
+
+    def lookup_step(
+            self,
+            key: str,
+            guard_keys: List[str],
+            found: Callable[[List[AnswerEntry]], None]
+        ) -> PipelineStep:
+        return PipelineStep(lambda pipe: None, lambda results: found(list(self.__keys.get(key, ()))), 0, True)
+
+    def add(self, key: str, entry: AnswerEntry) -> None:
+        with self.__lock:
+            entries = [entry] + list(self.__keys.get(key, ()))
+            self.__keys.put(key, entries[:self.__max_entries_per_key])
+
+    def add_step(self, key: str, entry: AnswerEntry) -> PipelineStep:
+        return PipelineStep(lambda pipe: None, lambda results: self.add(key, entry), 0, True)
+
+
+class RedisAnswerStore:
+    """
+    Answer entries in Redis, shared by every server process.
+
+    Each key is a list of entries, newest first, capped with LTRIM, that expires
+    `ttl_seconds` after its last write; Redis' own maxmemory policy bounds the total
+    size. Entries are only sent back while none of the `guard_keys` exist, so the
+    follow-up turns of a conversation do not pay for reading them.
+    """
+    LOOKUP_SCRIPT = (
+        "for i = 2, #KEYS do "
+        "if redis.call('EXISTS', KEYS[i]) == 1 then return false end "
+        "end "
+        "return redis.call('LRANGE', KEYS[1], 0, -1)"
+    )
+
+    def __init__(self, max_entries_per_key: int, ttl_seconds: int):
+        self.__max_entries_per_key = max_entries_per_key
+        self.__ttl_seconds = ttl_seconds
+
+    def lookup_step(
+            self,
+            key: str,
+            guard_keys: List[str],
+            found: Callable[[List[AnswerEntry]], None]
+        ) -> PipelineStep:
+        def handle(results):
+            if results[0] is not None:
+                found([_decode(entry) for entry in results[0]])
+
+        return PipelineStep(
+            lambda pipe: pipe.eval(self.LOOKUP_SCRIPT, 1 + len(guard_keys), key, *guard_keys),
+            handle,
+            1,
+            True
+        )
+
+    def add_step(self, key: str, entry: AnswerEntry) -> PipelineStep:
+        def queue(pipe):
+            pipe.lpush(key, _encode(entry))
+            pipe.ltrim(key, 0, self.__max_entries_per_key - 1)
+            pipe.expire(key, self.__ttl_seconds)
+
+        return PipelineStep(queue, lambda results: None, 3, True)
+
+
+class AnswerLookup:
+    """
+    One request's use of the answer cache, run as steps of the request's Redis pipelines:
+    `read_steps` fetch the stored entries alongside the conversation history, and
+    `write_steps` store the generated answer alongside the new turns. The entries are
+    not fetched when any of `guard_keys` (the conversation's history) exists. Cache
+    errors are logged and treated as misses.
+    """
+    def __init__(self, cache: "SemanticAnswerCache", key: str, generation: int, guard_keys: List[str]):
+        self.__cache = cache
+        self.__key = key
+        self.__generation = generation
+        self.__entries = None
+        self.read_steps = [cache.store.lookup_step(key, guard_keys, self.__set_entries)]
+
+    def __set_entries(self, entries: List[AnswerEntry]) -> None:
+        self.__entries = entries
+
+    def answer(self, query_vector: np.ndarray) -> Union[str, None]:
+        if self.__entries is None:
+            return None
+        return self.__cache.best(self.__entries, self.__cache.normalize(query_vector), self.__generation)
+
+    def write_steps(self, query_vector: np.ndarray, answer: str) -> List[PipelineStep]:
+        if not answer:
+            return []
+        entry = AnswerEntry(self.__cache.normalize(query_vector), answer, self.__generation)
+        return [self.__cache.store.add_step(self.__key, entry)]
+
+
+class SemanticAnswerCache:
+    """
+    Reuse a generated answer for a paraphrase of an earlier question.
+
+    Answers are grouped under a key made of the collection, the compiled filter and the
+    ids of the retrieved chunks, so only questions that were answered from the same
+    context share a key. Every entry records the collection generation it was generated
+    at, and entries from an older generation are ignored, so any upsert into the
+    collection invalidates them. Within a key, the stored answer whose query embedding is
+    closest to the new one is returned when their cosine similarity reaches
+    `similarity_threshold`.
+    """
+    KEY_PREFIX = "answer_cache"
+
+    def __init__(
+            self,
+            store: Union[InMemoryAnswerStore, RedisAnswerStore],
+            similarity_threshold: float = config['similarity_threshold']
+        ):
+        self.store = store
+        self.__similarity_threshold = similarity_threshold
+        self.__lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, collection_name: str, query_filter: Union[str, None], chunk_ids: List[str]) -> str:
+        digest = hashlib.sha256(
+            json.dumps([collection_name, query_filter, sorted(chunk_ids)]).encode()
+        ).hexdigest()
+        return f"{self.KEY_PREFIX}:{digest}"
+
+    @staticmethod
+    def normalize(query_vector: np.ndarray) -> np.ndarray:
+        query_vector = np.asarray(query_vector, dtype=np.float32)
+        return query_vector / max(float(np.linalg.norm(query_vector)), 1e-12)
+
+    def lookup(self, key: str, generation: int, guard_keys: List[str] = ()) -> AnswerLookup:
+        """
+        :param key: The key from `key`.
+        :param generation: The collection generation the search results were read at.
+        :param guard_keys: Redis keys whose existence means the lookup is not needed.
+        """
+        return AnswerLookup(self, key, generation, list(guard_keys))
+
+    def best(self, entries: List[AnswerEntry], query_vector: np.ndarray, generation: int) -> Union[str, None]:
+        best_answer, best_similarity = None, self.__similarity_threshold
+        for entry in entries:
+            if entry.generation != generation or entry.query_vector.shape != query_vector.shape:
+                continue
+            similarity = float(np.dot(entry.query_vector, query_vector))
+            if similarity >= best_similarity:
+                best_answer, best_similarity = entry.answer, similarity
+        with self.__lock:
+            if best_answer is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return best_answer
+
+    def stats(self) -> Dict[str, float]:
+        with self.__lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+def build_answer_cache() -> Union[SemanticAnswerCache, None]:
+    """
+    Build the answer cache described by the `answer_cache` config, or None when disabled.
+    The "redis" backend stores answers in the Redis that holds the conversation history;
+    the "memory" backend keeps them in this process.
+    """
+    if not config['enabled']:
+        return None
+    if config['backend'] == "redis":
+        store = RedisAnswerStore(config['max_entries_per_key'], config['ttl_seconds'])
+    elif config['backend'] == "memory":
+        store = InMemoryAnswerStore(config['max_keys'], config['max_entries_per_key'], config['ttl_seconds'])
+    else:
+        raise ValueError(f"Unknown answer cache backend '{config['backend']}', expected 'redis' or 'memory'")
+    return SemanticAnswerCache(store)
@@ -0,0 +1,71 @@
+import threading
+import redis
+import redis.asyncio
+from typing import Union
+from config.logger import Logger
+
+logger = Logger(__name__)
+
+
+class CollectionGenerations:
+    """
+    Per-collection generation numbers, bumped whenever points are upserted.
+
+    Caches stamp their entries with the generation they were computed at and treat any
+    entry with an older stamp as stale. With a Redis client the counters are shared by
+    every server process; without one they are local to this process. The optional
+    async client serves `aget` on the grpc.aio server.
+    """
+    KEY_PREFIX = "collection_generation"
+
+    def __init__(
+            self,
+            redis_client: Union[redis.Redis, None] = None,
+            async_redis_client: Union[redis.asyncio.Redis, None] = None
+        ):
+        self.__redis_client = redis_client
+        self.__async_redis_client = async_redis_client
+        self.__local = {}
+        self.__lock = threading.Lock()
+
+    def __key(self, collection_name: str) -> str:
+        return f"{self.KEY_PREFIX}:{collection_name}"
+
+    def get(self, collection_name: str) -> Union[int, None]:
+        """
+        Current generation of a collection, or None when it cannot be determined.
+        """
+        if self.__redis_client is None:
+            with self.__lock:
+                return self.__local.get(collection_name, 0)
+        try:
+            generation = self.__redis_client.get(self.__key(collection_name))
+            return int(generation) if generation is not None else 0
+        except redis.RedisError as ex:
+            logger.warning(f"Could not read the generation of {collection_name}: {str(ex)}")
+            return None
+
+    async def aget(self, collection_name: str) -> Union[int, None]:
+        if self.__async_redis_client is None:
+            return self.get(collection_name)
+        try:
+            generation = await self.__async_redis_client.get(self.__key(collection_name))
+            return int(generation) if generation is not None else 0
+        except redis.RedisError as ex:
+            logger.warning(f"Could not read the generation of {collection_name}: {str(ex)}")
+            return None
+
+    def bump(self, collection_name: str) -> None:
+        """
+        Retire every cache entry of a collection. A Redis failure is raised: the upsert
+        has happened, so the caller must not carry on as if the caches were still valid.
+        """
+        if self.__redis_client is None:
+            with self.__lock:
+                self.__local[collection_name] = self.__local.get(collection_name, 0) + 1
+            return
+        try:
+            self.__redis_client.incr(self.__key(collection_name))
+        except redis.RedisError as ex:
+            logger.error(f"Could not bump the generation of {collection_name}: {str(ex)}")
+            raise
@@ -0,0 +1,164 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Iterable, Union
+from config import BASE_DIR
+from config.config_helper import Configuration
+from config.logger import Logger
+
+logger = Logger(__name__)
+
+config = Configuration().get_config('embedding_cache')
+
+
+class EmbeddingCache:
+    """
+    Persistent, content-addressed store of float32 embeddings backed by SQLite.
+
+    Entries are keyed by (model name, SHA-256 of the text), so re-ingesting a revised
+    paper or boilerplate repeated across PDFs skips the encoder. The database runs in
+    WAL mode with a busy timeout, which lets several server processes share one file.
+    Once it holds more than `max_entries` rows, the least recently used ones are evicted.
+    """
+    EVICTION_INTERVAL = 100
+
+    def __init__(
+            self,
+            path: Union[str, None] = None,
+            max_entries: int = config['max_entries'],
+            timeout_seconds: float = config['timeout_seconds']
+        ):
+        # EMBEDDING_CACHE_PATH overrides the configured path, e.g. to keep test runs apart
+        db_path = Path(path or os.environ.get("EMBEDDING_CACHE_PATH") or config['path'])
+        if not db_path.is_absolute():
+            db_path = BASE_DIR / db_path
+        os.makedirs(db_path.parent, exist_ok=True)
+
+        self.__path = str(db_path)
+        self.__max_entries = max_entries
+        self.__timeout_seconds = timeout_seconds
+        self.__local = threading.local()
+        self.__lock = threading.Lock()
+        self.__writes_since_eviction = 0
+        self.hits = 0
+        self.misses = 0
+
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model TEXT NOT NULL, "
+                "content_hash TEXT NOT NULL, "
+                "vector BLOB NOT NULL, "
+                "last_used REAL NOT NULL, "
+                "PRIMARY KEY (model, content_hash))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections cannot be shared between threads, so each thread opens its own
+        conn = getattr(self.__local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.__path, timeout=self.__timeout_seconds)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.__local.conn = conn
+        return conn
+
+    @staticmethod
+    def content_hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, model_name: str, texts: List[str]) -> Dict[int, np.ndarray]:
+        """
+        Look up the cached embeddings of a list of texts.
+
+        :param model_name: The embedding model the vectors were produced with.
+        :param texts: The texts to look up.
+        :return: A mapping of the index of every cached text to its embedding.
+        """
+        hashes = [self.content_hash(text) for text in texts]
+        found = {}
+        conn = self._connection()
+        unique_hashes = list(set(hashes))
+        for i in range(0, len(unique_hashes), 500):
+            batch = unique_hashes[i:i + 500]
+            rows = conn.execute(
+                f"SELECT content_hash, vector FROM embeddings WHERE model = ? "
+                f"AND content_hash IN ({','.join('?' * len(batch))})",
+                [model_name, *batch]
+            ).fetchall()
+            found.update({content_hash: np.frombuffer(vector, dtype=np.float32) for content_hash, vector in rows})
+
+        if found:
+            with conn:
+                conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND content_hash = ?",
+                    [(time.time(), model_name, content_hash) for content_hash in found]
+                )
+
+        results = {index: found[content_hash] for index, content_hash in enumerate(hashes) if content_hash in found}
+        with self.__lock:
+            self.hits += len(results)
+            self.misses += len(texts) - len(results)
+        return results
+
+    def put_many(self, model_name: str, texts: Iterable[str], vectors: np.ndarray) -> None:
+        """
+        Store the embeddings of a list of texts.
+
+        :param model_name: The embedding model the vectors were produced with.
+        :param texts: The texts that were encoded.
+        :param vectors: Their embeddings, one row per text.
+        """
+        now = time.time()
+        rows = [
+            (model_name, self.content_hash(text), np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for text, vector in zip(texts, vectors)
+        ]
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, content_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                rows
+            )
+
+        with self.__lock:
+            self.__writes_since_eviction += 1
+            should_evict = self.__writes_since_eviction >= self.EVICTION_INTERVAL
+            if should_evict:
+                self.__writes_since_eviction = 0
+        if should_evict:
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        Remove the least recently used entries above `max_entries`.
+
+        :return: The number of entries removed.
+        """
+        conn = self._connection()
+        with conn:
+            (count,) = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            excess = count - self.__max_entries
+            if excess <= 0:
+                return 0
+            conn.execute(
+                "DELETE FROM embeddings WHERE rowid IN "
+                "(SELECT rowid FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                (excess,)
+            )
+        logger.info(f"Evicted {excess} embeddings from the cache")
+        return excess
+
+    def stats(self) -> Dict[str, float]:
+        with self.__lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
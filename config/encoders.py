@@ -0,0 +1,213 @@
+import os
+import json
+import tempfile
+import numpy as np
+from pathlib import Path
+from typing import List, Union
+from sentence_transformers import SentenceTransformer
+from config import BASE_DIR
+from config.config_helper import Configuration
+from config.logger import Logger
+
+logger = Logger(__name__)
+
+config = Configuration().get_config('encoder')
+
+ENCODER_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+class TorchEncoder:
+    """
+    The sentence-transformers model in fp32 PyTorch.
+    """
+    def __init__(self, model_name: str):
+        self.__model = SentenceTransformer(model_name)
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32) -> np.ndarray:
+        return self.__model.encode(sentences, batch_size=batch_size)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.__model.get_sentence_embedding_dimension()
+
+    @property
+    def tokenizer(self):
+        return self.__model.tokenizer
+
+    @property
+    def max_seq_length(self) -> int:
+        return self.__model.max_seq_length
+
+
+def _pool(hidden_states: np.ndarray, attention_mask: np.ndarray, pooling_mode: str, normalize: bool) -> np.ndarray:
+    """
+    Pool token states into sentence embeddings the way the sentence-transformers model does.
+    """
+    if pooling_mode == "cls":
+        embeddings = hidden_states[:, 0]
+    elif pooling_mode == "mean":
+        mask = attention_mask[..., None].astype(hidden_states.dtype)
+        embeddings = (hidden_states * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+    else:
+        raise ValueError(f"Unsupported pooling mode '{pooling_mode}'")
+    if normalize:
+        embeddings = embeddings / np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+    return embeddings.astype(np.float32)
+
+
+class OnnxEncoder:
+    """
+    The sentence-transformers model exported to ONNX and run with ONNX Runtime on CPU.
+
+    The transformer is exported once per model into `export_dir`, together with its
+    tokenizer and pooling settings, and reused by later processes. With `quantize`, the
+    export is converted to int8 weights with ONNX Runtime dynamic quantization.
+    """
+    FP32_FILE = "model.onnx"
+    INT8_FILE = "model_int8.onnx"
+    CONFIG_FILE = "encoder_config.json"
+
+    def __init__(
+            self,
+            model_name: str,
+            quantize: bool = False,
+            export_dir: str = config['onnx_dir'],
+            intra_op_threads: int = config['intra_op_threads']
+        ):
+        try:
+            import onnxruntime
+            from transformers import AutoTokenizer
+        except ImportError as ex:
+            raise ImportError("The ONNX encoder backends need the 'onnxruntime' and 'onnx' packages") from ex
+
+        model_dir = Path(export_dir)
+        if not model_dir.is_absolute():
+            model_dir = BASE_DIR / model_dir
+        model_dir = model_dir / model_name.replace("/", "__")
+        model_path = model_dir / (self.INT8_FILE if quantize else self.FP32_FILE)
+        if not model_path.exists():
+            self.export(model_name, model_dir, quantize)
+
+        with open(model_dir / self.CONFIG_FILE) as file:
+            encoder_config = json.load(file)
+        self.__pooling_mode = encoder_config["pooling_mode"]
+        self.__normalize = encoder_config["normalize"]
+        self.__max_seq_length = encoder_config["max_seq_length"]
+        self.__dimension = encoder_config["dimension"]
+        self.__tokenizer = AutoTokenizer.from_pretrained(str(model_dir))
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.__session = onnxruntime.InferenceSession(
+            str(model_path), options, providers=["CPUExecutionProvider"])
+        self.__input_names = {model_input.name for model_input in self.__session.get_inputs()}
+        logger.info(f"Loaded ONNX encoder '{model_path}'")
+
+    @classmethod
+    def export(cls, model_name: str, model_dir: Path, quantize: bool) -> None:
+        """
+        Export the transformer of a sentence-transformers model to ONNX, and optionally
+        quantize it. Files are written under temporary names and renamed into place, so
+        concurrent processes never load a partial export.
+        """
+        os.makedirs(model_dir, exist_ok=True)
+        fp32_path = model_dir / cls.FP32_FILE
+        if not fp32_path.exists():
+            import torch
+            from sentence_transformers.models import Normalize, Pooling
+
+            logger.info(f"Exporting '{model_name}' to ONNX...")
+            model = SentenceTransformer(model_name, device="cpu")
+            pooling = next(module for module in model if isinstance(module, Pooling))
+            pooling_config = pooling.get_config_dict()
+            if pooling_config.get("pooling_mode_cls_token"):
+                pooling_mode = "cls"
+            elif pooling_config.get("pooling_mode_mean_tokens"):
+                pooling_mode = "mean"
+            else:
+                raise ValueError(f"'{model_name}' uses a pooling mode the ONNX encoder does not support")
+
+            inputs = model.tokenizer(["An example sentence"], return_tensors="pt")
+            input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in inputs]
+            dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+            dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+            transformer = model[0].auto_model.eval()
+            with tempfile.NamedTemporaryFile(dir=model_dir, suffix=".onnx", delete=False) as file:
+                tmp_path = file.name
+            with torch.no_grad():
+                torch.onnx.export(
+                    transformer,
+                    tuple(inputs[name] for name in input_names),
+                    tmp_path,
+                    input_names=input_names,
+                    output_names=["last_hidden_state"],
+                    dynamic_axes=dynamic_axes,
+                    opset_version=14,
+                )
+            model.tokenizer.save_pretrained(str(model_dir))
+            with open(model_dir / cls.CONFIG_FILE, "w") as file:
+                json.dump({
+                    "pooling_mode": pooling_mode,
+                    "normalize": any(isinstance(module, Normalize) for module in model),
+                    "max_seq_length": model.max_seq_length,
+                    "dimension": model.get_sentence_embedding_dimension(),
+                }, file)
+            os.replace(tmp_path, fp32_path)
+
+        if quantize and not (model_dir / cls.INT8_FILE).exists():
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            logger.info(f"Quantizing '{model_name}' to int8...")
+            with tempfile.NamedTemporaryFile(dir=model_dir, suffix=".onnx", delete=False) as file:
+                tmp_path = file.name
+            quantize_dynamic(str(fp32_path), tmp_path, weight_type=QuantType.QInt8)
+            os.replace(tmp_path, model_dir / cls.INT8_FILE)
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32) -> np.ndarray:
+        if isinstance(sentences, str):
+            return self.encode([sentences], batch_size)[0]
+        embeddings = np.empty((len(sentences), self.__dimension), dtype=np.float32)
+        for start in range(0, len(sentences), batch_size):
+            batch = list(sentences[start:start + batch_size])
+            inputs = self.__tokenizer(
+                batch,
+                padding=True,
+                truncation=True,
+                max_length=self.__max_seq_length,
+                return_tensors="np"
+            )
+            feed = {name: inputs[name].astype(np.int64) for name in self.__input_names}
+            (hidden_states,) = self.__session.run(["last_hidden_state"], feed)
+            embeddings[start:start + len(batch)] = _pool(
+                hidden_states, inputs["attention_mask"], self.__pooling_mode, self.__normalize)
+        return embeddings
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.__dimension
+
+    @property
+    def tokenizer(self):
+        return self.__tokenizer
+
+    @property
+    def max_seq_length(self) -> int:
+        return self.__max_seq_length
+
+
+def load_encoder(model_name: str, backend: str):
+    """
+    Load the embedding model with one of the `ENCODER_BACKENDS`.
+
+    :param model_name: The sentence-transformers model name.
+    :param backend: "torch" for fp32 PyTorch, "onnx" for ONNX Runtime, or "onnx-int8"
+        for ONNX Runtime with dynamically quantized int8 weights.
+    :return: An encoder with `encode` and `get_sentence_embedding_dimension`.
+    """
+    if backend == "torch":
+        return TorchEncoder(model_name)
+    if backend == "onnx":
+        return OnnxEncoder(model_name)
+    if backend == "onnx-int8":
+        return OnnxEncoder(model_name, quantize=True)
+    raise ValueError(f"Unknown encoder backend '{backend}', expected one of {', '.join(ENCODER_BACKENDS)}")
@@ -0,0 +1,81 @@
+from typing import Dict, List, NamedTuple, Union
+from qdrant_client.models import (
+    Filter,
+    FieldCondition,
+    MatchAny,
+    MatchExcept,
+    MatchValue,
+    Range,
+    DatetimeRange
+)
+from schemas.search_schemas import FieldFilter, FilterGroup, MatchAnyOrInterval
+from config.config_helper import Configuration
+from config.lru_cache import LRUCache
+
+config = Configuration().get_config('filter_cache')
+
+
+class CompiledFilter(NamedTuple):
+    query_filter: Filter
+    # Canonical JSON of the filter, for cache keys
+    key: str
+
+
+class FilterCompiler:
+    """
+    Compile `FilterGroup`s into Qdrant filters on the metadata payload.
+
+    Compiled filters are memoized by value, so a filter that many requests repeat is
+    built and serialized once. They are shared between requests and must not be mutated.
+    """
+    def __init__(self, payload_key: str, max_size: int = config['max_size']):
+        self.__payload_key = payload_key
+        self.__cache = LRUCache(max_size)
+
+    def __field(self, field: FieldFilter) -> Union[FieldCondition, Filter]:
+        key = f"{self.__payload_key}.{field.key}"
+        conditions = []
+        if field.any:
+            conditions.append(FieldCondition(key=key, match=MatchAny(any=list(field.any))))
+        if field.all:
+            conditions.extend(FieldCondition(key=key, match=MatchValue(value=value)) for value in field.all)
+        if field.none:
+            conditions.append(FieldCondition(key=key, match=MatchExcept(**{"except": list(field.none)})))
+        if field.range is not None:
+            conditions.append(FieldCondition(key=key, range=Range(**field.range.model_dump())))
+        if field.datetime_range is not None:
+            conditions.append(FieldCondition(key=key, range=DatetimeRange(**field.datetime_range.model_dump())))
+        return conditions[0] if len(conditions) == 1 else Filter(must=conditions)
+
+    def __clauses(self, clauses) -> Union[List[Union[FieldCondition, Filter]], None]:
+        if not clauses:
+            return None
+        return [self.__field(clause) if isinstance(clause, FieldFilter) else self.__group(clause) for clause in clauses]
+
+    def __group(self, group: FilterGroup) -> Filter:
+        return Filter(
+            must=self.__clauses(group.must),
+            should=self.__clauses(group.should),
+            must_not=self.__clauses(group.must_not)
+        )
+
+    def compile(self, filters: Union[FilterGroup, Dict[str, MatchAnyOrInterval], None]) -> Union[CompiledFilter, None]:
+        """
+        :param filters: A filter group, or the legacy per-field filters.
+        :return: The Qdrant filter and its cache key, or None when nothing is filtered.
+        """
+        if filters is None:
+            return None
+        if isinstance(filters, dict):
+            filters = FilterGroup.from_fields(filters)
+        if not (filters.must or filters.should or filters.must_not):
+            return None
+        compiled = self.__cache.get(filters)
+        if compiled is None:
+            query_filter = self.__group(filters)
+            compiled = CompiledFilter(query_filter, query_filter.model_dump_json(exclude_none=True))
+            self.__cache.put(filters, compiled)
+        return compiled
+
+    def stats(self) -> Dict[str, float]:
+        return self.__cache.stats()
@@ -0,0 +1,62 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Union
+
+
+class LRUCache:
+    """
+    Thread-safe in-process LRU cache with an optional time-to-live.
+
+    Entries older than `ttl_seconds` are treated as misses; once `max_size` entries
+    are held, the least recently used one is dropped on insert.
+    """
+    _MISSING = object()
+
+    def __init__(self, max_size: int, ttl_seconds: Union[float, None] = None):
+        self.__max_size = max_size
+        self.__ttl_seconds = ttl_seconds
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self.__lock:
+            entry = self.__entries.get(key, self._MISSING)
+            if entry is not self._MISSING:
+                value, stored_at = entry
+                if self.__ttl_seconds is None or time.monotonic() - stored_at < self.__ttl_seconds:
+                    self.__entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self.__entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.__max_size <= 0:
+            return
+        with self.__lock:
+            self.__entries[key] = (value, time.monotonic())
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.__max_size:
+                self.__entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__entries.clear()
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return len(self.__entries)
+
+    def stats(self) -> Dict[str, float]:
+        with self.__lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.__entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,106 @@
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Sequence
+from config.logger import Logger
+
+logger = Logger(__name__)
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent single-item calls into batched calls on one worker thread.
+
+    Callers `submit` an item and get a Future. The worker takes the oldest pending item,
+    adds whatever else is already queued, and waits at most `max_wait_ms` for more until
+    `max_batch_size` items are collected, then runs `process_batch` once and resolves every
+    caller's future. A lone request therefore pays at most `max_wait_ms` extra latency,
+    while requests arriving during a batch are served together by the next one.
+    """
+    def __init__(
+            self,
+            process_batch: Callable[[List[Any]], Sequence[Any]],
+            max_batch_size: int,
+            max_wait_ms: float,
+            name: str = "micro-batcher"
+        ):
+        self.__process_batch = process_batch
+        self.__max_batch_size = max_batch_size
+        self.__max_wait_seconds = max_wait_ms / 1000
+        self.__name = name
+        self.__pending = queue.Queue()
+        self.__lock = threading.Lock()
+        self.__worker = None
+        self.__batches = 0
+        self.__items = 0
+        self.__largest_batch = 0
+        self.__queue_wait_seconds = 0.0
+
+    def __ensure_worker(self) -> None:
+        # Started on first use, so that importing the module does not spawn a thread
+        with self.__lock:
+            if self.__worker is None:
+                self.__worker = threading.Thread(target=self.__run, name=self.__name, daemon=True)
+                self.__worker.start()
+
+    def submit(self, item: Any) -> Future:
+        self.__ensure_worker()
+        future = Future()
+        self.__pending.put((item, future, time.perf_counter()))
+        return future
+
+    def __collect(self) -> List[tuple]:
+        batch = [self.__pending.get()]
+        deadline = time.perf_counter() + self.__max_wait_seconds
+        while len(batch) < self.__max_batch_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                if timeout > 0:
+                    batch.append(self.__pending.get(timeout=timeout))
+                else:
+                    batch.append(self.__pending.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def __run(self) -> None:
+        while True:
+            batch = [
+                (item, future, submitted_at) for item, future, submitted_at in self.__collect()
+                if future.set_running_or_notify_cancel()
+            ]
+            if not batch:
+                continue
+            started = time.perf_counter()
+            try:
+                results = self.__process_batch([item for item, _, _ in batch])
+            except BaseException as ex:
+                for _, future, _ in batch:
+                    future.set_exception(ex)
+            else:
+                if len(results) != len(batch):
+                    # zip() would leave the unmatched callers waiting forever
+                    ex = RuntimeError(f"{self.__name} returned {len(results)} results for a batch of {len(batch)}")
+                    logger.error(str(ex))
+                    for _, future, _ in batch:
+                        future.set_exception(ex)
+                else:
+                    for (_, future, _), result in zip(batch, results):
+                        future.set_result(result)
+            with self.__lock:
+                self.__batches += 1
+                self.__items += len(batch)
+                self.__largest_batch = max(self.__largest_batch, len(batch))
+                self.__queue_wait_seconds += sum(started - submitted_at for _, _, submitted_at in batch)
+
+    def stats(self) -> Dict[str, float]:
+        with self.__lock:
+            return {
+                "queue_depth": self.__pending.qsize(),
+                "batches": self.__batches,
+                "items": self.__items,
+                "mean_batch_size": self.__items / self.__batches if self.__batches else 0.0,
+                "max_batch_size": self.__largest_batch,
+                "mean_queue_wait_ms": 1000 * self.__queue_wait_seconds / self.__items if self.__items else 0.0,
+            }
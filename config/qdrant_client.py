@@ -1,4 +1,4 @@
-from qdrant_client import QdrantClient
+from qdrant_client import QdrantClient, AsyncQdrantClient
 from qdrant_client import models
 from qdrant_client.models import (
     UpdateStatus,
@@ -6,22 +6,32 @@ from qdrant_client.models import (
     Distance,
     PointStruct,
     Filter, 
-    FieldCondition, 
-    MatchAny,
     MatchValue,
-    DatetimeRange,
     Batch
 )
-from schemas.search_schemas import MatchAnyOrInterval
-from typing import List, Dict, Any
+from schemas.search_schemas import FilterGroup, MatchAnyOrInterval
+from typing import List, Dict, Any, Iterable, Iterator, Tuple, Union
 from tenacity import retry, stop_after_attempt, wait_fixed
 from langchain.docstore.document import Document
 import numpy as np
+import queue
+import asyncio
+import threading
+from concurrent import futures
+from itertools import islice
 from datetime import datetime as dt
 from tqdm import tqdm
 import os
-from sentence_transformers import SentenceTransformer
+from config.encoders import load_encoder
 from config.config_helper import Configuration
+from config.embedding_cache import EmbeddingCache
+from config.lru_cache import LRUCache
+from config.micro_batcher import MicroBatcher
+from config.collection_generations import CollectionGenerations
+from config.filter_compiler import FilterCompiler
+from config.search_params import HYBRID_SEARCH_MODE, build_search_params, reciprocal_rank_fusion
+from config.sparse_encoder import SparseEncoder
+from config import lazy, get_redis_client, get_async_redis_client
 from config.logger import Logger
 from dotenv import load_dotenv, find_dotenv
 
@@ -29,6 +39,37 @@ _ = load_dotenv(find_dotenv())
 logger = Logger(__name__)
 
 config = Configuration().get_config('qdrant')
+embedding_cache_config = Configuration().get_config('embedding_cache')
+query_cache_config = Configuration().get_config('query_cache')
+search_cache_config = Configuration().get_config('search_cache')
+query_batching_config = Configuration().get_config('query_batching')
+sparse_config = Configuration().get_config('sparse')
+
+
+def _batched(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    items = iter(items)
+    while batch := list(islice(items, size)):
+        yield batch
+
+
+def _token_budget_batches(lengths: List[int], token_budget: int, max_batch_size: int) -> Iterator[List[int]]:
+    """
+    Group item indices into batches of similar length.
+
+    Items are taken longest first, and a batch is closed once adding the next item would
+    pad more than `token_budget` tokens (batch size times its longest item) or exceed
+    `max_batch_size` items. An item longer than the budget gets a batch of its own.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+    batch = []
+    for i in order:
+        # Items arrive longest first, so the first item sets the padded length of the batch
+        if batch and ((len(batch) + 1) * lengths[batch[0]] > token_budget or len(batch) == max_batch_size):
+            yield batch
+            batch = []
+        batch.append(i)
+    if batch:
+        yield batch
 
 class QdrantVectorDB:
     CONTENT_KEY = "page_content"
@@ -37,6 +78,7 @@ class QdrantVectorDB:
     def __init__(
             self,
             model_name: str = config['model_name'],
+            encoder_backend: str = config['encoder_backend'],
             collection_name: str = config['collection_name'],
             max_attempts: int = config['max_attempts'], 
             wait_time_seconds: int = config['wait_time_seconds'],
@@ -45,88 +87,222 @@ class QdrantVectorDB:
             batch_size: int = config['batch_size'],
             limit: int = config['limit'],
             is_batch: bool = config['is_batch'],
+            queue_depth: int = config['queue_depth'],
+            use_embedding_cache: bool = embedding_cache_config['enabled'],
+            query_cache_size: int = query_cache_config['max_size'],
+            query_cache_ttl_seconds: float = query_cache_config['ttl_seconds'],
+            shared_generations: bool = search_cache_config['shared_generations'],
+            encode_workers: int = config['encode_workers'],
+            encode_token_budget: int = config['encode_token_budget'],
+            encode_max_batch_size: int = config['encode_max_batch_size'],
+            query_batching: bool = query_batching_config['enabled'],
+            query_batch_size: int = query_batching_config['max_batch_size'],
+            query_batch_wait_ms: float = query_batching_config['max_wait_ms'],
+            query_batch_timeout_seconds: float = query_batching_config['result_timeout_seconds'],
+            search_mode: str = config['search_mode'],
+            hnsw_ef: int = config['hnsw_ef'],
+            oversampling: float = config['oversampling'],
+            rescore: bool = config['rescore'],
+            sparse_enabled: bool = sparse_config['enabled'],
+            sparse_vector_name: str = sparse_config['vector_name'],
+            hybrid_dense_mode: str = sparse_config['dense_search_mode'],
+            hybrid_candidates: int = sparse_config['candidates'],
+            rrf_k: int = sparse_config['rrf_k'],
             content_payload_key: str = CONTENT_KEY,
             metadata_payload_key: str = METADATA_KEY
         ):
-        self.__model_name = model_name
+        # Vectors of other backends differ slightly from the fp32 ones, so they are cached apart
+        self.__model_name = model_name if encoder_backend == "torch" else f"{model_name}:{encoder_backend}"
         self.__collection_name = collection_name
         self.__client = QdrantClient(
             url=os.environ.get("QDRANT_URL"), 
             api_key=os.environ.get("QDRANT_API_KEY")
         )
-        self.__sentence_model = SentenceTransformer(self.__model_name)
+        self.__sentence_model = load_encoder(model_name, encoder_backend)
+        self.__embedding_cache = EmbeddingCache() if use_embedding_cache else None
+        self.__query_cache = LRUCache(query_cache_size, query_cache_ttl_seconds)
+        self.__generations = CollectionGenerations(
+            get_redis_client() if shared_generations else None,
+            get_async_redis_client() if shared_generations else None
+        )
+        self.__async_client = None
+        self.__query_batcher = MicroBatcher(
+            self.__encode_query_batch,
+            max_batch_size=query_batch_size,
+            max_wait_ms=query_batch_wait_ms,
+            name="query-encoder"
+        ) if query_batching else None
+        self.__query_batch_timeout_seconds = query_batch_timeout_seconds
+        self.__encode_executor = futures.ThreadPoolExecutor(
+            max_workers=encode_workers,
+            thread_name_prefix="encode"
+        )
         self.__is_batch = is_batch
         self.__limit = limit
+        # Fail at startup rather than on the first search
+        build_search_params(hybrid_dense_mode, hnsw_ef, oversampling, rescore)
+        if search_mode != HYBRID_SEARCH_MODE:
+            build_search_params(search_mode, hnsw_ef, oversampling, rescore)
+        elif not sparse_enabled:
+            raise ValueError("The hybrid search mode needs sparse vectors to be enabled")
+        self.__search_mode = search_mode
+        self.__sparse_encoder = SparseEncoder() if sparse_enabled else None
+        self.__sparse_vector_name = sparse_vector_name
+        self.__hybrid_dense_mode = hybrid_dense_mode
+        self.__hybrid_candidates = hybrid_candidates
+        self.__rrf_k = rrf_k
+        # Cleared by `get_or_create_collection` for collections created without sparse vectors
+        self.__sparse_available = sparse_enabled
+        self.__hnsw_ef = hnsw_ef
+        self.__oversampling = oversampling
+        self.__rescore = rescore
         self.__default_segment_number = default_segment_number
         self.__indexing_threshold = indexing_threshold
         self.__batch_size = batch_size
+        self.__queue_depth = queue_depth
+        self.__encode_token_budget = encode_token_budget
+        self.__encode_max_batch_size = encode_max_batch_size
         self.__max_attempts = max_attempts
         self.__wait_time_seconds = wait_time_seconds
         self.__content_payload_key = content_payload_key
         self.__metadata_payload_key = metadata_payload_key
+        self.__filter_compiler = FilterCompiler(metadata_payload_key)
 
-    def encode(self, docs: List[Dict[str, Any]]) -> np.ndarray:
+    def token_lengths(self, texts: List[str]) -> List[int]:
         """
-        Encode a list of documents in batches using the Ember model.
+        Tokenized length of every text, capped at the model's maximum sequence length.
+        Falls back to a character estimate for encoders without a tokenizer.
+        """
+        tokenizer = getattr(self.__sentence_model, "tokenizer", None)
+        max_seq_length = getattr(self.__sentence_model, "max_seq_length", None) or 512
+        if tokenizer is None:
+            return [min(len(text) // 4 + 2, max_seq_length) for text in texts]
+        input_ids = tokenizer(
+            texts,
+            truncation=True,
+            max_length=max_seq_length,
+            return_attention_mask=False,
+            return_token_type_ids=False
+        )["input_ids"]
+        return [len(ids) for ids in input_ids]
 
-        :param docs: The list of documents to encode.
-        :return: The embeddings for the documents as a NumPy array.
+    def encode(self, docs: List[str], progress=None) -> np.ndarray:
         """
-        @retry(stop=stop_after_attempt(self.__max_attempts), wait=wait_fixed(self.__wait_time_seconds))
-        def encode_batch(batch_docs: List[str]) -> np.ndarray:
-            try:
-                return self.__sentence_model.encode([doc.page_content for doc in batch_docs])
-            except Exception:
-                return self.__sentence_model.encode([doc for doc in batch_docs])
+        Encode a list of documents in length-bucketed, token-budgeted batches.
 
-        embeddings = []
-        try:
-            for i in tqdm(range(0, len(docs), self.__batch_size)):
-                batch_docs = docs[i:i+self.__batch_size]
-                batch_embeddings = encode_batch(batch_docs)
-                embeddings.append(batch_embeddings)
+        Documents found in the embedding cache are not sent to the encoder, and newly
+        computed embeddings are added to it. The rest are sorted by tokenized length and
+        grouped so that no batch pads more than `encode_token_budget` tokens, so short
+        chunks are not padded to the length of long ones. Every batch is written into one
+        preallocated array in the original order.
 
-            embeddings = np.concatenate(embeddings)
+        :param docs: The list of document texts to encode.
+        :param progress: Optional ingestion job notified after every batch.
+        :return: The float32 embeddings for the documents, one row per document.
+        """
+        dimension = self.__sentence_model.get_sentence_embedding_dimension()
+        embeddings = np.empty((len(docs), dimension), dtype=np.float32)
 
-            if self.__sentence_model.get_sentence_embedding_dimension() == embeddings.shape[1]:
-                return embeddings
-            else:
-                raise logger.error(f"The embeddings have an incorrect dimension of {embeddings.shape[1]}.")
+        cached = {}
+        if self.__embedding_cache is not None:
+            cached = self.__embedding_cache.get_many(self.__model_name, docs)
+            for i, vector in cached.items():
+                embeddings[i] = vector
+            if progress is not None and cached:
+                progress.add_chunks_embedded(len(cached))
+        missing = [i for i in range(len(docs)) if i not in cached]
+        if not missing:
+            return embeddings
+
+        lengths = self.token_lengths([docs[i] for i in missing])
+        try:
+            for batch in tqdm(list(_token_budget_batches(lengths, self.__encode_token_budget, self.__encode_max_batch_size))):
+                indices = [missing[j] for j in batch]
+                batch_docs = [docs[i] for i in indices]
+                batch_embeddings = self.__sentence_model.encode(batch_docs, batch_size=len(batch_docs))
+                if batch_embeddings.shape[1] != dimension:
+                    raise ValueError(f"The embeddings have an incorrect dimension of {batch_embeddings.shape[1]}.")
+                embeddings[indices] = batch_embeddings
+                if self.__embedding_cache is not None:
+                    self.__embedding_cache.put_many(self.__model_name, batch_docs, embeddings[indices])
+                if progress is not None:
+                    progress.add_chunks_embedded(len(batch_docs))
+                    progress.raise_if_cancelled()
         except Exception as ex:
-            raise logger.error(f"Attempt failed. Retrying Batch... Error: {str(ex)}")
+            logger.error(f"Encoding failed. Error: {str(ex)}")
+            raise
 
-        
-    def generate_points(self, docs: List[Document]) -> List[Dict[str, Any]]:
+        return embeddings
+
+    def generate_points(self, docs: List[Document], progress=None) -> List[Dict[str, Any]]:
         """
         Generate a list of points by encoding the documents using the Ember model and combining the embeddings with the metadata.
 
         :param docs: The list of documents to encode.
+        :param progress: Optional ingestion job notified as batches are embedded.
         :return: A list of points with the embeddings and metadata.
         """
         # Encode the documents in batches
-        embeddings = self.encode([doc.page_content for doc in docs])
+        embeddings = self.encode([doc.page_content for doc in docs], progress)
         logger.info("Embedding Completed")
 
-        # Combine the embeddings with the metadata
+        # Combine the embeddings with the metadata, plus the BM25 vector of hybrid collections
+        if self.__sparse_available:
+            vectors = [
+                {"": content_embedding, self.__sparse_vector_name: self.__sparse_encoder.encode_document(doc.page_content)}
+                for doc, content_embedding in zip(docs, embeddings)
+            ]
+        else:
+            vectors = embeddings
         points_list = [
             {
                 "id": doc.metadata["_id"],
-                "vector": content_embedding,
+                "vector": vector,
                 "payload": {
                     self.__metadata_payload_key: doc.metadata,
                     self.__content_payload_key: doc.page_content,
                 },
             }
-            for (doc, content_embedding) in zip(docs, embeddings)
+            for (doc, vector) in zip(docs, vectors)
         ]
         logger.info("Generating points")
 
         return points_list
 
+    @property
+    def collection_name(self) -> str:
+        return self.__collection_name
+
+    @property
+    def limit(self) -> int:
+        return self.__limit
+
+    def collection_generation(self) -> Union[int, None]:
+        """
+        Generation of the collection, bumped by every upsert; None if unavailable.
+        """
+        return self.__generations.get(self.__collection_name)
+
+    async def acollection_generation(self) -> Union[int, None]:
+        return await self.__generations.aget(self.__collection_name)
+
+    def embedding_cache_stats(self) -> Dict[str, float]:
+        if self.__embedding_cache is None:
+            return {}
+        return self.__embedding_cache.stats()
+
     def get_or_create_collection(self):
         try:
-            self.__client.get_collection(collection_name=self.__collection_name)
+            collection = self.__client.get_collection(collection_name=self.__collection_name)
             logger.info(f"Collection '{self.__collection_name}' already exists----- Using {self.__collection_name} collection.")
+            if self.__sparse_encoder is not None:
+                sparse_vectors = collection.config.params.sparse_vectors or {}
+                self.__sparse_available = self.__sparse_vector_name in sparse_vectors
+                if not self.__sparse_available:
+                    logger.warning(
+                        f"Collection '{self.__collection_name}' has no '{self.__sparse_vector_name}' sparse vector; "
+                        "only dense vectors are stored and hybrid search is unavailable."
+                    )
             
         except Exception:
             is_created = self.__client.create_collection(
@@ -141,19 +317,25 @@ class QdrantVectorDB:
                 ),
                 quantization_config=models.BinaryQuantization(
                     binary=models.BinaryQuantizationConfig(always_ram=True),
+                ),
+                sparse_vectors_config=(
+                    {self.__sparse_vector_name: models.SparseVectorParams(modifier=models.Modifier.IDF)}
+                    if self.__sparse_encoder is not None else None
                 )
             )
             
+            self.__sparse_available = self.__sparse_encoder is not None
             if is_created:
                 logger.info(f"Collection '{self.__collection_name}' does not exist. Creating {self.__collection_name} collection.")
             else:
                 logger.error(f"{self.__collection_name}' Collection was not created.")
 
-    def upsert_points(self, points_list: List[Dict[str, Any]]) -> None:
+    def upsert_points(self, points_list: List[Dict[str, Any]], progress=None) -> None:
         """
         Upsert a list of points into the specified collection with retry.
 
         :param points_list: The list of points to upsert.
+        :param progress: Optional ingestion job notified after every batch.
         """
         @retry(stop=stop_after_attempt(self.__max_attempts), wait=wait_fixed(self.__wait_time_seconds))
         def upsert_batch(batch_data: List[Dict[str, Any]]) -> None:
@@ -164,7 +346,13 @@ class QdrantVectorDB:
             """
             try:
                 batch_ids = [point['id'] for point in batch_data]
-                batch_vectors = [point['vector'] for point in batch_data]
+                if isinstance(batch_data[0]['vector'], dict):
+                    batch_vectors = {
+                        name: [point['vector'][name] for point in batch_data]
+                        for name in batch_data[0]['vector']
+                    }
+                else:
+                    batch_vectors = [point['vector'] for point in batch_data]
                 batch_payloads = [point['payload'] for point in batch_data]
 
                 upserted = self.__client.upsert(
@@ -191,69 +379,220 @@ class QdrantVectorDB:
                 upserted = self.__client.upsert(collection_name=self.__collection_name, points=points)
                 return upserted
             except Exception as ex:
-                raise logger.error(f"Attempt failed. Retrying... {str(ex)}")
+                logger.error(f"Attempt failed. Retrying... {str(ex)}")
+                raise
         
         if self.__is_batch:
             for i in tqdm(range(0, len(points_list), self.__batch_size)):
+                if progress is not None:
+                    progress.raise_if_cancelled()
                 batch_data = points_list[i:i+self.__batch_size]
                 upserted = upsert_batch(batch_data)
+                self.__generations.bump(self.__collection_name)
                 if upserted.status == UpdateStatus.COMPLETED:
                     logger.info("Records inserted successfully.")
+                if progress is not None:
+                    progress.add_points_upserted(len(batch_data))
         else:
             upserted = upsert(points_list)
+            self.__generations.bump(self.__collection_name)
             if upserted.status == UpdateStatus.COMPLETED:
                 logger.info("Records inserted successfully.")
+            if progress is not None:
+                progress.add_points_upserted(len(points_list))
     
-    def refine(self, filters: Dict[str, MatchAnyOrInterval] = None):
-        if filters is None:
-            filter_obj = None
-            return filter_obj
-        else:
-            filter_conds = []
-            for field, value in filters.items():
-                if value.any is not None:
-                    filter_conds.append(FieldCondition(key=f"{self.__metadata_payload_key}.{field}", match=MatchAny(any=value.any)))
-                elif any([value.gt, value.gte, value.lt, value.lte]):
-                    gt_value = value.gt or value.gte
-                    lt_value = value.lt or value.lte
-                    filter_conds.append(
-                        FieldCondition(
-                            key=field,
-                            range=DatetimeRange(
-                                gt=gt_value,
-                                gte=(value.gte if gt_value == value.gte else None),
-                                lt=lt_value,
-                                lte=(value.lte if lt_value == value.lte else None),
-                            ),
-                        )
-                    )
-            filter_obj = Filter(must=filter_conds)
+    def refine(self, filters: Union[FilterGroup, Dict[str, MatchAnyOrInterval], None] = None) -> Union[Filter, None]:
+        """
+        Qdrant filter on the chunk metadata, from a filter group or the legacy per-field
+        filters; None when nothing is filtered.
+        """
+        compiled = self.__filter_compiler.compile(filters)
+        return compiled.query_filter if compiled is not None else None
 
-            return filter_obj
-        
-    def search(self, query, filters: Dict[str, MatchAnyOrInterval] = None):
-        query_vector = self.__sentence_model.encode(query)
-        query_filter = self.refine(filters)
+    def filter_key(self, filters: Union[FilterGroup, Dict[str, MatchAnyOrInterval], None] = None) -> Union[str, None]:
+        """
+        Canonical JSON of the compiled filter, for cache keys.
+        """
+        compiled = self.__filter_compiler.compile(filters)
+        return compiled.key if compiled is not None else None
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        return " ".join(query.split())
+
+    def __encode_query_batch(self, queries: List[str]) -> np.ndarray:
+        return np.asarray(self.__sentence_model.encode(queries, batch_size=len(queries)), dtype=np.float32)
+
+    def __cache_query_vector(self, key, query_vector: np.ndarray) -> np.ndarray:
+        query_vector = np.array(query_vector, dtype=np.float32)
+        query_vector.setflags(write=False)
+        self.__query_cache.put(key, query_vector)
+        return query_vector
+
+    def encode_query(self, query: str) -> np.ndarray:
+        """
+        Encode a search query, reusing the vector of a recently seen identical query.
+
+        With query batching enabled, the encode is handed to the shared micro-batcher, so
+        queries from concurrent requests are encoded together in one forward pass.
+
+        :param query: The query text.
+        :return: The read-only query embedding.
+        """
+        key = (self.__model_name, self.normalize_query(query))
+        query_vector = self.__query_cache.get(key)
+        if query_vector is not None:
+            return query_vector
+        if self.__query_batcher is not None:
+            future = self.__query_batcher.submit(key[1])
+            try:
+                return self.__cache_query_vector(key, future.result(timeout=self.__query_batch_timeout_seconds))
+            except futures.TimeoutError:
+                # Not encoded yet; drop it from the batcher's queue
+                future.cancel()
+                raise
+        return self.__cache_query_vector(key, self.__sentence_model.encode(key[1]))
+
+    async def aencode_query(self, query: str) -> np.ndarray:
+        """
+        `encode_query` for the event loop: awaits the micro-batcher instead of holding a thread.
+        """
+        key = (self.__model_name, self.normalize_query(query))
+        query_vector = self.__query_cache.get(key)
+        if query_vector is not None:
+            return query_vector
+        if self.__query_batcher is not None:
+            query_vector = await asyncio.wait_for(
+                asyncio.wrap_future(self.__query_batcher.submit(key[1])),
+                self.__query_batch_timeout_seconds
+            )
+            return self.__cache_query_vector(key, query_vector)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.__encode_executor, self.encode_query, query)
+
+    def query_encoder_stats(self) -> Dict[str, float]:
+        if self.__query_batcher is None:
+            return {}
+        return self.__query_batcher.stats()
+
+    def encode_queries(self, queries: List[str]) -> List[np.ndarray]:
+        """
+        Encode several search queries with a single encoder call. Queries already in the
+        query cache are not re-encoded, and duplicates in the batch are encoded once.
+
+        :param queries: The query texts.
+        :return: The read-only query embeddings, in the order of `queries`.
+        """
+        keys = [(self.__model_name, self.normalize_query(query)) for query in queries]
+        vectors = {}
+        for key in keys:
+            if key not in vectors:
+                vectors[key] = self.__query_cache.get(key)
+        misses = [key for key, vector in vectors.items() if vector is None]
+        if misses:
+            encoded = np.asarray(self.__sentence_model.encode([key[1] for key in misses]), dtype=np.float32)
+            for key, row in zip(misses, encoded):
+                query_vector = row.copy()
+                query_vector.setflags(write=False)
+                self.__query_cache.put(key, query_vector)
+                vectors[key] = query_vector
+        return [vectors[key] for key in keys]
+
+    def query_cache_stats(self) -> Dict[str, float]:
+        return self.__query_cache.stats()
 
-        hits = self.__client.search(
+    def is_hybrid(self, search_mode: Union[str, None] = None) -> bool:
+        return (search_mode or self.__search_mode) == HYBRID_SEARCH_MODE
+
+    def search_params(self, search_mode: Union[str, None] = None, hnsw_ef: Union[int, None] = None) -> models.SearchParams:
+        """
+        Search parameters of a search mode, falling back to the configured mode and `hnsw_ef`.
+        The hybrid mode uses the parameters of its dense search.
+        """
+        if self.is_hybrid(search_mode):
+            search_mode = self.__hybrid_dense_mode
+        return build_search_params(
+            search_mode or self.__search_mode,
+            hnsw_ef or self.__hnsw_ef,
+            self.__oversampling,
+            self.__rescore
+        )
+
+    def search_kwargs(
+            self,
+            query_vector: np.ndarray,
+            query_filter: Union[Filter, None],
+            search_mode: Union[str, None] = None,
+            hnsw_ef: Union[int, None] = None,
+            limit: Union[int, None] = None
+        ) -> Dict[str, Any]:
+        return dict(
             collection_name= self.__collection_name,
             query_vector= query_vector,
             query_filter= query_filter,
             with_payload= True,
             with_vectors= False,
-            limit= self.__limit,
-            search_params=models.SearchParams(
-                    quantization=models.QuantizationSearchParams(
-                        ignore=False,
-                        rescore=False,
-                        oversampling=2.0,
-                    ),
-                    exact=True,
-                )
+            limit= limit or self.__limit,
+            search_params=self.search_params(search_mode, hnsw_ef)
         )
 
+    def search_requests(
+            self,
+            query_vector: np.ndarray,
+            lexical_query: str,
+            query_filter: Union[Filter, None],
+            limit: Union[int, None] = None,
+            search_mode: Union[str, None] = None,
+            hnsw_ef: Union[int, None] = None
+        ) -> List[models.SearchRequest]:
+        """
+        The Qdrant requests of one query: a dense search, plus a BM25 search in hybrid mode.
+        Both searches of a hybrid query fetch at least `hybrid_candidates` hits for fusion.
+        """
+        limit = limit or self.__limit
+        if not self.is_hybrid(search_mode):
+            return [
+                models.SearchRequest(
+                    vector=query_vector.tolist(),
+                    filter=query_filter,
+                    limit=limit,
+                    with_payload=True,
+                    with_vector=False,
+                    params=self.search_params(search_mode, hnsw_ef),
+                )
+            ]
+        if self.__sparse_encoder is None:
+            raise ValueError("The hybrid search mode needs sparse vectors to be enabled")
+        candidates = max(limit, self.__hybrid_candidates)
+        return [
+            models.SearchRequest(
+                vector=query_vector.tolist(),
+                filter=query_filter,
+                limit=candidates,
+                with_payload=True,
+                with_vector=False,
+                params=self.search_params(search_mode, hnsw_ef),
+            ),
+            models.SearchRequest(
+                vector=models.NamedSparseVector(
+                    name=self.__sparse_vector_name,
+                    vector=self.__sparse_encoder.encode_query(lexical_query),
+                ),
+                filter=query_filter,
+                limit=candidates,
+                with_payload=True,
+                with_vector=False,
+            ),
+        ]
+
+    def fuse(self, rankings, limit: Union[int, None] = None):
+        if len(rankings) == 1:
+            return rankings[0]
+        return reciprocal_rank_fusion(rankings, self.__rrf_k, limit or self.__limit)
+
+    def to_documents(self, hits) -> List[Document]:
         # Convert the search results to a list of Document objects
-        results = [
+        return [
             Document(
                 page_content=hit.payload[self.__content_payload_key],
                 metadata=hit.payload[self.__metadata_payload_key],
@@ -261,12 +600,158 @@ class QdrantVectorDB:
             for hit in hits
         ]
 
-        return results
+    def search(
+            self,
+            query,
+            filters: Dict[str, MatchAnyOrInterval] = None,
+            search_mode: Union[str, None] = None,
+            hnsw_ef: Union[int, None] = None,
+            lexical_query: Union[str, None] = None,
+            limit: Union[int, None] = None
+        ):
+        """
+        Search the collection. In hybrid mode the dense and BM25 searches are sent in one
+        batch and fused with reciprocal-rank fusion; `lexical_query` is the query text
+        normalized like the chunk text, and defaults to `query`.
+        """
+        query_vector = self.encode_query(query)
+        query_filter = self.refine(filters)
+
+        if self.is_hybrid(search_mode):
+            requests = self.search_requests(query_vector, lexical_query or query, query_filter, limit, search_mode, hnsw_ef)
+            hits = self.fuse(self.__client.search_batch(collection_name=self.__collection_name, requests=requests), limit)
+        else:
+            hits = self.__client.search(**self.search_kwargs(query_vector, query_filter, search_mode, hnsw_ef, limit))
+
+        return self.to_documents(hits)
 
-    def run(self, docs: List[Document]):
+    def search_batch(
+            self,
+            queries: List[Tuple[str, Union[Dict[str, MatchAnyOrInterval], None], Union[int, None]]],
+            search_mode: Union[str, None] = None,
+            hnsw_ef: Union[int, None] = None,
+            lexical_queries: Union[List[str], None] = None
+        ):
+        """
+        Run several searches with one encoder call and one Qdrant round trip.
+
+        :param queries: (query, filters, limit) triples; a limit of None uses the default limit.
+        :param search_mode: Search mode of every query; defaults to the configured mode.
+        :param hnsw_ef: HNSW candidate list size; defaults to the configured value.
+        :param lexical_queries: Normalized query texts for the BM25 half of hybrid searches.
+        :return: One list of documents per query, in the order of `queries`.
+        """
+        if not queries:
+            return []
+        lexical_queries = lexical_queries or [query for query, _, _ in queries]
+        query_vectors = self.encode_queries([query for query, _, _ in queries])
+        requests, spans = [], []
+        for query_vector, lexical_query, (_, filters, limit) in zip(query_vectors, lexical_queries, queries):
+            query_requests = self.search_requests(
+                query_vector, lexical_query, self.refine(filters), limit, search_mode, hnsw_ef)
+            spans.append((len(requests), len(requests) + len(query_requests), limit))
+            requests.extend(query_requests)
+
+        batch_hits = self.__client.search_batch(collection_name=self.__collection_name, requests=requests)
+
+        return [self.to_documents(self.fuse(batch_hits[start:stop], limit)) for start, stop, limit in spans]
+
+    def _get_async_client(self) -> AsyncQdrantClient:
+        # Created on first use so that it binds to the running event loop
+        if self.__async_client is None:
+            self.__async_client = AsyncQdrantClient(
+                url=os.environ.get("QDRANT_URL"), 
+                api_key=os.environ.get("QDRANT_API_KEY")
+            )
+        return self.__async_client
+
+    async def asearch(
+            self,
+            query,
+            filters: Dict[str, MatchAnyOrInterval] = None,
+            search_mode: Union[str, None] = None,
+            hnsw_ef: Union[int, None] = None,
+            lexical_query: Union[str, None] = None,
+            limit: Union[int, None] = None
+        ):
+        """
+        Non-blocking search for the grpc.aio server.
+
+        The CPU-bound query encode runs on the query micro-batcher (or the encode executor)
+        while the event loop keeps serving other calls, and Qdrant is queried through
+        AsyncQdrantClient.
+        """
+        query_vector = await self.aencode_query(query)
+        query_filter = self.refine(filters)
+
+        if self.is_hybrid(search_mode):
+            requests = self.search_requests(query_vector, lexical_query or query, query_filter, limit, search_mode, hnsw_ef)
+            hits = self.fuse(await self._get_async_client().search_batch(collection_name=self.__collection_name, requests=requests), limit)
+        else:
+            hits = await self._get_async_client().search(**self.search_kwargs(query_vector, query_filter, search_mode, hnsw_ef, limit))
+
+        return self.to_documents(hits)
+
+    def run(self, docs: Iterable[Document], progress=None):
+        """
+        Embed and upsert a stream of documents batch by batch.
+
+        The stream is read in windows of `encode_max_batch_size` chunks, each encoded in
+        token-budgeted batches on the calling thread while a background thread upserts the
+        previous windows in `batch_size` requests, so encoding and network I/O overlap. At
+        most `queue_depth` encoded windows wait for upsert, which bounds memory whatever
+        the size of the stream.
+
+        :param docs: The documents to embed, as a list or a lazy iterable.
+        :param progress: Optional ingestion job receiving stage and batch progress.
+        """
         self.get_or_create_collection()
-        points_list = self.generate_points(docs)
-        self.upsert_points(points_list)
+        if progress is not None:
+            progress.set_stage("embedding")
+
+        point_batches = queue.Queue(maxsize=self.__queue_depth)
+        upsert_errors = []
+
+        def upsert_worker():
+            while True:
+                points_list = point_batches.get()
+                if points_list is None:
+                    return
+                # Keep draining after a failure so the producer never blocks on a full queue
+                if upsert_errors:
+                    continue
+                try:
+                    self.upsert_points(points_list, progress)
+                except BaseException as ex:
+                    upsert_errors.append(ex)
+
+        worker = threading.Thread(target=upsert_worker, name="qdrant-upsert", daemon=True)
+        worker.start()
+        try:
+            # The upsert batch size is a network setting; encode windows are sized for the encoder
+            for batch_docs in _batched(docs, self.__encode_max_batch_size):
+                if upsert_errors:
+                    break
+                point_batches.put(self.generate_points(batch_docs, progress))
+            if progress is not None:
+                progress.set_stage("upserting")
+        finally:
+            point_batches.put(None)
+            worker.join()
+
+        if upsert_errors:
+            raise upsert_errors[0]
+        if self.__embedding_cache is not None:
+            logger.info(f"Embedding cache stats: {self.embedding_cache_stats()}")
+
+    def warm_up(self) -> None:
+        """
+        Open the Qdrant connection and run one encode, so the first request does not pay for either.
+        """
+        self.__client.get_collections()
+        self.__sentence_model.encode(["warm up"], batch_size=1)
 
 
-vector_db = QdrantVectorDB()
\ No newline at end of file
+@lazy
+def get_vector_db() -> QdrantVectorDB:
+    return QdrantVectorDB()
\ No newline at end of file
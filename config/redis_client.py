@@ -0,0 +1,175 @@
+import os
+import time
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, List, NamedTuple, Sequence
+import redis
+import redis.asyncio
+import redis.client
+import redis.asyncio.client
+from config.config_helper import Configuration
+from config.logger import Logger
+
+logger = Logger(__name__)
+
+config = Configuration().get_config('redis')
+
+
+class RedisLatency:
+    """
+    Per-command Redis latency, shared by the clients of a process.
+
+    A pipeline is recorded once, as "PIPELINE", since it costs one round trip whatever
+    it holds. Percentiles are computed over the last `window` calls of each command.
+    """
+    def __init__(self, window: int = 1024):
+        self.__window = window
+        self.__samples = {}
+        self.__counts = {}
+        self.__lock = threading.Lock()
+
+    def record(self, command: str, seconds: float) -> None:
+        with self.__lock:
+            if command not in self.__samples:
+                self.__samples[command] = deque(maxlen=self.__window)
+                self.__counts[command] = 0
+            self.__samples[command].append(seconds)
+            self.__counts[command] += 1
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self.__lock:
+            stats = {}
+            for command, samples in self.__samples.items():
+                ordered = sorted(samples)
+                stats[command] = {
+                    "calls": self.__counts[command],
+                    "p50_ms": 1000 * ordered[len(ordered) // 2],
+                    "p99_ms": 1000 * ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))],
+                    "max_ms": 1000 * ordered[-1],
+                }
+            return stats
+
+
+latency = RedisLatency()
+
+
+class InstrumentedPipeline(redis.client.Pipeline):
+    def execute(self, raise_on_error=True):
+        started = time.perf_counter()
+        try:
+            return super().execute(raise_on_error)
+        finally:
+            latency.record("PIPELINE", time.perf_counter() - started)
+
+
+class InstrumentedRedis(redis.Redis):
+    """
+    redis.Redis that records the latency of every command and pipeline.
+    """
+    def execute_command(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            return super().execute_command(*args, **options)
+        finally:
+            latency.record(str(args[0]).upper(), time.perf_counter() - started)
+
+    def pipeline(self, transaction=True, shard_hint=None) -> InstrumentedPipeline:
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+class AsyncInstrumentedPipeline(redis.asyncio.client.Pipeline):
+    async def execute(self, raise_on_error: bool = True):
+        started = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            latency.record("PIPELINE", time.perf_counter() - started)
+
+
+class AsyncInstrumentedRedis(redis.asyncio.Redis):
+    async def execute_command(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            latency.record(str(args[0]).upper(), time.perf_counter() - started)
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> AsyncInstrumentedPipeline:
+        return AsyncInstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+def pool_kwargs() -> Dict[str, Any]:
+    """
+    Connection settings of the `redis` config section, shared by the sync and async pools.
+    When every connection is in use, callers wait up to `pool_timeout_seconds` for one
+    instead of opening more, so bursts queue rather than churn connections.
+    """
+    return dict(
+        host=os.environ.get("REDIS_HOST"),
+        port=int(os.environ.get("REDIS_PORT")),
+        password=os.environ.get("REDIS_PASSWORD"),
+        max_connections=config['max_connections'],
+        timeout=config['pool_timeout_seconds'],
+        socket_timeout=config['socket_timeout_seconds'],
+        socket_connect_timeout=config['connect_timeout_seconds'],
+        socket_keepalive=True,
+        health_check_interval=config['health_check_interval_seconds'],
+        retry_on_timeout=config['retry_on_timeout'],
+    )
+
+
+def build_redis_client() -> InstrumentedRedis:
+    return InstrumentedRedis(connection_pool=redis.BlockingConnectionPool(**pool_kwargs()))
+
+
+def build_async_redis_client() -> AsyncInstrumentedRedis:
+    return AsyncInstrumentedRedis(connection_pool=redis.asyncio.BlockingConnectionPool(**pool_kwargs()))
+
+
+class PipelineStep(NamedTuple):
+    """
+    Commands a component adds to a shared pipeline, and the callback that receives
+    their `size` results, in order. When an `optional` step fails (e.g. a cache read
+    hits WRONGTYPE), the error is logged and its callback is skipped; the other steps
+    of the pipeline are unaffected. A failing required step raises the error.
+    """
+    queue: Callable[[Any], None]
+    handle: Callable[[List[Any]], None]
+    size: int
+    optional: bool = False
+
+
+def _dispatch(steps: Sequence[PipelineStep], results: List[Any]) -> None:
+    offset = 0
+    error = None
+    for step in steps:
+        step_results = results[offset:offset + step.size]
+        offset += step.size
+        step_error = next((result for result in step_results if isinstance(result, Exception)), None)
+        if step_error is None:
+            step.handle(step_results)
+        elif step.optional:
+            logger.warning(f"Skipping a failed optional Redis pipeline step: {str(step_error)}")
+        elif error is None:
+            error = step_error
+    if error is not None:
+        raise error
+
+
+def run_pipeline(redis_client: redis.Redis, steps: Sequence[PipelineStep], transaction: bool = False) -> None:
+    """
+    Send the commands of several components to Redis in one round trip.
+    """
+    pipe = redis_client.pipeline(transaction=transaction)
+    for step in steps:
+        step.queue(pipe)
+    results = pipe.execute(raise_on_error=False) if any(step.size for step in steps) else []
+    _dispatch(steps, results)
+
+
+async def arun_pipeline(redis_client: redis.asyncio.Redis, steps: Sequence[PipelineStep], transaction: bool = False) -> None:
+    pipe = redis_client.pipeline(transaction=transaction)
+    for step in steps:
+        step.queue(pipe)
+    results = await pipe.execute(raise_on_error=False) if any(step.size for step in steps) else []
+    _dispatch(steps, results)
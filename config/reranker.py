@@ -0,0 +1,97 @@
+import time
+import threading
+from typing import List, Tuple, Union
+from langchain.docstore.document import Document
+from sentence_transformers import CrossEncoder
+from config.config_helper import Configuration
+from config.lru_cache import LRUCache
+from config.logger import Logger
+
+logger = Logger(__name__)
+
+config = Configuration().get_config('rerank')
+
+
+class CrossEncoderReranker:
+    """
+    Rerank search hits with a local cross-encoder.
+
+    All (query, chunk) pairs of a request are scored in one batched `predict` call, and
+    scores are cached by query and chunk `_id`, so repeated questions over the same
+    chunks skip the model. The cost of a pair is tracked as a moving average; when the
+    uncached pairs are not expected to fit in the remaining latency budget, the hits are
+    returned in their original order instead.
+    """
+    LATENCY_SMOOTHING = 0.2
+
+    def __init__(
+            self,
+            model_name: str = config['model_name'],
+            batch_size: int = config['batch_size'],
+            cache_size: int = config['cache_size'],
+            cache_ttl_seconds: float = config['cache_ttl_seconds']
+        ):
+        self.__model_name = model_name
+        self.__model = CrossEncoder(model_name)
+        self.__batch_size = batch_size
+        self.__score_cache = LRUCache(cache_size, cache_ttl_seconds)
+        self.__lock = threading.Lock()
+        self.__seconds_per_pair = None
+        logger.info(f"Loaded cross-encoder '{model_name}'")
+
+    def __key(self, query: str, doc: Document) -> Tuple[str, str, str]:
+        return (self.__model_name, " ".join(query.split()), doc.metadata.get("_id") or doc.page_content)
+
+    def estimated_seconds(self, pairs: int) -> float:
+        with self.__lock:
+            return pairs * self.__seconds_per_pair if self.__seconds_per_pair is not None else 0.0
+
+    def __record_latency(self, seconds: float, pairs: int) -> None:
+        with self.__lock:
+            per_pair = seconds / pairs
+            if self.__seconds_per_pair is None:
+                self.__seconds_per_pair = per_pair
+            else:
+                self.__seconds_per_pair += self.LATENCY_SMOOTHING * (per_pair - self.__seconds_per_pair)
+
+    def rerank(
+            self,
+            query: str,
+            docs: List[Document],
+            top_k: int,
+            budget_seconds: Union[float, None] = None
+        ) -> Tuple[List[Document], bool]:
+        """
+        Order documents by cross-encoder relevance to the query.
+
+        :param query: The search query.
+        :param docs: The candidate documents, in retrieval order.
+        :param top_k: The number of documents to keep.
+        :param budget_seconds: Time left for reranking; None for no limit.
+        :return: The top `top_k` documents, and whether they were reranked.
+        """
+        if not docs:
+            return docs, True
+        keys = [self.__key(query, doc) for doc in docs]
+        scores = [self.__score_cache.get(key) for key in keys]
+        missing = [i for i, score in enumerate(scores) if score is None]
+
+        if missing:
+            if budget_seconds is not None and self.estimated_seconds(len(missing)) > budget_seconds:
+                logger.warning(f"Skipping rerank: {len(missing)} pairs do not fit in {budget_seconds * 1000:.0f} ms")
+                return docs[:top_k], False
+            started = time.perf_counter()
+            predicted = self.__model.predict(
+                [(query, docs[i].page_content) for i in missing],
+                batch_size=self.__batch_size
+            )
+            self.__record_latency(time.perf_counter() - started, len(missing))
+            for i, score in zip(missing, predicted):
+                scores[i] = float(score)
+                self.__score_cache.put(keys[i], scores[i])
+
+        order = sorted(range(len(docs)), key=lambda i: scores[i], reverse=True)
+        return [docs[i] for i in order[:top_k]], True
+
+    def cache_stats(self):
+        return self.__score_cache.stats()
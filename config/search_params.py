@@ -0,0 +1,68 @@
+from qdrant_client import models
+
+DENSE_SEARCH_MODES = ("exact", "hnsw", "quantized")
+HYBRID_SEARCH_MODE = "hybrid"
+SEARCH_MODES = DENSE_SEARCH_MODES + (HYBRID_SEARCH_MODE,)
+
+
+def build_search_params(
+        search_mode: str,
+        hnsw_ef: int,
+        oversampling: float,
+        rescore: bool
+    ) -> models.SearchParams:
+    """
+    Build the Qdrant search parameters of a dense search mode.
+
+    :param search_mode: "exact" scans the original vectors, "hnsw" walks the HNSW graph
+        over the original vectors, and "quantized" walks it over the binary codes, fetching
+        `oversampling` times the limit and rescoring them with the original vectors.
+    :param hnsw_ef: Size of the HNSW candidate list; higher is slower but more accurate.
+    :param oversampling: Oversampling factor of the quantized mode.
+    :param rescore: Whether the quantized mode rescores candidates with the original vectors.
+    :return: The search parameters.
+    """
+    if search_mode == "exact":
+        return models.SearchParams(
+            exact=True,
+            quantization=models.QuantizationSearchParams(ignore=True),
+        )
+    if search_mode == "hnsw":
+        return models.SearchParams(
+            hnsw_ef=hnsw_ef,
+            exact=False,
+            quantization=models.QuantizationSearchParams(ignore=True),
+        )
+    if search_mode == "quantized":
+        return models.SearchParams(
+            hnsw_ef=hnsw_ef,
+            exact=False,
+            quantization=models.QuantizationSearchParams(
+                ignore=False,
+                rescore=rescore,
+                oversampling=oversampling,
+            ),
+        )
+    raise ValueError(f"Unknown dense search mode '{search_mode}', expected one of {', '.join(DENSE_SEARCH_MODES)}")
+
+
+def reciprocal_rank_fusion(rankings, k: int, limit: int):
+    """
+    Fuse ranked result lists with reciprocal-rank fusion.
+
+    Every hit scores 1 / (k + rank) in each list it appears in, and hits are ordered by
+    the sum of their scores, so no score normalization across retrievers is needed.
+
+    :param rankings: Lists of scored points, best first.
+    :param k: The RRF constant; larger values flatten the contribution of the top ranks.
+    :param limit: The number of fused hits to return.
+    :return: The fused hits, best first.
+    """
+    scores = {}
+    hits = {}
+    for ranking in rankings:
+        for rank, hit in enumerate(ranking, start=1):
+            scores[hit.id] = scores.get(hit.id, 0.0) + 1.0 / (k + rank)
+            hits.setdefault(hit.id, hit)
+    fused = sorted(scores, key=scores.get, reverse=True)[:limit]
+    return [hits[point_id] for point_id in fused]
@@ -0,0 +1,72 @@
+import re
+import hashlib
+from collections import Counter
+from qdrant_client import models
+from config.config_helper import Configuration
+
+config = Configuration().get_config('sparse')
+
+
+class SparseEncoder:
+    """
+    BM25 sparse vectors for lexical retrieval.
+
+    Chunk text has already been lemmatized and stripped of stopwords at ingestion, so it
+    is only lowercased and split on word characters here. Every term is hashed to a
+    stable 32-bit index, so no vocabulary has to be stored or shared.
+
+    Documents carry the BM25 term-frequency weights with length normalization; queries
+    carry a weight of 1 per distinct term. The IDF half of BM25 is left to Qdrant, which
+    maintains the document frequencies of the collection when the sparse vector is
+    configured with the IDF modifier, so re-ingested chunks are never counted twice.
+    """
+    TOKEN_PATTERN = re.compile(r"\w+")
+
+    def __init__(
+            self,
+            k1: float = config['k1'],
+            b: float = config['b'],
+            avg_doc_length: float = config['avg_doc_length']
+        ):
+        self.__k1 = k1
+        self.__b = b
+        self.__avg_doc_length = avg_doc_length
+
+    def tokenize(self, text: str):
+        return self.TOKEN_PATTERN.findall(text.lower())
+
+    @staticmethod
+    def term_index(term: str) -> int:
+        return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=4).digest(), "little")
+
+    def __to_sparse_vector(self, weights) -> models.SparseVector:
+        # Distinct terms can share an index, so their weights are summed
+        merged = {}
+        for term, weight in weights.items():
+            index = self.term_index(term)
+            merged[index] = merged.get(index, 0.0) + weight
+        return models.SparseVector(indices=list(merged), values=list(merged.values()))
+
+    def encode_document(self, text: str) -> models.SparseVector:
+        """
+        BM25 term-frequency weights of a chunk.
+
+        :param text: The cleaned chunk text.
+        :return: The sparse vector of the chunk.
+        """
+        term_counts = Counter(self.tokenize(text))
+        doc_length = sum(term_counts.values())
+        norm = self.__k1 * (1 - self.__b + self.__b * doc_length / self.__avg_doc_length)
+        return self.__to_sparse_vector({
+            term: count * (self.__k1 + 1) / (count + norm)
+            for term, count in term_counts.items()
+        })
+
+    def encode_query(self, text: str) -> models.SparseVector:
+        """
+        Sparse vector of a query, with a weight of 1 per distinct term.
+
+        :param text: The query, normalized the same way as the chunk text.
+        :return: The sparse vector of the query.
+        """
+        return self.__to_sparse_vector({term: 1.0 for term in set(self.tokenize(text))})
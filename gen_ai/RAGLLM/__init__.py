@@ -1,17 +1,42 @@
 import re
+import asyncio
 import functools
-import json
+from concurrent import futures
 from groq import Groq
 import redis
 from typing import Optional, AnyStr, List, Union, Dict
 from datetime import datetime as dt
 from dotenv import load_dotenv, find_dotenv
+from config import lazy
+from config.config_helper import Configuration
 from config.logger import Logger
+from config.redis_client import PipelineStep, run_pipeline, arun_pipeline
+from gen_ai.RAGLLM.memory import ConversationMemory
 
 _ = load_dotenv(find_dotenv())
 logger = Logger(__name__)
 
+config = Configuration().get_config('conversation')
+
+# Compactions in flight on the grpc.aio server; the event loop only keeps weak references
+_compaction_tasks = set()
+
+
+@lazy
+def get_compaction_executor():
+    """
+    Runs history compactions off the request path of the threaded server.
+    """
+    return futures.ThreadPoolExecutor(max_workers=config['compaction_workers'], thread_name_prefix="compaction")
+
 class AIGenerator:
+    """
+    One Summarize turn of a user's conversation.
+
+    The history is read in one Redis round trip, together with any `read_steps` of the
+    caller (e.g. cache lookups), and the new turns are written in one more, together with
+    the steps `answer_steps` returns for the generated answer.
+    """
     def __init__(
             self, 
             system_prompt: AnyStr,
@@ -23,7 +48,8 @@ class AIGenerator:
             model: str = "llama3-70b-8192", 
             max_tokens: int = 150,
             temperature: float = 0.7,
-            user_id: str = "test-user"
+            user_id: str = "test-user",
+            read_steps: Union[List[PipelineStep], None] = None
         ):
         self.system_prompt = system_prompt
         self.context = context
@@ -35,27 +61,206 @@ class AIGenerator:
         self.tools = tools
         self.names_to_functions = names_to_functions
         self.user_id = user_id
+        self.read_steps = list(read_steps or [])
+        self.memory = ConversationMemory(redis_client, user_id)
+        self.summary = None
+        self.overflow = []
+        self.saved = 0
+        self.compaction = None
         self.messages = self.load_messages()
-    
+
+    def decode_messages(self, turns, summary):
+        """
+        Build the prompt from the system prompt, the rolling summary and the tail of the
+        history that fits in the memory's token budget. Older loaded turns are kept in
+        `overflow` until they are compacted into the summary.
+        """
+        self.summary = summary
+        start = self.memory.window_start(turns, summary)
+        self.overflow = turns[:start]
+        messages = [{"role": "system", "content": self.system_prompt.format(context=self.context)}]
+        if summary:
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"})
+        messages.extend(turns[start:])
+        self.saved = len(messages)
+        return messages
+
+    def load_steps(self, history: List):
+        return [self.memory.load_step(lambda *loaded: history.extend(loaded))] + self.read_steps
+
     def load_messages(self):
-        messages = self.redis_client.get(f"{self.user_id}_messages")
-        if messages:
-            return json.loads(messages)
-        return [{"role": "system", "content": self.system_prompt.format(context=self.context)}]
-    
-    def save_messages(self):
-        self.redis_client.set(f"{self.user_id}_messages", json.dumps(self.messages))
-
-    def run_conversation(self, user_prompt, query):
+        history = []
+        run_pipeline(self.redis_client, self.load_steps(history))
+        return self.decode_messages(*history)
+
+    def save_steps(self, extra_steps: List[PipelineStep]):
+        steps = [self.memory.append_step(self.messages[self.saved:])] + list(extra_steps)
+        self.saved = len(self.messages)
+        return steps
+
+    def save_messages(self, extra_steps: List[PipelineStep] = ()):
+        run_pipeline(self.redis_client, self.save_steps(extra_steps), transaction=True)
+        if self.memory.should_compact(self.overflow) and self.compaction is None:
+            self.compaction = get_compaction_executor().submit(self.compact_history)
+
+    def summary_kwargs(self):
+        return dict(
+            messages=self.memory.summary_messages(self.summary, self.overflow),
+            model="llama3-8b-8192",
+            max_tokens=self.memory.summary_max_tokens,
+            temperature=0
+        )
+
+    def compact_history(self):
+        """
+        Fold the turns that fell out of the prompt window into the rolling summary. A
+        failure only leaves them for a later request to compact; so does a concurrent
+        request for the same user compacting them first.
+        """
+        try:
+            completion = self.client.chat.completions.create(**self.summary_kwargs())
+            if not self.memory.store_summary(self.summary, completion.choices[0].message.content, self.overflow):
+                logger.info(f"The history of {self.user_id} was already compacted")
+        except Exception as ex:
+            logger.warning(f"Could not compact the history of {self.user_id}: {str(ex)}")
+
+    @property
+    def is_first_turn(self):
+        return not self.summary and not self.overflow and len(self.messages) == 1
+
+    def record_answer(self, user_prompt, query, answer):
+        """
+        Add a turn answered without calling the model (e.g. from a cache) to the history.
+        """
         self.messages.append({'role': 'user', 'content': user_prompt.format(query=query)})
-        completion2 = self.client.chat.completions.create(
+        self.messages.append({'role': 'assistant', 'content': answer})
+        self.save_messages()
+        return answer
+
+    def completion_kwargs(self):
+        return dict(
             messages=self.messages,
             model="llama3-8b-8192", #self.model
             max_tokens=self.max_tokens,
             temperature=self.temperature
         )
+
+    def run_conversation(self, user_prompt, query, answer_steps=None):
+        self.messages.append({'role': 'user', 'content': user_prompt.format(query=query)})
+        completion2 = self.client.chat.completions.create(**self.completion_kwargs())
         conversation = completion2.choices[0].message.content
         self.messages.append({'role': 'assistant', 'content': conversation})
-        self.save_messages()
+        self.save_messages(answer_steps(conversation) if answer_steps else ())
+
+        return conversation
+
+    def finish_stream(self, parts):
+        """
+        Record the assistant turn assembled from a streamed completion. If nothing was
+        generated, the pending user turn is dropped so the history never holds a
+        user turn without a reply.
+
+        :return: True when the history should be saved.
+        """
+        if not parts:
+            self.messages.pop()
+            return False
+        self.messages.append({'role': 'assistant', 'content': ''.join(parts)})
+        return True
+
+    def stream_conversation(self, user_prompt, query, answer_steps=None):
+        """
+        Stream the completion as token deltas. The reply is saved to the history when
+        the stream completes, fails or is closed early by the caller. A delta only
+        counts once the caller asks for the next one, so a cancelled stream saves just
+        what reached the client. `answer_steps` only receives complete replies.
+        """
+        self.messages.append({'role': 'user', 'content': user_prompt.format(query=query)})
+        parts = []
+        completed = False
+        try:
+            stream = self.client.chat.completions.create(stream=True, **self.completion_kwargs())
+            for chunk in stream:
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+                    # Resumed, so the caller has sent this delta on
+                    parts.append(delta)
+            completed = True
+        finally:
+            if self.finish_stream(parts):
+                self.save_messages(answer_steps(''.join(parts)) if completed and answer_steps else ())
+
+
+class AsyncAIGenerator(AIGenerator):
+    """
+    AIGenerator for the grpc.aio server: history and completions go through
+    redis.asyncio and AsyncGroq, so a Summarize never blocks the event loop.
+    History is loaded lazily by `arun_conversation`; `client` is an AsyncGroq
+    and `redis_client` a redis.asyncio.Redis.
+    """
+    def load_messages(self):
+        # History is loaded asynchronously by `aload_messages`
+        return None
+
+    async def aload_messages(self):
+        history = []
+        await arun_pipeline(self.redis_client, self.load_steps(history))
+        self.messages = self.decode_messages(*history)
+        return self.messages
 
-        return conversation
\ No newline at end of file
+    async def asave_messages(self, extra_steps: List[PipelineStep] = ()):
+        await arun_pipeline(self.redis_client, self.save_steps(extra_steps), transaction=True)
+        if self.memory.should_compact(self.overflow) and self.compaction is None:
+            self.compaction = asyncio.create_task(self.acompact_history())
+            _compaction_tasks.add(self.compaction)
+            self.compaction.add_done_callback(_compaction_tasks.discard)
+
+    async def acompact_history(self):
+        try:
+            completion = await self.client.chat.completions.create(**self.summary_kwargs())
+            summary = completion.choices[0].message.content
+            if not await self.memory.astore_summary(self.summary, summary, self.overflow):
+                logger.info(f"The history of {self.user_id} was already compacted")
+        except Exception as ex:
+            logger.warning(f"Could not compact the history of {self.user_id}: {str(ex)}")
+
+    async def arecord_answer(self, user_prompt, query, answer):
+        if self.messages is None:
+            await self.aload_messages()
+        self.messages.append({'role': 'user', 'content': user_prompt.format(query=query)})
+        self.messages.append({'role': 'assistant', 'content': answer})
+        await self.asave_messages()
+        return answer
+
+    async def arun_conversation(self, user_prompt, query, answer_steps=None):
+        if self.messages is None:
+            await self.aload_messages()
+        self.messages.append({'role': 'user', 'content': user_prompt.format(query=query)})
+        completion = await self.client.chat.completions.create(**self.completion_kwargs())
+        conversation = completion.choices[0].message.content
+        self.messages.append({'role': 'assistant', 'content': conversation})
+        await self.asave_messages(answer_steps(conversation) if answer_steps else ())
+
+        return conversation
+
+    async def astream_conversation(self, user_prompt, query, answer_steps=None):
+        if self.messages is None:
+            await self.aload_messages()
+        self.messages.append({'role': 'user', 'content': user_prompt.format(query=query)})
+        parts = []
+        completed = False
+        try:
+            stream = await self.client.chat.completions.create(stream=True, **self.completion_kwargs())
+            async for chunk in stream:
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+                    # Resumed, so the caller has sent this delta on
+                    parts.append(delta)
+            completed = True
+        finally:
+            if self.finish_stream(parts):
+                extra_steps = answer_steps(''.join(parts)) if completed and answer_steps else ()
+                # Shielded so that a cancelled RPC still persists what was generated
+                await asyncio.shield(self.asave_messages(extra_steps))
\ No newline at end of file
@@ -0,0 +1,124 @@
+import os
+import re
+import json
+from typing import Callable, Dict, List, Union
+from config import lazy
+from config.config_helper import Configuration
+from config.logger import Logger
+from gen_ai.RAGLLM.memory import estimate_tokens
+
+logger = Logger(__name__)
+
+config = Configuration().get_config('context')
+
+
+@lazy
+def get_tokenizer():
+    """
+    The tokenizer of the Groq model, or None when it cannot be loaded (the `tokenizers`
+    package is missing, or the gated model repository is used without an `HF_TOKEN`),
+    in which case token counts are estimated from the text length.
+    """
+    try:
+        from tokenizers import Tokenizer
+        return Tokenizer.from_pretrained(config['tokenizer_name'], auth_token=os.environ.get("HF_TOKEN"))
+    except Exception as ex:
+        logger.warning(f"Could not load tokenizer '{config['tokenizer_name']}', estimating token counts: {str(ex)}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    tokenizer = get_tokenizer()
+    if tokenizer is None:
+        return estimate_tokens(text)
+    return len(tokenizer.encode(text, add_special_tokens=False).ids)
+
+
+class ContextBuilder:
+    """
+    Turn search hits into the context block of the Summarize prompt.
+
+    Each chunk keeps its text and the metadata `fields` the prompt cites; the rest of
+    the payload is dropped. Chunks with the same `_id`, or whose word sets overlap by
+    at least `similarity_threshold` (Jaccard) with a better-ranked chunk, are skipped.
+    The remaining chunks are packed in rank order until `max_tokens` is reached.
+    """
+    WORD = re.compile(r"\w+")
+
+    def __init__(
+            self,
+            max_tokens: int = config['max_tokens'],
+            fields: List[str] = config['fields'],
+            similarity_threshold: float = config['similarity_threshold'],
+            count_tokens: Callable[[str], int] = count_tokens
+        ):
+        self.__max_tokens = max_tokens
+        self.__fields = list(fields)
+        self.__similarity_threshold = similarity_threshold
+        self.__count_tokens = count_tokens
+
+    def __words(self, text: str) -> set:
+        return set(self.WORD.findall(text.lower()))
+
+    def __is_near_duplicate(self, words: set, kept: List[set]) -> bool:
+        for other in kept:
+            union = len(words | other)
+            if union and len(words & other) / union >= self.__similarity_threshold:
+                return True
+        return False
+
+    def format_chunk(self, number: int, doc: Dict) -> str:
+        metadata = doc.get("metadata") or {}
+        header = [f"[{number}]"]
+        for field in self.__fields:
+            value = metadata.get(field)
+            if value in (None, ""):
+                continue
+            if field == "page" and isinstance(value, int):
+                # PyMuPDF pages are 0-based
+                value += 1
+            header.append(f"{field}: {value}")
+        return f"{' | '.join(header)}\n{doc['page_content'].strip()}"
+
+    def build(self, docs: List[Dict]) -> str:
+        """
+        Build the prompt context.
+
+        :param docs: Search hits in rank order, as dicts with `page_content` and `metadata`.
+        :return: The selected chunks, separated by blank lines.
+        """
+        seen_ids = set()
+        kept_words = []
+        parts = []
+        used = 0
+        skipped = {"duplicate": 0, "budget": 0}
+        for doc in docs:
+            doc_id = (doc.get("metadata") or {}).get("_id")
+            words = self.__words(doc["page_content"])
+            if doc_id in seen_ids or self.__is_near_duplicate(words, kept_words):
+                skipped["duplicate"] += 1
+                continue
+            part = self.format_chunk(len(parts) + 1, doc)
+            tokens = self.__count_tokens(part)
+            if used + tokens > self.__max_tokens:
+                # A shorter, lower-ranked chunk may still fit
+                skipped["budget"] += 1
+                continue
+            if doc_id is not None:
+                seen_ids.add(doc_id)
+            kept_words.append(words)
+            parts.append(part)
+            used += tokens
+        logger.info(
+            f"Built context from {len(parts)} of {len(docs)} chunks, {used} tokens "
+            f"({skipped['duplicate']} duplicates, {skipped['budget']} over budget)"
+        )
+        return "\n\n".join(parts)
+
+    def build_from_search(self, result: Union[Dict[str, List[str]], None]) -> str:
+        """
+        Build the prompt context from a `PDFService.search` response.
+        """
+        if not result:
+            return ""
+        return self.build([json.loads(doc) for doc in result["data"]])
@@ -0,0 +1,236 @@
+import json
+import hashlib
+import threading
+from concurrent import futures
+from typing import Callable, Dict, List
+import groq
+from tenacity import Retrying, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
+from config.config_helper import Configuration
+from config.lru_cache import LRUCache
+from config.logger import Logger
+from gen_ai.RAGLLM.context_builder import count_tokens
+
+logger = Logger(__name__)
+
+config = Configuration().get_config('summarize')
+
+STUFF_MODE = "stuff"
+MAP_REDUCE_MODE = "map_reduce"
+SUMMARIZE_MODES = (STUFF_MODE, MAP_REDUCE_MODE)
+
+MAP_PROMPT = (
+    "Summarize the following passages from one document. Keep the claims, definitions, "
+    "figures, names and conclusions; leave out anything the passages do not say. "
+    "Reply with the summary only."
+)
+
+COLLAPSE_PROMPT = (
+    "Merge the following partial summaries of documents into one summary. Keep every "
+    "distinct fact and which document it comes from. Reply with the summary only."
+)
+
+RETRYABLE_ERRORS = (
+    groq.RateLimitError,
+    groq.APIConnectionError,
+    groq.APITimeoutError,
+    groq.InternalServerError,
+)
+
+
+class ConcurrencyLimitedCompletions:
+    """
+    Groq chat completions with at most `max_concurrency` requests in flight.
+
+    Rate-limited (429), timed-out, unreachable and 5xx requests are retried up to
+    `max_attempts` times. A 429 waits for the `retry-after` the API sent; other errors
+    back off exponentially with jitter, up to `max_backoff_seconds`. The concurrency slot
+    is released while waiting, so a throttled request does not hold up the others.
+    """
+    def __init__(
+            self,
+            client: groq.Groq,
+            max_concurrency: int = config['max_concurrency'],
+            max_attempts: int = config['max_attempts'],
+            max_backoff_seconds: float = config['max_backoff_seconds']
+        ):
+        # Retries are handled here, so that the SDK's own retries do not multiply them
+        self.__client = client.with_options(max_retries=0) if hasattr(client, "with_options") else client
+        self.__slots = threading.BoundedSemaphore(max_concurrency)
+        self.__max_attempts = max_attempts
+        self.__backoff = wait_exponential_jitter(initial=0.5, max=max_backoff_seconds)
+        self.__max_backoff_seconds = max_backoff_seconds
+        self.__lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+
+    def __wait(self, retry_state) -> float:
+        with self.__lock:
+            self.retries += 1
+        ex = retry_state.outcome.exception()
+        response = getattr(ex, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), self.__max_backoff_seconds)
+            except ValueError:
+                pass
+        return self.__backoff(retry_state)
+
+    def __complete_once(self, **kwargs) -> str:
+        with self.__slots:
+            completion = self.__client.chat.completions.create(**kwargs)
+        with self.__lock:
+            self.calls += 1
+        return completion.choices[0].message.content
+
+    def complete(self, messages: List[Dict], model: str, max_tokens: int, temperature: float = 0) -> str:
+        retrying = Retrying(
+            retry=retry_if_exception_type(RETRYABLE_ERRORS),
+            stop=stop_after_attempt(self.__max_attempts),
+            wait=self.__wait,
+            reraise=True
+        )
+        return retrying(
+            self.__complete_once,
+            messages=messages,
+            model=model,
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
+
+    def stats(self) -> Dict[str, int]:
+        with self.__lock:
+            return {"calls": self.calls, "retries": self.retries}
+
+
+class MapReduceSummarizer:
+    """
+    Summarize more chunks than fit in one prompt.
+
+    Chunks are grouped by document, ordered by page and packed into groups of at most
+    `group_max_tokens`; every group is summarized on its own, in parallel (map). When
+    the partial summaries together exceed `reduce_max_context_tokens`, they are merged
+    in groups the same way until they fit (collapse). The result is the context of the
+    final, query-specific answer (reduce).
+
+    Map and collapse summaries do not depend on the query, so they are cached by a hash
+    of the group's content and reused by every question that retrieves the same group.
+    """
+    def __init__(
+            self,
+            completions: Callable[[], ConcurrencyLimitedCompletions],
+            model: str = config['model'],
+            group_max_tokens: int = config['group_max_tokens'],
+            map_max_tokens: int = config['map_max_tokens'],
+            reduce_max_context_tokens: int = config['reduce_max_context_tokens'],
+            cache_size: int = config['cache_size'],
+            cache_ttl_seconds: float = config['cache_ttl_seconds'],
+            count_tokens: Callable[[str], int] = count_tokens
+        ):
+        self.__completions = completions
+        self.__model = model
+        self.__group_max_tokens = group_max_tokens
+        self.__map_max_tokens = map_max_tokens
+        self.__reduce_max_context_tokens = reduce_max_context_tokens
+        self.__cache = LRUCache(cache_size, cache_ttl_seconds)
+        self.__count_tokens = count_tokens
+
+    @staticmethod
+    def document_key(doc: Dict) -> str:
+        metadata = doc.get("metadata") or {}
+        return str(metadata.get("file_path") or metadata.get("source") or metadata.get("title") or "")
+
+    @staticmethod
+    def label(docs: List[Dict]) -> str:
+        metadata = docs[0].get("metadata") or {}
+        title = metadata.get("title") or metadata.get("source") or "Untitled document"
+        pages = sorted({doc["metadata"]["page"] + 1 for doc in docs if isinstance(doc["metadata"].get("page"), int)})
+        if not pages:
+            return title
+        return f"{title}, page {pages[0]}" if len(pages) == 1 else f"{title}, pages {pages[0]}-{pages[-1]}"
+
+    def pack(self, texts: List[str]) -> List[List[int]]:
+        """
+        Split consecutive texts into groups of at most `group_max_tokens`; a text larger
+        than the budget gets a group of its own.
+        """
+        groups, current, used = [], [], 0
+        for index, text in enumerate(texts):
+            tokens = self.__count_tokens(text)
+            if current and used + tokens > self.__group_max_tokens:
+                groups.append(current)
+                current, used = [], 0
+            current.append(index)
+            used += tokens
+        if current:
+            groups.append(current)
+        return groups
+
+    def group(self, docs: List[Dict]) -> List[List[Dict]]:
+        """
+        Group chunks by document, in the order each document was first retrieved, with
+        a document's chunks in page order.
+        """
+        documents = {}
+        for rank, doc in enumerate(docs):
+            documents.setdefault(self.document_key(doc), []).append((rank, doc))
+        groups = []
+        for chunks in documents.values():
+            chunks.sort(key=lambda item: (item[1]["metadata"].get("page", 0), item[0]))
+            ordered = [doc for _, doc in chunks]
+            groups.extend(
+                [ordered[i] for i in indices]
+                for indices in self.pack([doc["page_content"] for doc in ordered])
+            )
+        return groups
+
+    def __cache_key(self, prompt: str, text: str) -> str:
+        return hashlib.sha256(json.dumps([self.__model, self.__map_max_tokens, prompt, text]).encode()).hexdigest()
+
+    def __summarize(self, prompt: str, text: str) -> str:
+        key = self.__cache_key(prompt, text)
+        summary = self.__cache.get(key)
+        if summary is None:
+            summary = self.__completions().complete(
+                [{"role": "system", "content": prompt}, {"role": "user", "content": text}],
+                model=self.__model,
+                max_tokens=self.__map_max_tokens
+            )
+            self.__cache.put(key, summary)
+        return summary
+
+    def __summarize_all(self, prompt: str, texts: List[str], max_workers: int) -> List[str]:
+        if len(texts) == 1:
+            return [self.__summarize(prompt, texts[0])]
+        with futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="map-reduce") as executor:
+            return list(executor.map(lambda text: self.__summarize(prompt, text), texts))
+
+    def summarize(self, docs: List[Dict], max_workers: int = config['max_concurrency']) -> str:
+        """
+        Condense search hits into partial summaries that fit the final prompt.
+
+        :param docs: Search hits in rank order, as dicts with `page_content` and `metadata`.
+        :param max_workers: Groups summarized at once by this call; the shared completions
+            client bounds the requests in flight across calls.
+        :return: The labelled partial summaries, separated by blank lines.
+        """
+        if not docs:
+            return ""
+        groups = self.group(docs)
+        texts = ["\n\n".join(doc["page_content"].strip() for doc in group) for group in groups]
+        summaries = self.__summarize_all(MAP_PROMPT, texts, max_workers)
+        partials = [f"[{self.label(group)}]\n{summary.strip()}" for group, summary in zip(groups, summaries)]
+
+        rounds = 0
+        while len(partials) > 1 and self.__count_tokens("\n\n".join(partials)) > self.__reduce_max_context_tokens:
+            collapsed = [[partials[i] for i in indices] for indices in self.pack(partials)]
+            if len(collapsed) == len(partials):
+                # Every partial fills a group on its own; merging cannot shrink them further
+                break
+            partials = self.__summarize_all(COLLAPSE_PROMPT, ["\n\n".join(group) for group in collapsed], max_workers)
+            rounds += 1
+        logger.info(
+            f"Map-reduce summarized {len(docs)} chunks in {len(groups)} groups, {rounds} collapse rounds "
+            f"(cache: {self.__cache.stats()}, completions: {self.__completions().stats()})"
+        )
+        return "\n\n".join(partials)
@@ -0,0 +1,184 @@
+import json
+from typing import Callable, Dict, List, Tuple, Union
+import redis
+import redis.asyncio
+from config.config_helper import Configuration
+from config.redis_client import PipelineStep
+from config.logger import Logger
+
+logger = Logger(__name__)
+
+config = Configuration().get_config('conversation')
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between a user and an AI assistant "
+    "that answers questions about documents. Merge the new turns into the current summary. "
+    "Keep the questions asked, the facts given in the answers and anything the user said "
+    "about themselves or their goals. Drop greetings and repetition. Reply with the "
+    "updated summary only."
+)
+
+
+def estimate_tokens(text: str) -> int:
+    # Llama 3 averages about four characters per token on English text, plus a few
+    # tokens of chat formatting per message
+    return len(text) // 4 + 4
+
+
+class ConversationMemory:
+    """
+    A user's conversation history in Redis: a list of JSON turns and a rolling summary.
+
+    Turns are appended with RPUSH and the list is capped with LTRIM; both keys expire
+    `ttl_seconds` after the last write. Only the last `max_turns` turns are read back,
+    and the prompt window is the longest tail of them that fits in `token_budget`
+    together with the summary. Once `compact_after_turns` older turns have fallen out
+    of the window, they are folded into the summary and removed from the list, off the
+    request path, so the cost of a request does not grow with the length of the session.
+
+    Reads and writes are exposed as pipeline steps, so a request can send them to Redis
+    in the same round trip as its other keys.
+    """
+    # Atomically: give up if the summary changed since it was read (a concurrent request
+    # compacted first); otherwise store the new summary and remove the compacted turns
+    # still at the head of the list. Some of them may already have been dropped by the
+    # `max_turns` cap, so the head is matched against the longest tail of them.
+    COMPACT_SCRIPT = """
+local current = redis.call('GET', KEYS[2]) or ''
+if current ~= ARGV[1] then return -1 end
+local count = #ARGV - 3
+local head = redis.call('LRANGE', KEYS[1], 0, count - 1)
+local remaining = 0
+for offset = 0, count - 1 do
+    local matches = true
+    for i = 1, count - offset do
+        if head[i] ~= ARGV[3 + offset + i] then
+            matches = false
+            break
+        end
+    end
+    if matches then
+        remaining = count - offset
+        break
+    end
+end
+redis.call('SET', KEYS[2], ARGV[2], 'EX', ARGV[3])
+if remaining > 0 then redis.call('LTRIM', KEYS[1], remaining, -1) end
+return remaining
+"""
+
+    def __init__(
+            self,
+            redis_client: Union[redis.Redis, redis.asyncio.Redis],
+            user_id: str,
+            ttl_seconds: int = config['ttl_seconds'],
+            max_turns: int = config['max_turns'],
+            token_budget: int = config['token_budget'],
+            compact_after_turns: int = config['compact_after_turns'],
+            summary_max_tokens: int = config['summary_max_tokens']
+        ):
+        self.__redis_client = redis_client
+        self.__user_id = user_id
+        self.__ttl_seconds = ttl_seconds
+        self.__max_turns = max_turns
+        self.__token_budget = token_budget
+        self.__compact_after_turns = compact_after_turns
+        self.summary_max_tokens = summary_max_tokens
+
+    @staticmethod
+    def keys(user_id: str) -> Tuple[str, str]:
+        """
+        The history and summary keys of a user.
+        """
+        return f"{user_id}_history", f"{user_id}_summary"
+
+    @property
+    def history_key(self) -> str:
+        return self.keys(self.__user_id)[0]
+
+    @property
+    def summary_key(self) -> str:
+        return self.keys(self.__user_id)[1]
+
+    def load_step(self, loaded: Callable[[List[Dict], Union[str, None]], None]) -> PipelineStep:
+        """
+        Read the most recent turns, oldest first, and the summary of earlier ones, and
+        pass them to `loaded`.
+        """
+        def queue(pipe):
+            pipe.lrange(self.history_key, -self.__max_turns, -1)
+            pipe.get(self.summary_key)
+
+        return PipelineStep(queue, lambda results: loaded(*self.decode(*results)), 2)
+
+    @staticmethod
+    def decode(turns: List[bytes], summary: Union[bytes, None]) -> Tuple[List[Dict], Union[str, None]]:
+        if isinstance(summary, bytes):
+            summary = summary.decode()
+        return [json.loads(turn) for turn in turns], summary or None
+
+    def window_start(self, turns: List[Dict], summary: Union[str, None]) -> int:
+        """
+        The index of the oldest turn in the prompt window. The window never opens on an
+        assistant reply, so the model does not see an answer without its question.
+        """
+        used = estimate_tokens(summary) if summary else 0
+        start = len(turns)
+        while start > 0:
+            cost = estimate_tokens(turns[start - 1]['content'])
+            if used + cost > self.__token_budget:
+                break
+            used += cost
+            start -= 1
+        while start < len(turns) and turns[start]['role'] != 'user':
+            start += 1
+        return start
+
+    def should_compact(self, overflow: List[Dict]) -> bool:
+        return len(overflow) >= self.__compact_after_turns
+
+    def append_step(self, turns: List[Dict]) -> PipelineStep:
+        if not turns:
+            return PipelineStep(lambda pipe: None, lambda results: None, 0)
+
+        def queue(pipe):
+            pipe.rpush(self.history_key, *[json.dumps(turn) for turn in turns])
+            pipe.ltrim(self.history_key, -self.__max_turns, -1)
+            pipe.expire(self.history_key, self.__ttl_seconds)
+            pipe.expire(self.summary_key, self.__ttl_seconds)
+
+        return PipelineStep(queue, lambda results: None, 4)
+
+    def summary_messages(self, summary: Union[str, None], turns: List[Dict]) -> List[Dict]:
+        """
+        The chat messages asking the model to fold `turns` into `summary`.
+        """
+        transcript = "\n\n".join(f"{turn['role']}: {turn['content']}" for turn in turns)
+        return [
+            {"role": "system", "content": SUMMARY_PROMPT},
+            {"role": "user", "content": f"Current summary:\n{summary or '(empty)'}\n\nNew turns:\n{transcript}"}
+        ]
+
+    def compact_args(self, previous_summary: Union[str, None], summary: str, compacted: List[Dict]) -> List:
+        return [
+            self.COMPACT_SCRIPT,
+            2,
+            self.history_key,
+            self.summary_key,
+            previous_summary or "",
+            summary,
+            self.__ttl_seconds,
+            *[json.dumps(turn) for turn in compacted]
+        ]
+
+    def store_summary(self, previous_summary: Union[str, None], summary: str, compacted: List[Dict]) -> bool:
+        """
+        Replace `previous_summary` with `summary`, which now covers the `compacted` turns,
+        and drop those turns from the history.
+
+        :return: False when another request compacted the history first.
+        """
+        return self.__redis_client.eval(*self.compact_args(previous_summary, summary, compacted)) >= 0
+
+    async def astore_summary(self, previous_summary: Union[str, None], summary: str, compacted: List[Dict]) -> bool:
+        return await self.__redis_client.eval(*self.compact_args(previous_summary, summary, compacted)) >= 0
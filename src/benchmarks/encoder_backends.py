@@ -0,0 +1,88 @@
+"""
+Throughput, latency and agreement of the embedding encoder backends.
+
+Chunks are cut from a PDF the same way ingestion does, then embedded with every backend.
+Throughput is measured on batched chunk encodes, latency on single-query encodes, and
+agreement as the cosine similarity of each backend's vectors with the fp32 torch ones.
+
+Usage:
+    python src/benchmarks/encoder_backends.py --pdf src/pdf/uploads/paper_8.pdf --backends torch onnx onnx-int8
+"""
+import pathlib
+import sys
+
+current_dir = pathlib.Path(__file__).parent
+previous_dir = current_dir.parent.parent
+sys.path.append(str(previous_dir))
+
+import time
+import argparse
+import pymupdf
+import numpy as np
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from config import BASE_DIR
+from config.config_helper import Configuration
+from config.encoders import ENCODER_BACKENDS, load_encoder
+
+config = Configuration().get_config('qdrant')
+
+QUERIES = [
+    "How does Active Inference minimize free energy?",
+    "What are the challenges of education in Nigeria?",
+    "Applications of artificial intelligence in healthcare",
+    "Who are the authors of the paper?",
+]
+
+
+def load_chunks(pdf_path, count):
+    with pymupdf.open(pdf_path) as document:
+        text = "\n".join(page.get_text() for page in document)
+    chunks = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200).split_text(text)
+    # Repeat short documents so every run encodes the same number of chunks
+    return [chunks[i % len(chunks)] for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", default=str(BASE_DIR / "src/pdf/uploads/Research_Paper_on_Artificial_Intelligence.pdf"))
+    parser.add_argument("--model-name", default=config['model_name'])
+    parser.add_argument("--backends", nargs="+", default=list(ENCODER_BACKENDS), choices=ENCODER_BACKENDS)
+    parser.add_argument("--chunks", type=int, default=512)
+    parser.add_argument("--batch-size", type=int, default=config['batch_size'])
+    parser.add_argument("--repeats", type=int, default=25, help="Single-query encodes per query")
+    args = parser.parse_args()
+
+    chunks = load_chunks(args.pdf, args.chunks)
+    print(f"{len(chunks)} chunks from {args.pdf}, batch size {args.batch_size}")
+    baseline = None
+    baseline_throughput = None
+    print(f"{'backend':<10} {'chunks/s':>9} {'speedup':>8} {'p50 ms':>8} {'p95 ms':>8} {'mean cos':>9} {'min cos':>8}")
+    for backend in ["torch"] + [backend for backend in args.backends if backend != "torch"]:
+        encoder = load_encoder(args.model_name, backend)
+        encoder.encode(chunks[:args.batch_size], batch_size=args.batch_size)
+
+        started = time.perf_counter()
+        vectors = np.asarray(encoder.encode(chunks, batch_size=args.batch_size), dtype=np.float32)
+        throughput = len(chunks) / (time.perf_counter() - started)
+
+        latencies = []
+        for _ in range(args.repeats):
+            for query in QUERIES:
+                started = time.perf_counter()
+                encoder.encode(query)
+                latencies.append(time.perf_counter() - started)
+        latencies = np.array(latencies) * 1000
+
+        vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        if baseline is None:
+            baseline, baseline_throughput = vectors, throughput
+        cosines = (vectors * baseline).sum(axis=1)
+        if backend not in args.backends:
+            continue
+        print(f"{backend:<10} {throughput:>9.1f} {throughput / baseline_throughput:>7.2f}x "
+              f"{np.percentile(latencies, 50):>8.2f} {np.percentile(latencies, 95):>8.2f} "
+              f"{cosines.mean():>9.5f} {cosines.min():>8.5f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+Recall@k and latency of the Qdrant search modes against the exact baseline.
+
+Clustered random unit vectors are loaded into a scratch collection on a local Qdrant,
+created with the same distance, quantization and optimizer settings as the PDF
+collections. Once it is indexed, the same queries are run in every mode and `hnsw_ef`,
+and each result set is compared with the exact top-k.
+
+Usage:
+    python src/benchmarks/search_modes.py --url http://localhost:6333 --points 200000 --hnsw-ef 64 128 256
+"""
+import pathlib
+import sys
+
+current_dir = pathlib.Path(__file__).parent
+previous_dir = current_dir.parent.parent
+sys.path.append(str(previous_dir))
+
+import time
+import argparse
+import numpy as np
+from qdrant_client import QdrantClient, models
+from config.config_helper import Configuration
+from config.search_params import build_search_params
+
+config = Configuration().get_config('qdrant')
+
+
+def make_vectors(rng, count, dim, centroids):
+    # Points scattered around a few centroids resemble embedded chunks more than uniform noise
+    vectors = centroids[rng.integers(len(centroids), size=count)] + rng.normal(scale=0.35, size=(count, dim))
+    vectors = vectors.astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def create_collection(client, name, dim, vectors, batch_size):
+    if client.collection_exists(name):
+        client.delete_collection(name)
+    client.create_collection(
+        collection_name=name,
+        vectors_config=models.VectorParams(size=dim, distance=models.Distance.COSINE),
+        optimizers_config=models.OptimizersConfigDiff(
+            default_segment_number=config['default_segment_number'],
+            indexing_threshold=config['indexing_threshold'],
+        ),
+        quantization_config=models.BinaryQuantization(
+            binary=models.BinaryQuantizationConfig(always_ram=True),
+        )
+    )
+    client.upload_collection(name, vectors=vectors, ids=range(len(vectors)), batch_size=batch_size)
+
+
+def wait_for_index(client, name, timeout_seconds):
+    deadline = time.monotonic() + timeout_seconds
+    while time.monotonic() < deadline:
+        if client.get_collection(name).status == models.CollectionStatus.GREEN:
+            return
+        time.sleep(1)
+    raise TimeoutError(f"Collection '{name}' was not indexed within {timeout_seconds}s")
+
+
+def run_mode(client, name, queries, k, search_params):
+    results, latencies = [], []
+    for query in queries:
+        started = time.perf_counter()
+        hits = client.search(
+            collection_name=name,
+            query_vector=query.tolist(),
+            limit=k,
+            with_payload=False,
+            search_params=search_params,
+        )
+        latencies.append(time.perf_counter() - started)
+        results.append({hit.id for hit in hits})
+    return results, np.array(latencies) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:6333")
+    parser.add_argument("--collection", default="search-mode-benchmark")
+    parser.add_argument("--points", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--clusters", type=int, default=64)
+    parser.add_argument("--k", type=int, default=config['limit'])
+    parser.add_argument("--hnsw-ef", type=int, nargs="+", default=[config['hnsw_ef']])
+    parser.add_argument("--oversampling", type=float, default=config['oversampling'])
+    parser.add_argument("--no-rescore", action="store_true")
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--index-timeout", type=int, default=1800)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch collection afterwards")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    centroids = rng.normal(size=(args.clusters, args.dim))
+    client = QdrantClient(url=args.url, timeout=120)
+
+    print(f"Loading {args.points} vectors of dimension {args.dim} into '{args.collection}'...")
+    create_collection(client, args.collection, args.dim, make_vectors(rng, args.points, args.dim, centroids), args.batch_size)
+    wait_for_index(client, args.collection, args.index_timeout)
+    queries = make_vectors(rng, args.queries, args.dim, centroids)
+
+    try:
+        baseline, latencies = run_mode(client, args.collection, queries, args.k, build_search_params("exact", None, None, None))
+        print(f"{'mode':<10} {'hnsw_ef':>8} {f'recall@{args.k}':>10} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8}")
+        print(f"{'exact':<10} {'-':>8} {1.0:>10.4f} {np.percentile(latencies, 50):>8.2f} "
+              f"{np.percentile(latencies, 95):>8.2f} {latencies.mean():>8.2f}")
+        for search_mode in ("hnsw", "quantized"):
+            for hnsw_ef in args.hnsw_ef:
+                search_params = build_search_params(search_mode, hnsw_ef, args.oversampling, not args.no_rescore)
+                results, latencies = run_mode(client, args.collection, queries, args.k, search_params)
+                recall = np.mean([len(found & expected) / len(expected) for found, expected in zip(results, baseline)])
+                print(f"{search_mode:<10} {hnsw_ef:>8} {recall:>10.4f} {np.percentile(latencies, 50):>8.2f} "
+                      f"{np.percentile(latencies, 95):>8.2f} {latencies.mean():>8.2f}")
+    finally:
+        if not args.keep:
+            client.delete_collection(args.collection)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+import pathlib
+import sys
+
+current_dir = pathlib.Path(__file__).parent
+previous_dir = current_dir.parent.parent.parent
+sys.path.append(str(previous_dir))
+
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent import futures
+from datetime import datetime as dt
+from typing import Callable, Dict, Any, Union
+from config.config_helper import Configuration
+from config.logger import Logger
+
+logger = Logger(__name__)
+
+config = Configuration().get_config('ingestion')
+
+
+class IngestionCancelled(Exception):
+    pass
+
+
+class IngestionQueueFull(Exception):
+    pass
+
+
+class IngestionJobNotFound(LookupError):
+    pass
+
+
+class IngestionJob:
+    """
+    Status and per-stage progress of one queued PDF ingestion.
+
+    The pipeline reports progress through `set_stage` and the `add_*` counters and
+    calls `raise_if_cancelled` between batches so a cancel takes effect promptly.
+    """
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    COMPLETED = "COMPLETED"
+    FAILED = "FAILED"
+    CANCELLED = "CANCELLED"
+    FINISHED_STATES = {COMPLETED, FAILED, CANCELLED}
+
+    def __init__(
+            self,
+            collection_name: str,
+            filename: str,
+            document_type: str,
+            filepath: Union[str, None] = None,
+            on_finished: Union[Callable[[], None], None] = None
+        ):
+        self.job_id = str(uuid.uuid4())
+        self.collection_name = collection_name
+        self.filename = filename
+        self.document_type = document_type
+        self.filepath = filepath
+        self.status = self.QUEUED
+        self.stage = "queued"
+        self.message = ""
+        self.pages_parsed = 0
+        self.chunks_embedded = 0
+        self.points_upserted = 0
+        self.created_at = dt.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.future = None
+        self.__on_finished = on_finished
+        self.__lock = threading.Lock()
+        self.__cancel_requested = threading.Event()
+        self.__done = threading.Event()
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in self.FINISHED_STATES
+
+    def set_stage(self, stage: str) -> None:
+        with self.__lock:
+            self.stage = stage
+
+    def add_pages_parsed(self, count: int) -> None:
+        with self.__lock:
+            self.pages_parsed += count
+
+    def add_chunks_embedded(self, count: int) -> None:
+        with self.__lock:
+            self.chunks_embedded += count
+
+    def add_points_upserted(self, count: int) -> None:
+        with self.__lock:
+            self.points_upserted += count
+
+    def request_cancel(self) -> None:
+        self.__cancel_requested.set()
+
+    def raise_if_cancelled(self) -> None:
+        if self.__cancel_requested.is_set():
+            raise IngestionCancelled(f"Ingestion job {self.job_id} was cancelled")
+
+    def start(self) -> None:
+        with self.__lock:
+            self.status = self.RUNNING
+
+    def finish(self, status: str, message: str = "") -> None:
+        with self.__lock:
+            self.status = status
+            self.stage = "done"
+            self.message = message
+        if self.__on_finished is not None:
+            try:
+                self.__on_finished()
+            except Exception as ex:
+                logger.warning(f"Cleanup for ingestion job {self.job_id} failed: {str(ex)}")
+        self.__done.set()
+
+    def wait(self, timeout: Union[float, None] = None) -> bool:
+        return self.__done.wait(timeout)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self.__lock:
+            return {
+                "job_id": self.job_id,
+                "status": self.status,
+                "stage": self.stage,
+                "pages_parsed": self.pages_parsed,
+                "chunks_embedded": self.chunks_embedded,
+                "points_upserted": self.points_upserted,
+                "message": self.message,
+            }
+
+
+class IngestionQueue:
+    """
+    Bounded background worker pool that runs the ingestion pipeline off the gRPC threads.
+
+    `run_job` is called with the job as its only argument. At most `max_pending_jobs`
+    jobs may be queued or running at once, and only the `max_finished_jobs` most
+    recently finished jobs are kept for status lookups.
+    """
+
+    def __init__(
+            self,
+            run_job: Callable[[IngestionJob], Any],
+            max_workers: int = config['max_workers'],
+            max_pending_jobs: int = config['max_pending_jobs'],
+            max_finished_jobs: int = config['max_finished_jobs']
+        ):
+        self.__run_job = run_job
+        self.__executor = futures.ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="ingestion"
+        )
+        self.__max_pending_jobs = max_pending_jobs
+        self.__max_finished_jobs = max_finished_jobs
+        self.__jobs = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def submit(self, job: IngestionJob) -> IngestionJob:
+        """
+        Enqueue a job and return immediately.
+
+        :param job: The job to run.
+        :return: The queued job.
+        """
+        with self.__lock:
+            pending = sum(1 for queued in self.__jobs.values() if not queued.is_finished)
+            if pending >= self.__max_pending_jobs:
+                raise IngestionQueueFull(
+                    f"Ingestion queue is full ({self.__max_pending_jobs} pending jobs), retry later"
+                )
+            self.__jobs[job.job_id] = job
+            self.__evict_finished()
+            job.future = self.__executor.submit(self.__execute, job)
+        logger.info(f"Queued ingestion job {job.job_id} for {job.filename}")
+        return job
+
+    def get(self, job_id: str) -> IngestionJob:
+        with self.__lock:
+            job = self.__jobs.get(job_id)
+        if job is None:
+            raise IngestionJobNotFound(f"Ingestion job {job_id} not found")
+        return job
+
+    def cancel(self, job_id: str) -> IngestionJob:
+        """
+        Cancel a queued job outright, or ask a running job to stop at its next checkpoint.
+
+        :param job_id: The id returned by UploadPDF.
+        :return: The job, whose status reflects the cancellation once it has taken effect.
+        """
+        job = self.get(job_id)
+        if job.is_finished:
+            return job
+        job.request_cancel()
+        if job.future is not None and job.future.cancel():
+            job.finish(IngestionJob.CANCELLED, "Cancelled before it started")
+        return job
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stop accepting jobs. Jobs that have not started are cancelled, which also
+        removes their spooled uploads; running jobs are left to finish.
+
+        :param wait: Block until the running jobs have finished.
+        """
+        with self.__lock:
+            jobs = list(self.__jobs.values())
+        cancelled = 0
+        for job in jobs:
+            if not job.is_finished and job.future is not None and job.future.cancel():
+                job.request_cancel()
+                job.finish(IngestionJob.CANCELLED, "Cancelled by server shutdown")
+                cancelled += 1
+        if cancelled:
+            logger.warning(f"Cancelled {cancelled} queued ingestion jobs at shutdown")
+        self.__executor.shutdown(wait=wait, cancel_futures=True)
+
+    def __execute(self, job: IngestionJob) -> None:
+        job.start()
+        try:
+            self.__run_job(job)
+            job.finish(IngestionJob.COMPLETED, f"{job.filename} embedded successfully")
+            logger.info(f"Ingestion job {job.job_id} completed")
+        except IngestionCancelled as ic:
+            job.finish(IngestionJob.CANCELLED, str(ic))
+            logger.warning(f"Ingestion job {job.job_id} cancelled")
+        except Exception as ex:
+            job.finish(IngestionJob.FAILED, str(ex))
+            logger.error(f"Ingestion job {job.job_id} failed: {str(ex)}")
+
+    def __evict_finished(self) -> None:
+        finished = [job_id for job_id, job in self.__jobs.items() if job.is_finished]
+        for job_id in finished[:max(0, len(finished) - self.__max_finished_jobs)]:
+            del self.__jobs[job_id]
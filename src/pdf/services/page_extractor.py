@@ -0,0 +1,123 @@
+import pathlib
+import sys
+
+current_dir = pathlib.Path(__file__).parent
+previous_dir = current_dir.parent.parent.parent
+sys.path.append(str(previous_dir))
+
+import pymupdf
+import threading
+import multiprocessing
+from collections import deque
+from concurrent import futures
+from typing import Iterator, List, Tuple, Dict, Any
+from langchain.docstore.document import Document
+from config.config_helper import Configuration
+from config.logger import Logger
+
+logger = Logger(__name__)
+
+config = Configuration().get_config('extraction')
+
+
+def _extract_page_range(filepath: str, start: int, stop: int) -> List[Tuple[int, str]]:
+    """
+    Extract the text of pages [start, stop) in a worker process.
+    """
+    with pymupdf.open(filepath) as doc:
+        return [(number, doc[number].get_text()) for number in range(start, stop)]
+
+
+class PageExtractor:
+    """
+    Extract PDF pages as Documents, sharding page ranges across a process pool.
+
+    Pages are yielded in page order as soon as their shard is done, with the same
+    metadata PyMuPDFLoader produced (`source`, `file_path`, `page`, `total_pages`
+    and the document info). At most `max_workers * 2` shards are in flight at a time.
+    Short documents are extracted in-process, where the pool overhead is not worth it.
+    """
+
+    def __init__(
+            self,
+            max_workers: int = config['max_workers'],
+            pages_per_shard: int = config['pages_per_shard'],
+            min_parallel_pages: int = config['min_parallel_pages']
+        ):
+        self.__max_workers = max_workers
+        self.__pages_per_shard = pages_per_shard
+        self.__min_parallel_pages = min_parallel_pages
+        self.__pool = None
+        self.__lock = threading.Lock()
+
+    def _get_pool(self) -> futures.ProcessPoolExecutor:
+        # Spawned rather than forked workers, since the gRPC server process is multi-threaded
+        with self.__lock:
+            if self.__pool is None:
+                self.__pool = futures.ProcessPoolExecutor(
+                    max_workers=self.__max_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self.__pool
+
+    @staticmethod
+    def read_document_info(filepath: str) -> Tuple[int, Dict[str, Any]]:
+        """
+        Read the page count and the page-independent metadata of a PDF.
+
+        :param filepath: Path of the PDF.
+        :return: A tuple of the page count and the base metadata.
+        """
+        with pymupdf.open(filepath) as doc:
+            total_pages = len(doc)
+            info = {k: v for k, v in doc.metadata.items() if type(v) in [str, int]}
+        return total_pages, info
+
+    def extract(self, filepath: str) -> Iterator[Document]:
+        """
+        Lazily extract every page of a PDF in order.
+
+        :param filepath: Path of the PDF.
+        :return: An iterator over one Document per page.
+        """
+        total_pages, info = self.read_document_info(filepath)
+        for number, text in self.__extract_pages(filepath, total_pages):
+            yield Document(
+                page_content=text,
+                metadata=dict(
+                    {
+                        "source": filepath,
+                        "file_path": filepath,
+                        "page": number,
+                        "total_pages": total_pages,
+                    },
+                    **info
+                )
+            )
+
+    def shutdown(self) -> None:
+        with self.__lock:
+            if self.__pool is not None:
+                self.__pool.shutdown(wait=True, cancel_futures=True)
+                self.__pool = None
+
+    def __extract_pages(self, filepath: str, total_pages: int) -> Iterator[Tuple[int, str]]:
+        if self.__max_workers <= 1 or total_pages < self.__min_parallel_pages:
+            yield from _extract_page_range(filepath, 0, total_pages)
+            return
+
+        pool = self._get_pool()
+        shards = deque(
+            (start, min(start + self.__pages_per_shard, total_pages))
+            for start in range(0, total_pages, self.__pages_per_shard)
+        )
+        in_flight = deque()
+        try:
+            while shards or in_flight:
+                while shards and len(in_flight) < self.__max_workers * 2:
+                    start, stop = shards.popleft()
+                    in_flight.append(pool.submit(_extract_page_range, filepath, start, stop))
+                yield from in_flight.popleft().result()
+        finally:
+            for pending in in_flight:
+                pending.cancel()
@@ -14,40 +14,125 @@ import os
 import uuid
 import subprocess
 from datetime import datetime as dt
-from langchain_community.document_loaders import PyMuPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.docstore.document import Document
-from gen_ai.RAGLLM import AIGenerator
-
-from typing import List, Dict, Any, Union
-from config import BASE_DIR, PROMPT_DIR, client, redis_client
+from gen_ai.RAGLLM import AIGenerator, AsyncAIGenerator
+from gen_ai.RAGLLM.memory import ConversationMemory
+from gen_ai.RAGLLM.context_builder import ContextBuilder
+from gen_ai.RAGLLM.map_reduce import MAP_REDUCE_MODE, ConcurrencyLimitedCompletions, MapReduceSummarizer
+from pdf.services.text_preprocessor import TextPreprocessor
+from pdf.services.page_extractor import PageExtractor
+
+from typing import List, Dict, Any, Union, Iterable, Iterator, Tuple
+from config import (
+    BASE_DIR,
+    PROMPT_DIR,
+    lazy,
+    get_groq_client,
+    get_redis_client,
+    get_async_groq_client,
+    get_async_redis_client
+)
 import re
-from config.qdrant_client import vector_db
+import time
+import asyncio
+import threading
+from config.qdrant_client import get_vector_db
+from config.config_helper import Configuration
+from config.lru_cache import LRUCache
+from config.reranker import CrossEncoderReranker
+from config.answer_cache import AnswerLookup, SemanticAnswerCache, build_answer_cache
+from config.redis_client import latency as redis_latency
 from config.logger import Logger
 
 logger = Logger(__name__)
 
+config = Configuration().get_config('ingestion')
+search_cache_config = Configuration().get_config('search_cache')
+summarize_config = Configuration().get_config('summarize')
+rerank_config = Configuration().get_config('rerank')
+
+
+class IngestionContext:
+    """
+    State of a single ingestion request.
+
+    Everything that used to live on the shared PDFService instance while a document was
+    processed (metadata, cleaned documents) lives here instead, so concurrent ingestions
+    never see each other's data and nothing outlives the request.
+    """
+
+    def __init__(
+            self,
+            collection_name: str,
+            document_type: str,
+            filepath: str,
+            job=None
+        ):
+        self.collection_name = collection_name
+        self.document_type = document_type
+        self.filepath = filepath
+        self.job = job
+        self.metadata = None
+        self.documents_emitted = 0
+
+
 class PDFService:
+    """
+    Ingestion, search and summarization over the PDF collections.
+
+    Concurrency model: one instance is shared by every gRPC worker thread. The instance
+    only holds read-only resources (templates, the spaCy pipeline, the page extractor
+    pool); per-request ingestion state lives in an IngestionContext. At most
+    `ingestion.max_concurrent_ingestions` ingestions run at once, further callers
+    wait for a free slot. Search and Summarize are not limited.
+
+    The spaCy pipeline and the cross-encoder are loaded on first use, or ahead of time
+    by the server's warm-up, so constructing the service is cheap.
+    """
     SOURCE_PATTERN = r'(https?://[^\s]+|www\.[^\s]+)'
     ISSN_PATTERN = r'ISSN:\s*[^\s]+'
     TITLE_PATTERN = r'^\s*([^\n]+)\s*$'
     AUTHOR_PATTERN = r'^\s*(?:\d+\s*)?(author[s]?:?)\s*\n*(.+)$'
     KEYWORD_PATTERN = r'^Keywords:\s*(.*)$'
 
-    def __init__(self):
-        self.check_model_downloaded()
+    def __init__(self, max_concurrent_ingestions: int = config['max_concurrent_ingestions']):
         self.__system_template = self.load_file(PROMPT_DIR / "system_template.txt")
         self.__user_template = self.load_file(PROMPT_DIR / "user_template.txt")
-        self.__nlp = spacy.load("en_core_web_sm")
+        self.__get_preprocessor = lazy(self.load_preprocessor)
+        self.__page_extractor = PageExtractor()
         self.source_pattern = self.SOURCE_PATTERN
         self.issn_pattern = self.ISSN_PATTERN
         self.title_pattern = self.TITLE_PATTERN
         self.author_pattern = self.AUTHOR_PATTERN
         self.keyword_pattern = self.KEYWORD_PATTERN
-        self.source = ''
-        self.title = ''
-        self.metadata = None
-        self.cleandocs = []
+        self.__ingestion_slots = threading.BoundedSemaphore(max_concurrent_ingestions)
+        self.__search_cache = LRUCache(search_cache_config['max_size'], search_cache_config['ttl_seconds'])
+        self.__get_reranker = lazy(CrossEncoderReranker) if rerank_config['enabled'] else None
+        self.__rerank_candidates = rerank_config['candidates']
+        self.__rerank_top_k = rerank_config['top_k']
+        self.__rerank_budget_seconds = rerank_config['budget_ms'] / 1000 if rerank_config['budget_ms'] else None
+        self.__context_builder = ContextBuilder()
+        self.__get_completions = lazy(lambda: ConcurrencyLimitedCompletions(get_groq_client()))
+        self.__map_reducer = MapReduceSummarizer(self.__get_completions)
+        self.__get_answer_cache = lazy(build_answer_cache)
+
+    def load_preprocessor(self) -> TextPreprocessor:
+        self.check_model_downloaded()
+        return TextPreprocessor()
+
+    @property
+    def preprocessor(self) -> TextPreprocessor:
+        return self.__get_preprocessor()
+
+    @property
+    def reranker_enabled(self) -> bool:
+        return self.__get_reranker is not None
+
+    @property
+    def reranker(self) -> Union[CrossEncoderReranker, None]:
+        return self.__get_reranker() if self.reranker_enabled else None
+
     @staticmethod
     def load_file(path: pathlib.Path):
         with open(str(path), 'r') as file:
@@ -82,6 +167,8 @@ class PDFService:
         Returns:
         tuple: A tuple containing the source URL and title.
         """
+        source = ''
+        title = ''
 
         try:
             source = re.search(self.source_pattern, text).group(0)
@@ -169,110 +256,583 @@ class PDFService:
         return filtered_metadata
 
     def lemmatize(self, token):
-        tag = token.tag_
-        if tag.startswith('NN') or tag.startswith('VB') or tag.startswith('RB') or tag.startswith('JJ'):
-            return token.lemma_
-        return token.text
+        return TextPreprocessor.lemmatize(token)
     
-    def clean_text(
+    @staticmethod
+    def with_next(items: Iterable[Any]) -> Iterator[Tuple[Any, Any]]:
+        """
+        Pair every item of a stream with the item that follows it (None for the last one).
+        """
+        items = iter(items)
+        current = next(items, None)
+        for following in items:
+            yield current, following
+            current = following
+        if current is not None:
+            yield current, None
+
+    def iter_pages(self, context: IngestionContext) -> Iterator[Document]:
+        job = context.job
+        if job is not None:
+            job.set_stage("parsing")
+        for page in self.__page_extractor.extract(context.filepath):
+            yield page
+            if job is not None:
+                job.add_pages_parsed(1)
+                job.raise_if_cancelled()
+
+    def iter_clean_text(
             self,
             document_type: str,
             collection_name: str, 
-            filepath: str
-        ):
-        loader = PyMuPDFLoader(filepath)
-        documents = loader.load()
+            filepath: str,
+            job=None
+        ) -> Iterator[Document]:
+        """
+        Lazily turn a PDF into cleaned, lemmatized Documents ready to be embedded.
 
+        Pages, chunks and spaCy batches are streamed, so only a bounded window of the
+        document is held in memory at a time.
+
+        Parameters:
+        document_type (str): The document type stored in the chunk metadata.
+        collection_name (str): The collection name stored in the chunk metadata.
+        filepath (str): Path of the PDF.
+        job (IngestionJob): Optional job receiving page progress and cancellation.
+
+        Returns:
+        Iterator[Document]: The cleaned chunks, in document order.
+        """
+        return self.clean_documents(IngestionContext(collection_name, document_type, filepath, job))
+
+    def clean_documents(self, context: IngestionContext) -> Iterator[Document]:
         text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-        chunks = text_splitter.split_documents(documents)
+        chunks = (
+            chunk
+            for page in self.iter_pages(context)
+            for chunk in text_splitter.split_documents([page])
+        )
+        chunk_texts = (
+            (chunk.page_content, (i, chunk, next_chunk))
+            for i, (chunk, next_chunk) in enumerate(self.with_next(chunks))
+        )
 
+        # Metadata is refreshed at the start of every batch of chunks that begins on the first page
         batch_size = 20
-        for i in range(0, len(chunks), batch_size):
-            batch = chunks[i:i + batch_size]
-            print(batch)
-
-            metadata = self.clean_metadata(
-                batch[0].metadata,
-                batch[0].page_content,
-                batch[1].page_content
-            ) if batch[0].metadata.get("page") == 0 else metadata
-
-            for chunk in batch:
-                doc = self.__nlp(chunk.page_content)
-                tokens = (' '.join(self.lemmatize(token) for token in doc if not token.is_stop and not token.is_punct and not token.is_space))
-
-                # Split the tokens into chunks and generate a new ID for each chunk
-                token_chunks = text_splitter.split_text(tokens)
-                for token_chunk in token_chunks:
-                    _id = self.generate_id(token_chunk)
-                    metadata['document_type'] = document_type
-                    metadata['_collection_name'] = collection_name
-                    metadata['_id'] = _id
-
-                    self.cleandocs.append(Document(
-                        page_content=token_chunk,
-                        metadata=metadata.copy()
-                    ))
-
-        return self.cleandocs
+        for tokens, (i, chunk, next_chunk) in self.preprocessor.pipe_with_context(chunk_texts):
+            if context.metadata is None or (i % batch_size == 0 and chunk.metadata.get("page") == 0):
+                context.metadata = self.clean_metadata(
+                    chunk.metadata,
+                    chunk.page_content,
+                    next_chunk.page_content if next_chunk is not None else ''
+                )
+                context.metadata['document_type'] = context.document_type
+                context.metadata['_collection_name'] = context.collection_name
+
+            # Split the tokens into chunks and generate a new ID for each chunk
+            token_chunks = text_splitter.split_text(tokens)
+            for token_chunk in token_chunks:
+                metadata = context.metadata.copy()
+                # The document-level metadata comes from the first page; the location is the chunk's own
+                metadata['page'] = chunk.metadata.get('page', metadata.get('page'))
+                metadata['file_path'] = chunk.metadata.get('file_path', metadata.get('file_path'))
+                metadata['_id'] = self.generate_id(token_chunk)
+                context.documents_emitted += 1
+
+                yield Document(
+                    page_content=token_chunk,
+                    metadata=metadata
+                )
+
+    def clean_text(
+            self,
+            document_type: str,
+            collection_name: str, 
+            filepath: str,
+            job=None
+        ) -> List[Document]:
+        return list(self.iter_clean_text(document_type, collection_name, filepath, job))
     
     def embed_document(
             self,
             collection_name: Union[str, None],
             filename: Union[str, None],
-            document_type: Union[str, None]
+            document_type: Union[str, None],
+            filepath: Union[str, None] = None,
+            job=None
         ):
         """
         Upload and encode PDF document.
+
+        The document is read from `filepath` when given (e.g. a spooled upload),
+        otherwise from the uploads directory. When run from the ingestion queue,
+        `job` receives per-stage progress and may cancel the pipeline.
         """
         if not collection_name or not filename or not document_type:
             logger.error(f"Please specify the collection, filename, and document_type")
             return
-        filepath = str(BASE_DIR / "src" / "pdf" /"uploads" / filename)
-        documents = self.clean_text(document_type, collection_name, filepath)
-        try:
-            vector_db.run(documents)
-            logger.info(f"{filename} embedded and inserted successfully")
-        except Exception as ex:
-            logger.error(f"{filename} not inserted {ex}")
+        if filepath is None:
+            filepath = str(BASE_DIR / "src" / "pdf" /"uploads" / filename)
+        context = IngestionContext(collection_name, document_type, filepath, job)
+        if job is not None:
+            job.set_stage("waiting")
+        with self.__ingestion_slots:
+            try:
+                get_vector_db().run(self.clean_documents(context), progress=job)
+                logger.info(f"{filename} embedded and inserted successfully ({context.documents_emitted} chunks)")
+            except Exception as ex:
+                logger.error(f"{filename} not inserted {ex}")
+                # Points may have been upserted without the generation being bumped
+                self.__search_cache.clear()
+                raise
         
         return {"message": f"{filename} embedded successfully"}
     
+    def search_cache_key(
+            self,
+            query,
+            filters: Dict[str, MatchAnyOrInterval] = None,
+            limit: int = None,
+            search_mode: str = None,
+            hnsw_ef: int = None,
+            rerank_top_k: int = None
+        ):
+        vector_db = get_vector_db()
+        return (
+            vector_db.collection_name,
+            vector_db.normalize_query(query),
+            vector_db.filter_key(filters),
+            limit or vector_db.limit,
+            vector_db.is_hybrid(search_mode),
+            vector_db.search_params(search_mode, hnsw_ef).model_dump_json(),
+            rerank_top_k
+        )
+
+    def rerank_limits(self, limit: int = None):
+        """
+        Number of hits to fetch and number to keep after reranking. Without a reranker,
+        the requested limit is fetched and nothing is reranked.
+        """
+        if not self.reranker_enabled:
+            return limit, None
+        top_k = limit or self.__rerank_top_k
+        return max(self.__rerank_candidates, top_k), top_k
+
+    def rerank(self, query, result: List[Document], top_k: int, started: float):
+        """
+        Rerank search hits with the cross-encoder within what is left of the latency budget.
+
+        Returns:
+        tuple: The documents to return, and whether they were fully reranked (and may be cached).
+        """
+        if top_k is None:
+            return result, True
+        budget = None
+        if self.__rerank_budget_seconds is not None:
+            budget = max(0.0, self.__rerank_budget_seconds - (time.perf_counter() - started))
+        return self.reranker.rerank(query, result, top_k, budget)
+
+    def lexical_query(self, query, search_mode: str = None):
+        """
+        Normalize a query like the chunk text for the BM25 half of a hybrid search,
+        so that its terms match the lemmatized, stopword-free chunks.
+        """
+        if not get_vector_db().is_hybrid(search_mode):
+            return None
+        return self.preprocessor.normalize(self.preprocessor.nlp(query))
+
+    def cached_search(self, cache_key, generation):
+        if generation is None:
+            return None
+        cached = self.__search_cache.get(cache_key)
+        if cached is not None and cached[0] == generation:
+            return cached[1]
+        return None
+
+    def cache_search(self, cache_key, generation, result):
+        vector_db = get_vector_db()
+        logger.info(
+            f"Results retrieved successfully (query cache: {vector_db.query_cache_stats()}, "
+            f"query encoder: {vector_db.query_encoder_stats()})"
+        )
+        response = {"data":[json.dumps(doc.dict()) for doc in result]}
+        if generation is not None:
+            self.__search_cache.put(cache_key, (generation, response))
+        return response
+
     def search(
             self, 
             query,
-            filters: Dict[str, MatchAnyOrInterval] = None
+            filters: Dict[str, MatchAnyOrInterval] = None,
+            search_mode: str = None,
+            hnsw_ef: int = None,
+            limit: int = None
         ):
         """
         Search for a document using the vector database.
+
+        Results are cached by query, compiled filter, limit and search parameters. Every
+        entry is stamped with the collection generation it was computed at, so any upsert
+        invalidates it. `search_mode`, `hnsw_ef` and `limit` default to the `qdrant` config.
+
+        With reranking enabled, `rerank.candidates` hits (or `limit`, if larger) are fetched
+        and the best `limit` of them, `rerank.top_k` by default, are kept. Results that had to skip reranking to stay within
+        the latency budget are not cached.
+        """
+        return self.search_with_generation(query, filters, search_mode, hnsw_ef, limit)[1]
+
+    def search_with_generation(
+            self,
+            query,
+            filters: Dict[str, MatchAnyOrInterval] = None,
+            search_mode: str = None,
+            hnsw_ef: int = None,
+            limit: int = None
+        ):
+        """
+        Like `search`, but also returns the collection generation the result was read at
+        (None when unknown), so callers can stamp derived cache entries without reading
+        it again.
         """
         if not query:
             logger.error(f"Please specify the query")
-            return
-        result = vector_db.search(query, filters)
-        logger.info("Results retrieved successfully")
-        
-        return {"data":[json.dumps(doc.dict()) for doc in result]}
+            return None, None
+        started = time.perf_counter()
+        limit, top_k = self.rerank_limits(limit)
+        cache_key = self.search_cache_key(query, filters, limit, search_mode, hnsw_ef, top_k)
+        vector_db = get_vector_db()
+        generation = vector_db.collection_generation()
+        cached = self.cached_search(cache_key, generation)
+        if cached is not None:
+            return generation, cached
+
+        result = vector_db.search(query, filters, search_mode, hnsw_ef, self.lexical_query(query, search_mode), limit)
+        result, reranked = self.rerank(query, result, top_k, started)
+        return generation, self.cache_search(cache_key, generation if reranked else None, result)
+
+    def search_batch(
+            self,
+            queries: List[Tuple[str, Dict[str, MatchAnyOrInterval], int]],
+            search_mode: str = None,
+            hnsw_ef: int = None
+        ):
+        """
+        Search for several queries at once.
+
+        Cached results are served as in `search`; the remaining queries are encoded in one
+        batch and sent to Qdrant in a single request.
+
+        Parameters:
+        queries (list): (query, filters, limit) triples; a limit of 0 or None uses the default limit.
+        search_mode (str): Search mode of every query; defaults to the configured mode.
+        hnsw_ef (int): HNSW candidate list size; defaults to the configured value.
+
+        Returns:
+        list: One search result per query, in request order (None for an empty query).
+        """
+        started = time.perf_counter()
+        results = [None] * len(queries)
+        vector_db = get_vector_db()
+        generation = vector_db.collection_generation()
+        pending = []
+        for index, (query, filters, limit) in enumerate(queries):
+            if not query:
+                logger.error(f"Please specify the query (batch index {index})")
+                continue
+            limit, top_k = self.rerank_limits(limit)
+            cache_key = self.search_cache_key(query, filters, limit, search_mode, hnsw_ef, top_k)
+            cached = self.cached_search(cache_key, generation)
+            if cached is not None:
+                results[index] = cached
+            else:
+                pending.append((index, cache_key, (query, filters, limit), top_k))
+
+        if pending:
+            pending_queries = [search_query for _, _, search_query, _ in pending]
+            lexical_queries = None
+            if vector_db.is_hybrid(search_mode):
+                lexical_queries = list(self.preprocessor.pipe(query for query, _, _ in pending_queries))
+            batch_result = vector_db.search_batch(pending_queries, search_mode, hnsw_ef, lexical_queries)
+            for (index, cache_key, (query, _, _), top_k), result in zip(pending, batch_result):
+                result, reranked = self.rerank(query, result, top_k, started)
+                results[index] = self.cache_search(cache_key, generation if reranked else None, result)
+
+        return results
+
+    async def asearch(
+            self, 
+            query,
+            filters: Dict[str, MatchAnyOrInterval] = None,
+            search_mode: str = None,
+            hnsw_ef: int = None,
+            limit: int = None
+        ):
+        """
+        Non-blocking `search` for the grpc.aio server, sharing the same result cache.
+        """
+        return (await self.asearch_with_generation(query, filters, search_mode, hnsw_ef, limit))[1]
+
+    async def asearch_with_generation(
+            self,
+            query,
+            filters: Dict[str, MatchAnyOrInterval] = None,
+            search_mode: str = None,
+            hnsw_ef: int = None,
+            limit: int = None
+        ):
+        if not query:
+            logger.error(f"Please specify the query")
+            return None, None
+        started = time.perf_counter()
+        limit, top_k = self.rerank_limits(limit)
+        cache_key = self.search_cache_key(query, filters, limit, search_mode, hnsw_ef, top_k)
+        vector_db = get_vector_db()
+        generation = await vector_db.acollection_generation()
+        cached = self.cached_search(cache_key, generation)
+        if cached is not None:
+            return generation, cached
+
+        lexical_query = None
+        if vector_db.is_hybrid(search_mode):
+            # The spaCy pipeline is CPU-bound, so it runs off the event loop
+            lexical_query = await asyncio.get_running_loop().run_in_executor(
+                None, self.lexical_query, query, search_mode)
+        result = await vector_db.asearch(query, filters, search_mode, hnsw_ef, lexical_query, limit)
+        # Cross-encoder scoring is CPU-bound, so it runs off the event loop
+        result, reranked = await asyncio.get_running_loop().run_in_executor(
+            None, self.rerank, query, result, top_k, started)
+        return generation, self.cache_search(cache_key, generation if reranked else None, result)
     
+    @property
+    def answer_cache(self) -> Union[SemanticAnswerCache, None]:
+        return self.__get_answer_cache()
+
+    def answer_cache_key(self, filters, result):
+        """
+        Key of the semantic answer cache for a search result, or None when the answer
+        cannot be cached (cache disabled or no results).
+        """
+        if self.answer_cache is None or not result or not result["data"]:
+            return None
+        vector_db = get_vector_db()
+        chunk_ids = [json.loads(doc)["metadata"].get("_id") or "" for doc in result["data"]]
+        return self.answer_cache.key(vector_db.collection_name, vector_db.filter_key(filters), chunk_ids)
+
+    def answer_lookup(self, filters, result, generation, mode: str, user_id: str) -> Union[AnswerLookup, None]:
+        """
+        Prepare the answer cache lookup of a Summarize, read in the same Redis round trip
+        as the conversation history; the entries are only sent back when the user has no
+        history yet. Map-reduce answers are not cached (their map stage has its own
+        cache), nor are results whose collection generation is unknown.
+        """
+        cache_key = self.answer_cache_key(filters, result) if mode != MAP_REDUCE_MODE else None
+        if cache_key is None or generation is None:
+            return None
+        return self.answer_cache.lookup(cache_key, generation, ConversationMemory.keys(user_id))
+
+    def __cached_answer(self, lookup: AnswerLookup, query_vector):
+        answer = lookup.answer(query_vector)
+        if answer is not None:
+            logger.info(f"Answer served from the semantic cache ({self.answer_cache.stats()})")
+        return answer, lambda generated: lookup.write_steps(query_vector, generated)
+
+    def cached_answer(self, lookup: Union[AnswerLookup, None], ai_init: AIGenerator, query: str):
+        """
+        Only the first turn of a conversation is answered from the cache, since later
+        answers depend on the history; the query is only encoded for first turns.
+
+        Returns:
+        tuple: The cached answer or None, and the steps storing a generated answer (None
+        when it must not be cached).
+        """
+        if lookup is None or not ai_init.is_first_turn:
+            return None, None
+        return self.__cached_answer(lookup, get_vector_db().encode_query(query))
+
+    async def acached_answer(self, lookup: Union[AnswerLookup, None], ai_init: AIGenerator, query: str):
+        if lookup is None or not ai_init.is_first_turn:
+            return None, None
+        return self.__cached_answer(lookup, await get_vector_db().aencode_query(query))
+
+    def log_redis_latency(self):
+        logger.info(f"Redis latency: {redis_latency.stats()}")
+
+    def summary_mode(self, summarize_mode: str = None):
+        """
+        The summarize mode to use, the number of hits it reads and the answer length.
+        """
+        mode = summarize_mode or summarize_config['mode']
+        if mode == MAP_REDUCE_MODE:
+            return mode, summarize_config['map_reduce_candidates'], summarize_config['reduce_max_tokens']
+        return mode, None, summarize_config['answer_max_tokens']
+
+    def summary_context(self, result, mode: str) -> str:
+        """
+        The prompt context: the packed chunks, or in map-reduce mode the partial
+        summaries of every retrieved chunk.
+        """
+        if mode == MAP_REDUCE_MODE:
+            return self.__map_reducer.summarize([json.loads(doc) for doc in result["data"]] if result else [])
+        return self.__context_builder.build_from_search(result)
+
+    async def asummary_context(self, result, mode: str) -> str:
+        if mode == MAP_REDUCE_MODE:
+            # The map stage blocks on many Groq calls, so it runs on the thread pool
+            return await asyncio.get_running_loop().run_in_executor(None, self.summary_context, result, mode)
+        return self.summary_context(result, mode)
+
     def summarize(
         self,
         query: str,
         filters: Dict[str, MatchAnyOrInterval] = None,
-        user_id: str = "test-user"
+        user_id: str = "test-user",
+        summarize_mode: str = None
     ):
+        """
+        Answer a query from the search results. A first question that paraphrases an
+        earlier one asked over the same chunks is served from the semantic answer cache.
+
+        In the default "stuff" mode the best chunks are packed into the prompt. In
+        "map_reduce" mode, `summarize.map_reduce_candidates` chunks are summarized in
+        groups in parallel first, and the answer is written from those summaries.
+
+        The history and the answer cache are read in one Redis round trip, and the new
+        turns and the answer written in another.
+        """
+        mode, limit, max_tokens = self.summary_mode(summarize_mode)
+        generation, result = self.search_with_generation(query, filters, limit=limit)
+        lookup = self.answer_lookup(filters, result, generation, mode, user_id)
         ai_init = AIGenerator(
             system_prompt=self.__system_template,
-            context=self.search(query, filters),
-            client=client,
-            redis_client=redis_client,
+            context=self.summary_context(result, mode),
+            client=get_groq_client(),
+            redis_client=get_redis_client(),
             tools=None,
             names_to_functions=None,
-            user_id=user_id
+            max_tokens=max_tokens,
+            user_id=user_id,
+            read_steps=lookup.read_steps if lookup is not None else None
         )
+        answer, answer_steps = self.cached_answer(lookup, ai_init, query)
+        if answer is not None:
+            summarizer = ai_init.record_answer(self.__user_template, query, answer)
+        else:
+            summarizer = ai_init.run_conversation(
+                self.__user_template,
+                query,
+                answer_steps=answer_steps
+            )
+        self.log_redis_latency()
+
+        return summarizer
 
-        summarizer = ai_init.run_conversation(
+    def summarize_stream(
+        self,
+        query: str,
+        filters: Dict[str, MatchAnyOrInterval] = None,
+        user_id: str = "test-user",
+        summarize_mode: str = None
+    ):
+        """
+        Like `summarize`, but yields the answer as token deltas while Groq generates it.
+        A cached answer is yielded as a single delta; only complete answers are cached.
+        """
+        mode, limit, max_tokens = self.summary_mode(summarize_mode)
+        generation, result = self.search_with_generation(query, filters, limit=limit)
+        lookup = self.answer_lookup(filters, result, generation, mode, user_id)
+        ai_init = AIGenerator(
+            system_prompt=self.__system_template,
+            context=self.summary_context(result, mode),
+            client=get_groq_client(),
+            redis_client=get_redis_client(),
+            tools=None,
+            names_to_functions=None,
+            max_tokens=max_tokens,
+            user_id=user_id,
+            read_steps=lookup.read_steps if lookup is not None else None
+        )
+        answer, answer_steps = self.cached_answer(lookup, ai_init, query)
+        if answer is not None:
+            return (delta for delta in [ai_init.record_answer(self.__user_template, query, answer)])
+
+        return ai_init.stream_conversation(
             self.__user_template,
-            query
+            query,
+            answer_steps=answer_steps
         )
 
-        return summarizer
\ No newline at end of file
+    async def asummarize(
+        self,
+        query: str,
+        filters: Dict[str, MatchAnyOrInterval] = None,
+        user_id: str = "test-user",
+        summarize_mode: str = None
+    ):
+        """
+        Non-blocking `summarize` for the grpc.aio server.
+        """
+        mode, limit, max_tokens = self.summary_mode(summarize_mode)
+        generation, result = await self.asearch_with_generation(query, filters, limit=limit)
+        lookup = self.answer_lookup(filters, result, generation, mode, user_id)
+        ai_init = AsyncAIGenerator(
+            system_prompt=self.__system_template,
+            context=await self.asummary_context(result, mode),
+            client=get_async_groq_client(),
+            redis_client=get_async_redis_client(),
+            tools=None,
+            names_to_functions=None,
+            max_tokens=max_tokens,
+            user_id=user_id,
+            read_steps=lookup.read_steps if lookup is not None else None
+        )
+        await ai_init.aload_messages()
+        answer, answer_steps = await self.acached_answer(lookup, ai_init, query)
+        if answer is not None:
+            summarizer = await ai_init.arecord_answer(self.__user_template, query, answer)
+        else:
+            summarizer = await ai_init.arun_conversation(
+                self.__user_template,
+                query,
+                answer_steps=answer_steps
+            )
+        self.log_redis_latency()
+
+        return summarizer
+
+    async def asummarize_stream(
+        self,
+        query: str,
+        filters: Dict[str, MatchAnyOrInterval] = None,
+        user_id: str = "test-user",
+        summarize_mode: str = None
+    ):
+        """
+        Non-blocking `summarize_stream` for the grpc.aio server.
+        """
+        mode, limit, max_tokens = self.summary_mode(summarize_mode)
+        generation, result = await self.asearch_with_generation(query, filters, limit=limit)
+        lookup = self.answer_lookup(filters, result, generation, mode, user_id)
+        ai_init = AsyncAIGenerator(
+            system_prompt=self.__system_template,
+            context=await self.asummary_context(result, mode),
+            client=get_async_groq_client(),
+            redis_client=get_async_redis_client(),
+            tools=None,
+            names_to_functions=None,
+            max_tokens=max_tokens,
+            user_id=user_id,
+            read_steps=lookup.read_steps if lookup is not None else None
+        )
+        await ai_init.aload_messages()
+        answer, answer_steps = await self.acached_answer(lookup, ai_init, query)
+        if answer is not None:
+            yield await ai_init.arecord_answer(self.__user_template, query, answer)
+            return
+
+        stream = ai_init.astream_conversation(self.__user_template, query, answer_steps=answer_steps)
+        try:
+            async for delta in stream:
+                yield delta
+        finally:
+            # Saves the partial answer now rather than when the generator is collected
+            await stream.aclose()
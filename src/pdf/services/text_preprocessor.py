@@ -0,0 +1,80 @@
+import pathlib
+import sys
+
+current_dir = pathlib.Path(__file__).parent
+previous_dir = current_dir.parent.parent.parent
+sys.path.append(str(previous_dir))
+
+import spacy
+from typing import Iterable, Iterator, List, Tuple, Any
+from config.config_helper import Configuration
+from config.logger import Logger
+
+logger = Logger(__name__)
+
+config = Configuration().get_config('preprocessing')
+
+
+class TextPreprocessor:
+    """
+    Lemmatize and strip stopwords, punctuation and whitespace from chunk text.
+
+    Only the tagger, attribute ruler and lemmatizer are needed for this, so the
+    parser and NER are excluded when the spaCy model is loaded, and texts are
+    streamed through `nlp.pipe` instead of being processed one at a time.
+    """
+    EXCLUDED_COMPONENTS = ["parser", "ner"]
+
+    def __init__(
+            self,
+            model_name: str = config['spacy_model'],
+            batch_size: int = config['batch_size'],
+            n_process: int = config['n_process'],
+            exclude: List[str] = EXCLUDED_COMPONENTS
+        ):
+        self.nlp = spacy.load(model_name, exclude=exclude)
+        self.__batch_size = batch_size
+        self.__n_process = n_process
+        logger.info(f"Loaded '{model_name}' with components {self.nlp.pipe_names}")
+
+    @staticmethod
+    def lemmatize(token):
+        tag = token.tag_
+        if tag.startswith('NN') or tag.startswith('VB') or tag.startswith('RB') or tag.startswith('JJ'):
+            return token.lemma_
+        return token.text
+
+    def normalize(self, doc) -> str:
+        """
+        Join the lemmatized tokens of a processed doc, skipping stopwords, punctuation and spaces.
+        """
+        return ' '.join(
+            self.lemmatize(token) for token in doc
+            if not token.is_stop and not token.is_punct and not token.is_space
+        )
+
+    def pipe(self, texts: Iterable[str]) -> Iterator[str]:
+        """
+        Normalize a stream of texts in batches, yielding results in input order.
+
+        :param texts: The chunk texts to normalize.
+        :return: An iterator over the normalized texts.
+        """
+        for doc in self.nlp.pipe(texts, batch_size=self.__batch_size, n_process=self.__n_process):
+            yield self.normalize(doc)
+
+    def pipe_with_context(self, items: Iterable[Tuple[str, Any]]) -> Iterator[Tuple[str, Any]]:
+        """
+        Like `pipe`, but for (text, context) pairs, so callers can stream their own
+        objects alongside the texts.
+
+        :param items: The (text, context) pairs to normalize.
+        :return: An iterator over (normalized text, context) pairs.
+        """
+        for doc, context in self.nlp.pipe(
+                items,
+                as_tuples=True,
+                batch_size=self.__batch_size,
+                n_process=self.__n_process
+            ):
+            yield self.normalize(doc), context
@@ -0,0 +1,88 @@
+import pathlib
+import sys
+
+current_dir = pathlib.Path(__file__).parent
+previous_dir = current_dir.parent.parent.parent
+sys.path.append(str(previous_dir))
+
+import os
+import hashlib
+import tempfile
+from config import BASE_DIR
+from config.config_helper import Configuration
+from config.logger import Logger
+
+logger = Logger(__name__)
+
+config = Configuration().get_config('upload')
+
+
+class UploadTooLargeError(ValueError):
+    pass
+
+
+class PDFUploadSpool:
+    """
+    Spool the byte frames of a client-streamed PDF upload to a temporary file,
+    keeping a running SHA-256 checksum and enforcing a size cap as frames arrive.
+    """
+
+    def __init__(
+            self,
+            spool_dir: str = config['spool_dir'],
+            max_file_size_mb: int = config['max_file_size_mb']
+        ):
+        spool_path = pathlib.Path(spool_dir)
+        if not spool_path.is_absolute():
+            spool_path = BASE_DIR / spool_path
+        os.makedirs(spool_path, exist_ok=True)
+
+        self.__max_size_bytes = int(max_file_size_mb * 1024 * 1024)
+        self.__file = tempfile.NamedTemporaryFile(dir=str(spool_path), suffix=".pdf", delete=False)
+        self.__checksum = hashlib.sha256()
+        self.size_bytes = 0
+
+    @property
+    def path(self) -> str:
+        return self.__file.name
+
+    @property
+    def sha256(self) -> str:
+        return self.__checksum.hexdigest()
+
+    def write(self, chunk: bytes) -> None:
+        """
+        Append a frame to the spool file and update the running checksum.
+
+        :param chunk: The bytes carried by one UploadPDFRequest frame.
+        """
+        if self.size_bytes + len(chunk) > self.__max_size_bytes:
+            raise UploadTooLargeError(
+                f"Upload exceeds the maximum file size of {self.__max_size_bytes} bytes"
+            )
+        self.__file.write(chunk)
+        self.__checksum.update(chunk)
+        self.size_bytes += len(chunk)
+
+    def close(self, expected_sha256: str = "") -> str:
+        """
+        Flush the spool file and verify it against the client supplied checksum.
+
+        :param expected_sha256: Optional hex SHA-256 digest sent by the client.
+        :return: The path of the spooled PDF.
+        """
+        self.__file.close()
+        if not self.size_bytes:
+            raise ValueError("Uploaded file is empty")
+        if expected_sha256 and expected_sha256.lower() != self.sha256:
+            raise ValueError(f"Checksum mismatch: expected {expected_sha256}, received {self.sha256}")
+        logger.info(f"Spooled {self.size_bytes} bytes to {self.path}")
+        return self.path
+
+    def discard(self) -> None:
+        """
+        Close and remove the spool file.
+        """
+        self.__file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
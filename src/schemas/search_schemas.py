@@ -1,5 +1,5 @@
-from typing import Any, Dict, List, Union
-from pydantic import BaseModel
+from typing import Any, Dict, List, Tuple, Union
+from pydantic import BaseModel, model_validator
 
 class MatchAnyOrInterval(BaseModel):
     any: List[str] = None
@@ -9,4 +9,92 @@ class MatchAnyOrInterval(BaseModel):
     lte: str = None
 
     class Config:
-        arbitrary_types_allowed = True
\ No newline at end of file
+        arbitrary_types_allowed = True
+
+
+class NumericInterval(BaseModel):
+    gt: Union[float, None] = None
+    gte: Union[float, None] = None
+    lt: Union[float, None] = None
+    lte: Union[float, None] = None
+
+    class Config:
+        frozen = True
+
+    @model_validator(mode="after")
+    def check_bounds(self):
+        if self.gt is None and self.gte is None and self.lt is None and self.lte is None:
+            raise ValueError("A range needs at least one of gt, gte, lt or lte")
+        return self
+
+
+class DatetimeInterval(BaseModel):
+    # RFC 3339 timestamps, e.g. "2024-07-17T14:58:34Z"
+    gt: Union[str, None] = None
+    gte: Union[str, None] = None
+    lt: Union[str, None] = None
+    lte: Union[str, None] = None
+
+    class Config:
+        frozen = True
+
+    @model_validator(mode="after")
+    def check_bounds(self):
+        if not (self.gt or self.gte or self.lt or self.lte):
+            raise ValueError("A datetime range needs at least one of gt, gte, lt or lte")
+        return self
+
+
+class FieldFilter(BaseModel):
+    """
+    Conditions on one metadata field; all the conditions that are set must hold.
+    `any` matches one of the values, `all` every value (of an array field) and `none`
+    none of them.
+    """
+    key: str
+    any: Union[Tuple[str, ...], None] = None
+    all: Union[Tuple[str, ...], None] = None
+    none: Union[Tuple[str, ...], None] = None
+    range: Union[NumericInterval, None] = None
+    datetime_range: Union[DatetimeInterval, None] = None
+
+    class Config:
+        frozen = True
+
+    @model_validator(mode="after")
+    def check_conditions(self):
+        if not self.key:
+            raise ValueError("A field filter needs a key")
+        if not (self.any or self.all or self.none or self.range or self.datetime_range):
+            raise ValueError(f"The filter on '{self.key}' has no condition")
+        return self
+
+
+class FilterGroup(BaseModel):
+    """
+    Boolean group of field filters and nested groups: every `must` clause holds, at
+    least one `should` clause holds (when there are any), and no `must_not` clause holds.
+    Frozen and hashable, so compiled filters can be memoized by value.
+    """
+    must: Tuple[Union[FieldFilter, "FilterGroup"], ...] = ()
+    should: Tuple[Union[FieldFilter, "FilterGroup"], ...] = ()
+    must_not: Tuple[Union[FieldFilter, "FilterGroup"], ...] = ()
+
+    class Config:
+        frozen = True
+
+    @classmethod
+    def from_fields(cls, filters: Dict[str, MatchAnyOrInterval]) -> "FilterGroup":
+        """
+        Convert the legacy one-condition-per-field filters.
+        """
+        clauses = []
+        for field, value in filters.items():
+            if value.any is not None:
+                clauses.append(FieldFilter(key=field, any=tuple(value.any)))
+            elif any([value.gt, value.gte, value.lt, value.lte]):
+                clauses.append(FieldFilter(
+                    key=field,
+                    datetime_range=DatetimeInterval(gt=value.gt, gte=value.gte, lt=value.lt, lte=value.lte)
+                ))
+        return cls(must=tuple(clauses))
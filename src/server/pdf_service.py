@@ -6,48 +6,154 @@ previous_dir = current_dir.parent
 sys.path.append(str(previous_dir))
 
 import os
+import time
+import signal
+import argparse
+import asyncio
 from concurrent import futures
 import grpc
+from grpc_health.v1 import health, health_pb2, health_pb2_grpc
 from pdf.services.pdf_service import PDFService
+from pdf.services.upload_spool import PDFUploadSpool, UploadTooLargeError
+from pdf.services.ingestion_queue import (
+    IngestionJob,
+    IngestionQueue,
+    IngestionQueueFull,
+    IngestionJobNotFound
+)
 from google.protobuf.json_format import MessageToDict
 from src.server import pdf_service_pb2
 from src.server import pdf_service_pb2_grpc
 from schemas.search_schemas import MatchAnyOrInterval
-from config import BASE_DIR
-from utils import _parse_filters, _handle_exception
+from config import BASE_DIR, get_groq_client, get_redis_client
+from config.qdrant_client import get_vector_db
+from gen_ai.RAGLLM.context_builder import get_tokenizer
+from config.config_helper import Configuration
+from utils import _parse_request_filters, _check_search_mode, _check_summarize_mode, _handle_exception
 import json
 
 from config.logger import Logger
 logger = Logger(__name__)
 
+config = Configuration().get_config('server')
+
+SERVICE_NAMES = ("", pdf_service_pb2.DESCRIPTOR.services_by_name['PDFService'].full_name)
+
+
+def warm_up(pdf_service: PDFService) -> None:
+    """
+    Load the models and open the connections the first requests would otherwise pay for.
+
+    Components load concurrently, and the time each one took is logged. Redis is
+    optional: when it is unreachable the service still starts, and caching degrades
+    the way it does at request time.
+    """
+    required = {
+        "qdrant+encoder": lambda: get_vector_db().warm_up(),
+        "spacy": lambda: pdf_service.preprocessor,
+        "groq": get_groq_client,
+        "tokenizer": get_tokenizer,
+    }
+    if pdf_service.reranker_enabled:
+        required["cross-encoder"] = lambda: pdf_service.reranker
+    optional = {"redis": lambda: get_redis_client().ping()}
+
+    def timed(load):
+        started = time.perf_counter()
+        load()
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    components = {**required, **optional}
+    with futures.ThreadPoolExecutor(max_workers=len(components), thread_name_prefix="warm-up") as executor:
+        pending = {name: executor.submit(timed, load) for name, load in components.items()}
+        failed = []
+        for name, future in pending.items():
+            try:
+                logger.info(f"Warmed up {name} in {future.result() * 1000:.0f} ms")
+            except Exception as ex:
+                if name in optional:
+                    logger.warning(f"Could not warm up {name}: {str(ex)}")
+                else:
+                    logger.error(f"Could not warm up {name}: {str(ex)}")
+                    failed.append(name)
+    if failed:
+        raise RuntimeError(f"Warm-up failed for {', '.join(failed)}")
+    logger.info(f"Warm-up completed in {(time.perf_counter() - started) * 1000:.0f} ms")
+
 
 class PDFServiceServicer(pdf_service_pb2_grpc.PDFServiceServicer):
     def __init__(self):
         self.pdf_service = PDFService()
+        self.ingestion_queue = IngestionQueue(self._run_ingestion_job)
+
+    def _run_ingestion_job(self, job):
+        return self.pdf_service.embed_document(
+            job.collection_name,
+            job.filename,
+            job.document_type,
+            filepath=job.filepath,
+            job=job
+        )
+
     def UploadPDF(self, request_iterator, context):
+        spool = None
         try:
             collection_name = ""
             document_type = ""
             filename = ""
+            sha256 = ""
 
             for request in request_iterator:
-                collection_name = request.collection_name
-                document_type = request.document_type
-                filename = request.filename
+                collection_name = request.collection_name or collection_name
+                document_type = request.document_type or document_type
+                filename = request.filename or filename
+                sha256 = request.sha256 or sha256
+                if request.chunk:
+                    if spool is None:
+                        spool = PDFUploadSpool()
+                    spool.write(request.chunk)
 
             if not filename:
                 raise ValueError("Filename cannot be empty")
-            filepath = str(BASE_DIR / "src" / "pdf" / "uploads" / filename)
-            
-            if not os.path.exists(filepath):
-                raise FileNotFoundError(f"File {filename} does not exist in the uploads directory")
+            if not collection_name or not document_type:
+                raise ValueError("collection_name and document_type cannot be empty")
+            filename = os.path.basename(filename)
 
-            result = self.pdf_service.embed_document(
+            if spool is not None:
+                filepath = spool.close(sha256)
+            else:
+                filepath = str(BASE_DIR / "src" / "pdf" / "uploads" / filename)
+                if not os.path.exists(filepath):
+                    raise FileNotFoundError(f"File {filename} does not exist in the uploads directory")
+
+            job = IngestionJob(
                 collection_name,
                 filename,
-                document_type
+                document_type,
+                filepath=filepath,
+                on_finished=spool.discard if spool is not None else None
+            )
+            self.ingestion_queue.submit(job)
+            response = pdf_service_pb2.UploadPDFResponse(
+                message=f"{filename} queued for ingestion",
+                sha256=spool.sha256 if spool is not None else "",
+                size_bytes=spool.size_bytes if spool is not None else 0,
+                job_id=job.job_id
             )
-            return pdf_service_pb2.UploadPDFResponse(message=result["message"])
+            # The queued job removes the spool file once it has finished.
+            spool = None
+            return response
+        except IngestionQueueFull as iqf:
+            logger.error(f"IngestionQueueFull in UploadPDF: {str(iqf)}")
+            context.set_details(str(iqf))
+            context.set_code(grpc.StatusCode.RESOURCE_EXHAUSTED)
+            return pdf_service_pb2.UploadPDFResponse()
+        except UploadTooLargeError as utle:
+            logger.error(f"UploadTooLargeError in UploadPDF: {str(utle)}")
+            context.set_details(str(utle))
+            context.set_code(grpc.StatusCode.RESOURCE_EXHAUSTED)
+            return pdf_service_pb2.UploadPDFResponse()
         except ValueError as ve:
             logger.error(f"ValueError in UploadPDF: {str(ve)}")
             context.set_details(str(ve))
@@ -60,36 +166,238 @@ class PDFServiceServicer(pdf_service_pb2_grpc.PDFServiceServicer):
             return pdf_service_pb2.UploadPDFResponse()
         except Exception as ex:
             return _handle_exception("UploadPDF", context, ex)
+        finally:
+            if spool is not None:
+                spool.discard()
 
     def Search(self, request, context):
         try:
-            filters = _parse_filters(request.filters)
+            filters = _parse_request_filters(request, context)
             if filters is None:
-                context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
                 return pdf_service_pb2.SearchResponse()
-            result = self.pdf_service.search(query=request.query, filters=filters)
+            if not _check_search_mode(request.search_mode, context):
+                return pdf_service_pb2.SearchResponse()
+            result = self.pdf_service.search(query=request.query, filters=filters,
+                search_mode=request.search_mode or None, hnsw_ef=request.hnsw_ef or None)
             return pdf_service_pb2.SearchResponse(search_result=json.dumps(result), message="Search completed")
         except Exception as ex:
             return _handle_exception("Search", context, ex)
 
+    def SearchBatch(self, request, context):
+        try:
+            if not _check_search_mode(request.search_mode, context):
+                return pdf_service_pb2.SearchBatchResponse()
+            queries = []
+            for index, search_query in enumerate(request.queries):
+                if not search_query.query:
+                    context.set_details(f"Empty query at index {index}")
+                    context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+                    return pdf_service_pb2.SearchBatchResponse()
+                if search_query.limit < 0:
+                    context.set_details(f"Negative limit {search_query.limit} for query {index}")
+                    context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+                    return pdf_service_pb2.SearchBatchResponse()
+                filters = _parse_request_filters(search_query, context)
+                if filters is None:
+                    context.set_details(f"Invalid filters for query {index}")
+                    return pdf_service_pb2.SearchBatchResponse()
+                queries.append((search_query.query, filters, search_query.limit))
+            results = self.pdf_service.search_batch(
+                queries, search_mode=request.search_mode or None, hnsw_ef=request.hnsw_ef or None)
+            return pdf_service_pb2.SearchBatchResponse(
+                results=[
+                    pdf_service_pb2.SearchResponse(search_result=json.dumps(result), message="Search completed")
+                    for result in results
+                ],
+                message="Search completed"
+            )
+        except Exception as ex:
+            return _handle_exception("SearchBatch", context, ex)
+
     def Summarize(self, request, context):
         try:
-            filters = _parse_filters(request.filters)
+            filters = _parse_request_filters(request, context)
             if filters is None:
-                context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
                 return pdf_service_pb2.SearchResponse()
-            summarized = self.pdf_service.summarize(query=request.query, filters=filters, user_id=request.user_id)
+            if not _check_summarize_mode(request.summarize_mode, context):
+                return pdf_service_pb2.SummarizeResponse()
+            summarized = self.pdf_service.summarize(query=request.query, filters=filters, user_id=request.user_id,
+                summarize_mode=request.summarize_mode or None)
             return pdf_service_pb2.SummarizeResponse(summary=summarized, message="Summarization completed")
         except Exception as ex:
             return _handle_exception("Summarize", context, ex)
 
+    def SummarizeStream(self, request, context):
+        try:
+            filters = _parse_request_filters(request, context)
+            if filters is None:
+                return
+            if not _check_summarize_mode(request.summarize_mode, context):
+                return
+            deltas = self.pdf_service.summarize_stream(query=request.query, filters=filters, user_id=request.user_id,
+                summarize_mode=request.summarize_mode or None)
+            try:
+                for delta in deltas:
+                    if not context.is_active():
+                        logger.warning("SummarizeStream cancelled by the client")
+                        return
+                    yield pdf_service_pb2.SummarizeChunk(delta=delta)
+            finally:
+                # Closing the generator persists the partial answer when the client cancels
+                deltas.close()
+            yield pdf_service_pb2.SummarizeChunk(done=True, message="Summarization completed")
+        except Exception as ex:
+            _handle_exception("SummarizeStream", context, ex)
+
+    def GetIngestionStatus(self, request, context):
+        try:
+            job = self.ingestion_queue.get(request.job_id)
+            return pdf_service_pb2.IngestionStatusResponse(**job.to_dict())
+        except IngestionJobNotFound as ijnf:
+            context.set_details(str(ijnf))
+            context.set_code(grpc.StatusCode.NOT_FOUND)
+            return pdf_service_pb2.IngestionStatusResponse()
+        except Exception as ex:
+            return _handle_exception("GetIngestionStatus", context, ex)
+
+    def CancelIngestion(self, request, context):
+        try:
+            job = self.ingestion_queue.cancel(request.job_id)
+            return pdf_service_pb2.IngestionStatusResponse(**job.to_dict())
+        except IngestionJobNotFound as ijnf:
+            context.set_details(str(ijnf))
+            context.set_code(grpc.StatusCode.NOT_FOUND)
+            return pdf_service_pb2.IngestionStatusResponse()
+        except Exception as ex:
+            return _handle_exception("CancelIngestion", context, ex)
+
+class AsyncPDFServiceServicer(PDFServiceServicer):
+    """
+    Servicer for the grpc.aio server.
+
+    Search and Summarize are coroutines that await Qdrant, Redis and Groq without holding
+    a thread. The remaining handlers are inherited and run on the server's migration
+    thread pool.
+    """
+    async def Search(self, request, context):
+        try:
+            filters = _parse_request_filters(request, context)
+            if filters is None:
+                return pdf_service_pb2.SearchResponse()
+            if not _check_search_mode(request.search_mode, context):
+                return pdf_service_pb2.SearchResponse()
+            result = await self.pdf_service.asearch(query=request.query, filters=filters,
+                search_mode=request.search_mode or None, hnsw_ef=request.hnsw_ef or None)
+            return pdf_service_pb2.SearchResponse(search_result=json.dumps(result), message="Search completed")
+        except Exception as ex:
+            return _handle_exception("Search", context, ex)
+
+    async def Summarize(self, request, context):
+        try:
+            filters = _parse_request_filters(request, context)
+            if filters is None:
+                return pdf_service_pb2.SearchResponse()
+            if not _check_summarize_mode(request.summarize_mode, context):
+                return pdf_service_pb2.SummarizeResponse()
+            summarized = await self.pdf_service.asummarize(query=request.query, filters=filters, user_id=request.user_id,
+                summarize_mode=request.summarize_mode or None)
+            return pdf_service_pb2.SummarizeResponse(summary=summarized, message="Summarization completed")
+        except Exception as ex:
+            return _handle_exception("Summarize", context, ex)
+
+    async def SummarizeStream(self, request, context):
+        try:
+            filters = _parse_request_filters(request, context)
+            if filters is None:
+                return
+            if not _check_summarize_mode(request.summarize_mode, context):
+                return
+            deltas = self.pdf_service.asummarize_stream(query=request.query, filters=filters, user_id=request.user_id,
+                summarize_mode=request.summarize_mode or None)
+            try:
+                async for delta in deltas:
+                    yield pdf_service_pb2.SummarizeChunk(delta=delta)
+            finally:
+                await deltas.aclose()
+            yield pdf_service_pb2.SummarizeChunk(done=True, message="Summarization completed")
+        except Exception as ex:
+            _handle_exception("SummarizeStream", context, ex)
+
 def serve():
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
-    pdf_service_pb2_grpc.add_PDFServiceServicer_to_server(PDFServiceServicer(), server)
-    server.add_insecure_port('[::]:50051')
+    started = time.perf_counter()
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=config['max_workers']))
+    servicer = PDFServiceServicer()
+    pdf_service_pb2_grpc.add_PDFServiceServicer_to_server(servicer, server)
+    health_servicer = health.HealthServicer()
+    health_pb2_grpc.add_HealthServicer_to_server(health_servicer, server)
+    for service_name in SERVICE_NAMES:
+        health_servicer.set(service_name, health_pb2.HealthCheckResponse.NOT_SERVING)
+    server.add_insecure_port(f"[::]:{config['port']}")
     server.start()
-    logger.info("Rag service started on port 50051")
-    server.wait_for_termination()
+    logger.info(f"Rag service listening on port {config['port']}, warming up...")
+    # The port is bound before warm-up, so health probes see NOT_SERVING rather than a refused connection
+    try:
+        warm_up(servicer.pdf_service)
+    except Exception:
+        server.stop(0)
+        servicer.ingestion_queue.shutdown(wait=False)
+        raise
+    for service_name in SERVICE_NAMES:
+        health_servicer.set(service_name, health_pb2.HealthCheckResponse.SERVING)
+    logger.info(f"Rag service ready on port {config['port']} after {time.perf_counter() - started:.2f} s")
+
+    def stop(signum, frame):
+        # Probes report NOT_SERVING while in-flight requests drain
+        health_servicer.enter_graceful_shutdown()
+        server.stop(config['shutdown_grace_seconds'])
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        server.wait_for_termination()
+    finally:
+        servicer.ingestion_queue.shutdown()
+
+async def serve_async():
+    server = grpc.aio.server(
+        migration_thread_pool=futures.ThreadPoolExecutor(max_workers=config['max_workers']),
+        maximum_concurrent_rpcs=config['aio_maximum_concurrent_rpcs']
+    )
+    started = time.perf_counter()
+    servicer = AsyncPDFServiceServicer()
+    pdf_service_pb2_grpc.add_PDFServiceServicer_to_server(servicer, server)
+    health_servicer = health.aio.HealthServicer()
+    health_pb2_grpc.add_HealthServicer_to_server(health_servicer, server)
+    for service_name in SERVICE_NAMES:
+        await health_servicer.set(service_name, health_pb2.HealthCheckResponse.NOT_SERVING)
+    server.add_insecure_port(f"[::]:{config['port']}")
+    await server.start()
+    logger.info(f"Rag service (grpc.aio) listening on port {config['port']}, warming up...")
+    try:
+        await asyncio.to_thread(warm_up, servicer.pdf_service)
+    except Exception:
+        await server.stop(0)
+        servicer.ingestion_queue.shutdown(wait=False)
+        raise
+    for service_name in SERVICE_NAMES:
+        await health_servicer.set(service_name, health_pb2.HealthCheckResponse.SERVING)
+    logger.info(f"Rag service (grpc.aio) ready on port {config['port']} after {time.perf_counter() - started:.2f} s")
+
+    async def stop():
+        # Probes report NOT_SERVING while in-flight requests drain
+        await health_servicer.enter_graceful_shutdown()
+        await server.stop(config['shutdown_grace_seconds'])
+
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, lambda: asyncio.ensure_future(stop()))
+    try:
+        await server.wait_for_termination()
+    finally:
+        await asyncio.to_thread(servicer.ingestion_queue.shutdown)
 
 if __name__ == '__main__':
-    serve()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--aio", action="store_true", help="Run the asyncio (grpc.aio) server")
+    args = parser.parse_args()
+    if args.aio:
+        asyncio.run(serve_async())
+    else:
+        serve()
\ No newline at end of file
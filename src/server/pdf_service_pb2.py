@@ -14,7 +14,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x11pdf_service.proto\x12\npdfservice\"T\n\x10UploadPDFRequest\x12\x17\n\x0f\x63ollection_name\x18\x01 \x01(\t\x12\x15\n\rdocument_type\x18\x02 \x01(\t\x12\x10\n\x08\x66ilename\x18\x03 \x01(\t\"$\n\x11UploadPDFResponse\x12\x0f\n\x07message\x18\x01 \x01(\t\"/\n\rSearchRequest\x12\r\n\x05query\x18\x01 \x01(\t\x12\x0f\n\x07\x66ilters\x18\x02 \x01(\t\"8\n\x0eSearchResponse\x12\x15\n\rsearch_result\x18\x01 \x01(\t\x12\x0f\n\x07message\x18\x02 \x01(\t\"C\n\x10SummarizeRequest\x12\r\n\x05query\x18\x01 \x01(\t\x12\x0f\n\x07user_id\x18\x02 \x01(\t\x12\x0f\n\x07\x66ilters\x18\x03 \x01(\t\"5\n\x11SummarizeResponse\x12\x0f\n\x07summary\x18\x01 \x01(\t\x12\x0f\n\x07message\x18\x02 \x01(\t2\xe3\x01\n\nPDFService\x12J\n\tUploadPDF\x12\x1c.pdfservice.UploadPDFRequest\x1a\x1d.pdfservice.UploadPDFResponse(\x01\x12?\n\x06Search\x12\x19.pdfservice.SearchRequest\x1a\x1a.pdfservice.SearchResponse\x12H\n\tSummarize\x12\x1c.pdfservice.SummarizeRequest\x1a\x1d.pdfservice.SummarizeResponseb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x11pdf_service.proto\x12\npdfservice\"s\n\x10UploadPDFRequest\x12\x17\n\x0f\x63ollection_name\x18\x01 \x01(\t\x12\x15\n\rdocument_type\x18\x02 \x01(\t\x12\x10\n\x08\x66ilename\x18\x03 \x01(\t\x12\r\n\x05\x63hunk\x18\x04 \x01(\x0c\x12\x0e\n\x06sha256\x18\x05 \x01(\t\"X\n\x11UploadPDFResponse\x12\x0f\n\x07message\x18\x01 \x01(\t\x12\x0e\n\x06sha256\x18\x02 \x01(\t\x12\x12\n\nsize_bytes\x18\x03 \x01(\x03\x12\x0e\n\x06job_id\x18\x04 \x01(\t\"u\n\x0fNumericInterval\x12\x0f\n\x02gt\x18\x01 \x01(\x01H\x00\x88\x01\x01\x12\x10\n\x03gte\x18\x02 \x01(\x01H\x01\x88\x01\x01\x12\x0f\n\x02lt\x18\x03 \x01(\x01H\x02\x88\x01\x01\x12\x10\n\x03lte\x18\x04 \x01(\x01H\x03\x88\x01\x01\x42\x05\n\x03_gtB\x06\n\x04_gteB\x05\n\x03_ltB\x06\n\x04_lte\"D\n\x10\x44\x61tetimeInterval\x12\n\n\x02gt\x18\x01 \x01(\t\x12\x0b\n\x03gte\x18\x02 \x01(\t\x12\n\n\x02lt\x18\x03 \x01(\t\x12\x0b\n\x03lte\x18\x04 \x01(\t\"\xa4\x01\n\x0b\x46ieldFilter\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\x0b\n\x03\x61ny\x18\x02 \x03(\t\x12\x0b\n\x03\x61ll\x18\x03 \x03(\t\x12\x0c\n\x04none\x18\x04 \x03(\t\x12*\n\x05range\x18\x05 \x01(\x0b\x32\x1b.pdfservice.NumericInterval\x12\x34\n\x0e\x64\x61tetime_range\x18\x06 \x01(\x0b\x32\x1c.pdfservice.DatetimeInterval\"l\n\x0c\x46ilterClause\x12(\n\x05\x66ield\x18\x01 \x01(\x0b\x32\x17.pdfservice.FieldFilterH\x00\x12(\n\x05group\x18\x02 \x01(\x0b\x32\x17.pdfservice.FilterGroupH\x00\x42\x08\n\x06\x63lause\"\x8b\x01\n\x0b\x46ilterGroup\x12&\n\x04must\x18\x01 \x03(\x0b\x32\x18.pdfservice.FilterClause\x12(\n\x06should\x18\x02 \x03(\x0b\x32\x18.pdfservice.FilterClause\x12*\n\x08must_not\x18\x03 \x03(\x0b\x32\x18.pdfservice.FilterClause\"~\n\rSearchRequest\x12\r\n\x05query\x18\x01 \x01(\t\x12\x0f\n\x07\x66ilters\x18\x02 \x01(\t\x12\x13\n\x0bsearch_mode\x18\x03 \x01(\t\x12\x0f\n\x07hnsw_ef\x18\x04 \x01(\x05\x12\'\n\x06\x66ilter\x18\x05 \x01(\x0b\x32\x17.pdfservice.FilterGroup\"8\n\x0eSearchResponse\x12\x15\n\rsearch_result\x18\x01 \x01(\t\x12\x0f\n\x07message\x18\x02 \x01(\t\"e\n\x0bSearchQuery\x12\r\n\x05query\x18\x01 \x01(\t\x12\x0f\n\x07\x66ilters\x18\x02 \x01(\t\x12\r\n\x05limit\x18\x03 \x01(\x05\x12\'\n\x06\x66ilter\x18\x04 \x01(\x0b\x32\x17.pdfservice.FilterGroup\"d\n\x12SearchBatchRequest\x12(\n\x07queries\x18\x01 \x03(\x0b\x32\x17.pdfservice.SearchQuery\x12\x13\n\x0bsearch_mode\x18\x02 \x01(\t\x12\x0f\n\x07hnsw_ef\x18\x03 \x01(\x05\"S\n\x13SearchBatchResponse\x12+\n\x07results\x18\x01 \x03(\x0b\x32\x1a.pdfservice.SearchResponse\x12\x0f\n\x07message\x18\x02 \x01(\t\"\x84\x01\n\x10SummarizeRequest\x12\r\n\x05query\x18\x01 \x01(\t\x12\x0f\n\x07user_id\x18\x02 \x01(\t\x12\x0f\n\x07\x66ilters\x18\x03 \x01(\t\x12\x16\n\x0esummarize_mode\x18\x04 \x01(\t\x12\'\n\x06\x66ilter\x18\x05 \x01(\x0b\x32\x17.pdfservice.FilterGroup\"5\n\x11SummarizeResponse\x12\x0f\n\x07summary\x18\x01 \x01(\t\x12\x0f\n\x07message\x18\x02 \x01(\t\">\n\x0eSummarizeChunk\x12\r\n\x05\x64\x65lta\x18\x01 \x01(\t\x12\x0c\n\x04\x64one\x18\x02 \x01(\x08\x12\x0f\n\x07message\x18\x03 \x01(\t\"(\n\x16IngestionStatusRequest\x12\x0e\n\x06job_id\x18\x01 \x01(\t\"(\n\x16\x43\x61ncelIngestionRequest\x12\x0e\n\x06job_id\x18\x01 \x01(\t\"\xa1\x01\n\x17IngestionStatusResponse\x12\x0e\n\x06job_id\x18\x01 \x01(\t\x12\x0e\n\x06status\x18\x02 \x01(\t\x12\r\n\x05stage\x18\x03 \x01(\t\x12\x14\n\x0cpages_parsed\x18\x04 \x01(\x05\x12\x17\n\x0f\x63hunks_embedded\x18\x05 \x01(\x05\x12\x17\n\x0fpoints_upserted\x18\x06 \x01(\x05\x12\x0f\n\x07message\x18\x07 \x01(\t2\xbd\x04\n\nPDFService\x12J\n\tUploadPDF\x12\x1c.pdfservice.UploadPDFRequest\x1a\x1d.pdfservice.UploadPDFResponse(\x01\x12?\n\x06Search\x12\x19.pdfservice.SearchRequest\x1a\x1a.pdfservice.SearchResponse\x12N\n\x0bSearchBatch\x12\x1e.pdfservice.SearchBatchRequest\x1a\x1f.pdfservice.SearchBatchResponse\x12H\n\tSummarize\x12\x1c.pdfservice.SummarizeRequest\x1a\x1d.pdfservice.SummarizeResponse\x12M\n\x0fSummarizeStream\x12\x1c.pdfservice.SummarizeRequest\x1a\x1a.pdfservice.SummarizeChunk0\x01\x12]\n\x12GetIngestionStatus\x12\".pdfservice.IngestionStatusRequest\x1a#.pdfservice.IngestionStatusResponse\x12Z\n\x0f\x43\x61ncelIngestion\x12\".pdfservice.CancelIngestionRequest\x1a#.pdfservice.IngestionStatusResponseb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -22,17 +22,41 @@ _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'pdf_service_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
   _globals['_UPLOADPDFREQUEST']._serialized_start=33
-  _globals['_UPLOADPDFREQUEST']._serialized_end=117
-  _globals['_UPLOADPDFRESPONSE']._serialized_start=119
-  _globals['_UPLOADPDFRESPONSE']._serialized_end=155
-  _globals['_SEARCHREQUEST']._serialized_start=157
-  _globals['_SEARCHREQUEST']._serialized_end=204
-  _globals['_SEARCHRESPONSE']._serialized_start=206
-  _globals['_SEARCHRESPONSE']._serialized_end=262
-  _globals['_SUMMARIZEREQUEST']._serialized_start=264
-  _globals['_SUMMARIZEREQUEST']._serialized_end=331
-  _globals['_SUMMARIZERESPONSE']._serialized_start=333
-  _globals['_SUMMARIZERESPONSE']._serialized_end=386
-  _globals['_PDFSERVICE']._serialized_start=389
-  _globals['_PDFSERVICE']._serialized_end=616
+  _globals['_UPLOADPDFREQUEST']._serialized_end=148
+  _globals['_UPLOADPDFRESPONSE']._serialized_start=150
+  _globals['_UPLOADPDFRESPONSE']._serialized_end=238
+  _globals['_NUMERICINTERVAL']._serialized_start=240
+  _globals['_NUMERICINTERVAL']._serialized_end=357
+  _globals['_DATETIMEINTERVAL']._serialized_start=359
+  _globals['_DATETIMEINTERVAL']._serialized_end=427
+  _globals['_FIELDFILTER']._serialized_start=430
+  _globals['_FIELDFILTER']._serialized_end=594
+  _globals['_FILTERCLAUSE']._serialized_start=596
+  _globals['_FILTERCLAUSE']._serialized_end=704
+  _globals['_FILTERGROUP']._serialized_start=707
+  _globals['_FILTERGROUP']._serialized_end=846
+  _globals['_SEARCHREQUEST']._serialized_start=848
+  _globals['_SEARCHREQUEST']._serialized_end=974
+  _globals['_SEARCHRESPONSE']._serialized_start=976
+  _globals['_SEARCHRESPONSE']._serialized_end=1032
+  _globals['_SEARCHQUERY']._serialized_start=1034
+  _globals['_SEARCHQUERY']._serialized_end=1135
+  _globals['_SEARCHBATCHREQUEST']._serialized_start=1137
+  _globals['_SEARCHBATCHREQUEST']._serialized_end=1237
+  _globals['_SEARCHBATCHRESPONSE']._serialized_start=1239
+  _globals['_SEARCHBATCHRESPONSE']._serialized_end=1322
+  _globals['_SUMMARIZEREQUEST']._serialized_start=1325
+  _globals['_SUMMARIZEREQUEST']._serialized_end=1457
+  _globals['_SUMMARIZERESPONSE']._serialized_start=1459
+  _globals['_SUMMARIZERESPONSE']._serialized_end=1512
+  _globals['_SUMMARIZECHUNK']._serialized_start=1514
+  _globals['_SUMMARIZECHUNK']._serialized_end=1576
+  _globals['_INGESTIONSTATUSREQUEST']._serialized_start=1578
+  _globals['_INGESTIONSTATUSREQUEST']._serialized_end=1618
+  _globals['_CANCELINGESTIONREQUEST']._serialized_start=1620
+  _globals['_CANCELINGESTIONREQUEST']._serialized_end=1660
+  _globals['_INGESTIONSTATUSRESPONSE']._serialized_start=1663
+  _globals['_INGESTIONSTATUSRESPONSE']._serialized_end=1824
+  _globals['_PDFSERVICE']._serialized_start=1827
+  _globals['_PDFSERVICE']._serialized_end=2400
 # @@protoc_insertion_point(module_scope)
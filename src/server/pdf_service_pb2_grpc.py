@@ -56,11 +56,31 @@ class PDFServiceStub(object):
                 request_serializer=pdf__service__pb2.SearchRequest.SerializeToString,
                 response_deserializer=pdf__service__pb2.SearchResponse.FromString,
                 _registered_method=True)
+        self.SearchBatch = channel.unary_unary(
+                '/pdfservice.PDFService/SearchBatch',
+                request_serializer=pdf__service__pb2.SearchBatchRequest.SerializeToString,
+                response_deserializer=pdf__service__pb2.SearchBatchResponse.FromString,
+                _registered_method=True)
         self.Summarize = channel.unary_unary(
                 '/pdfservice.PDFService/Summarize',
                 request_serializer=pdf__service__pb2.SummarizeRequest.SerializeToString,
                 response_deserializer=pdf__service__pb2.SummarizeResponse.FromString,
                 _registered_method=True)
+        self.SummarizeStream = channel.unary_stream(
+                '/pdfservice.PDFService/SummarizeStream',
+                request_serializer=pdf__service__pb2.SummarizeRequest.SerializeToString,
+                response_deserializer=pdf__service__pb2.SummarizeChunk.FromString,
+                _registered_method=True)
+        self.GetIngestionStatus = channel.unary_unary(
+                '/pdfservice.PDFService/GetIngestionStatus',
+                request_serializer=pdf__service__pb2.IngestionStatusRequest.SerializeToString,
+                response_deserializer=pdf__service__pb2.IngestionStatusResponse.FromString,
+                _registered_method=True)
+        self.CancelIngestion = channel.unary_unary(
+                '/pdfservice.PDFService/CancelIngestion',
+                request_serializer=pdf__service__pb2.CancelIngestionRequest.SerializeToString,
+                response_deserializer=pdf__service__pb2.IngestionStatusResponse.FromString,
+                _registered_method=True)
 
 
 class PDFServiceServicer(object):
@@ -78,12 +98,36 @@ class PDFServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def SearchBatch(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
     def Summarize(self, request, context):
         """Missing associated documentation comment in .proto file."""
         context.set_code(grpc.StatusCode.UNIMPLEMENTED)
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def SummarizeStream(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetIngestionStatus(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def CancelIngestion(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_PDFServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -97,11 +141,31 @@ def add_PDFServiceServicer_to_server(servicer, server):
                     request_deserializer=pdf__service__pb2.SearchRequest.FromString,
                     response_serializer=pdf__service__pb2.SearchResponse.SerializeToString,
             ),
+            'SearchBatch': grpc.unary_unary_rpc_method_handler(
+                    servicer.SearchBatch,
+                    request_deserializer=pdf__service__pb2.SearchBatchRequest.FromString,
+                    response_serializer=pdf__service__pb2.SearchBatchResponse.SerializeToString,
+            ),
             'Summarize': grpc.unary_unary_rpc_method_handler(
                     servicer.Summarize,
                     request_deserializer=pdf__service__pb2.SummarizeRequest.FromString,
                     response_serializer=pdf__service__pb2.SummarizeResponse.SerializeToString,
             ),
+            'SummarizeStream': grpc.unary_stream_rpc_method_handler(
+                    servicer.SummarizeStream,
+                    request_deserializer=pdf__service__pb2.SummarizeRequest.FromString,
+                    response_serializer=pdf__service__pb2.SummarizeChunk.SerializeToString,
+            ),
+            'GetIngestionStatus': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetIngestionStatus,
+                    request_deserializer=pdf__service__pb2.IngestionStatusRequest.FromString,
+                    response_serializer=pdf__service__pb2.IngestionStatusResponse.SerializeToString,
+            ),
+            'CancelIngestion': grpc.unary_unary_rpc_method_handler(
+                    servicer.CancelIngestion,
+                    request_deserializer=pdf__service__pb2.CancelIngestionRequest.FromString,
+                    response_serializer=pdf__service__pb2.IngestionStatusResponse.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'pdfservice.PDFService', rpc_method_handlers)
@@ -167,6 +231,33 @@ class PDFService(object):
             metadata,
             _registered_method=True)
 
+    @staticmethod
+    def SearchBatch(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/pdfservice.PDFService/SearchBatch',
+            pdf__service__pb2.SearchBatchRequest.SerializeToString,
+            pdf__service__pb2.SearchBatchResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
     @staticmethod
     def Summarize(request,
             target,
@@ -193,3 +284,84 @@ class PDFService(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def SummarizeStream(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/pdfservice.PDFService/SummarizeStream',
+            pdf__service__pb2.SummarizeRequest.SerializeToString,
+            pdf__service__pb2.SummarizeChunk.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def GetIngestionStatus(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/pdfservice.PDFService/GetIngestionStatus',
+            pdf__service__pb2.IngestionStatusRequest.SerializeToString,
+            pdf__service__pb2.IngestionStatusResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def CancelIngestion(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/pdfservice.PDFService/CancelIngestion',
+            pdf__service__pb2.CancelIngestionRequest.SerializeToString,
+            pdf__service__pb2.IngestionStatusResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
@@ -0,0 +1,18 @@
+import os
+import pytest
+
+
+@pytest.fixture(autouse=True, scope="session")
+def embedding_cache_path(tmp_path_factory):
+    """
+    Keep the embedding cache of every QdrantVectorDB built by the tests in a temporary
+    directory, so cached vectors do not leak into the repo or between test runs.
+    """
+    path = tmp_path_factory.mktemp("embedding_cache") / "embeddings.sqlite3"
+    previous = os.environ.get("EMBEDDING_CACHE_PATH")
+    os.environ["EMBEDDING_CACHE_PATH"] = str(path)
+    yield path
+    if previous is None:
+        os.environ.pop("EMBEDDING_CACHE_PATH", None)
+    else:
+        os.environ["EMBEDDING_CACHE_PATH"] = previous
@@ -0,0 +1,88 @@
+import pathlib
+import sys
+
+current_dir = pathlib.Path(__file__).parent
+previous_dir = current_dir.parent.parent
+sys.path.append(str(previous_dir))
+
+import numpy as np
+import redis
+from unittest.mock import MagicMock
+
+from config.answer_cache import AnswerEntry, InMemoryAnswerStore, RedisAnswerStore, SemanticAnswerCache, _encode
+from config.redis_client import PipelineStep, run_pipeline
+
+
+def make_cache(threshold=0.95):
+    return SemanticAnswerCache(InMemoryAnswerStore(max_keys=8, max_entries_per_key=4, ttl_seconds=60), threshold)
+
+
+def ask(cache, key, generation=1):
+    lookup = cache.lookup(key, generation)
+    run_pipeline(MagicMock(), lookup.read_steps)
+    return lookup
+
+
+def test_answer_returned_for_similar_query_only():
+    cache = make_cache()
+    key = cache.key("pdf-articles", None, ["b", "a"])
+    lookup = ask(cache, key)
+    assert lookup.answer(np.array([1.0, 0.0, 0.0])) is None
+    run_pipeline(MagicMock(), lookup.write_steps(np.array([1.0, 0.0, 0.0]), "free energy answer"))
+
+    assert ask(cache, key).answer(np.array([2.0, 0.1, 0.0])) == "free energy answer"
+    assert ask(cache, key).answer(np.array([0.5, 1.0, 0.0])) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_entries_from_an_older_generation_are_ignored():
+    cache = make_cache()
+    key = cache.key("pdf-articles", None, ["a"])
+    run_pipeline(MagicMock(), ask(cache, key, generation=1).write_steps(np.ones(3), "old answer"))
+    assert ask(cache, key, generation=1).answer(np.ones(3)) == "old answer"
+    assert ask(cache, key, generation=2).answer(np.ones(3)) is None
+
+
+def test_key_depends_on_filter_and_chunks():
+    cache = make_cache()
+    key = cache.key("pdf-articles", None, ["a", "b"])
+    assert key == cache.key("pdf-articles", None, ["b", "a"])
+    assert key != cache.key("pdf-articles", '{"must": []}', ["a", "b"])
+    assert key != cache.key("pdf-articles", None, ["a", "c"])
+
+
+def test_redis_store_reads_entries_only_without_history():
+    cache = SemanticAnswerCache(RedisAnswerStore(max_entries_per_key=4, ttl_seconds=60), 0.9)
+    stored = _encode(AnswerEntry(cache.normalize(np.ones(3)), "answer", 3))
+    redis_client = MagicMock()
+    pipe = redis_client.pipeline.return_value
+
+    pipe.execute.return_value = [[stored]]
+    lookup = cache.lookup("key", 3, ["user_history", "user_summary"])
+    run_pipeline(redis_client, lookup.read_steps)
+    assert lookup.answer(np.ones(3) * 2) == "answer"
+    assert pipe.eval.call_args[0][1:] == (3, "key", "user_history", "user_summary")
+
+    # The script returns nil when the user already has a history
+    pipe.execute.return_value = [None]
+    lookup = cache.lookup("key", 3, ["user_history", "user_summary"])
+    run_pipeline(redis_client, lookup.read_steps)
+    assert lookup.answer(np.ones(3)) is None
+
+
+def test_store_errors_are_misses():
+    cache = SemanticAnswerCache(RedisAnswerStore(max_entries_per_key=4, ttl_seconds=60), 0.9)
+    redis_client = MagicMock()
+    pipe = redis_client.pipeline.return_value
+    wrongtype = redis.ResponseError("WRONGTYPE Operation against a key holding the wrong kind of value")
+    history = []
+    memory_step = lambda: PipelineStep(lambda pipe: pipe.lrange("user_history", 0, -1), history.extend, 1)
+
+    pipe.execute.return_value = [["turn"], wrongtype]
+    lookup = cache.lookup("key", 1)
+    run_pipeline(redis_client, [memory_step()] + lookup.read_steps)
+    assert history == [["turn"]]
+    assert lookup.answer(np.ones(3)) is None
+
+    pipe.execute.return_value = [1, wrongtype, True, True]
+    run_pipeline(redis_client, [memory_step()] + lookup.write_steps(np.ones(3), "answer"), transaction=True)
@@ -0,0 +1,51 @@
+import pathlib
+import sys
+
+current_dir = pathlib.Path(__file__).parent
+previous_dir = current_dir.parent.parent
+sys.path.append(str(previous_dir))
+
+import json
+
+from gen_ai.RAGLLM.context_builder import ContextBuilder
+
+
+def hit(doc_id, text, page=0):
+    return {
+        "page_content": text,
+        "metadata": {
+            "_id": doc_id,
+            "_collection_name": "pdf-articles",
+            "title": "Active Inference",
+            "page": page,
+            "uploaded_at": "2024-07-17 14:58",
+            "keywords": "free energy, perception",
+        },
+    }
+
+
+def word_count(text):
+    return len(text.split())
+
+
+def test_context_keeps_only_cited_fields():
+    builder = ContextBuilder(max_tokens=100, fields=["title", "page"], count_tokens=word_count)
+    context = builder.build([hit("1", "agents minimise free energy", page=2)])
+    assert context == "[1] | title: Active Inference | page: 3\nagents minimise free energy"
+
+
+def test_context_skips_duplicates_and_packs_to_budget():
+    builder = ContextBuilder(max_tokens=30, fields=["page"], similarity_threshold=0.8, count_tokens=word_count)
+    docs = [
+        hit("1", "agents minimise variational free energy through perception and action"),
+        hit("1", "agents minimise variational free energy through perception and action"),
+        hit("2", "agents minimise the variational free energy through perception and action"),
+        hit("3", " ".join(["long"] * 40)),
+        hit("4", "education in nigeria faces funding challenges"),
+    ]
+    context = builder.build_from_search({"data": [json.dumps(doc) for doc in docs]})
+    chunks = context.split("\n\n")
+    assert [chunk.split("\n")[0] for chunk in chunks] == ["[1] | page: 1", "[2] | page: 1"]
+    assert chunks[1].endswith("education in nigeria faces funding challenges")
+    assert sum(word_count(chunk) for chunk in chunks) <= 30
+    assert "uploaded_at" not in context and "_collection_name" not in context
@@ -0,0 +1,87 @@
+import pathlib
+import sys
+
+current_dir = pathlib.Path(__file__).parent
+previous_dir = current_dir.parent.parent
+sys.path.append(str(previous_dir))
+
+import json
+from unittest.mock import MagicMock
+
+from gen_ai.RAGLLM import AIGenerator
+from gen_ai.RAGLLM.memory import ConversationMemory, estimate_tokens
+
+
+def turns(count, length=40):
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"turn {i} " + "x" * length}
+        for i in range(count)
+    ]
+
+
+def redis_with(history, summary=None):
+    redis_client = MagicMock()
+    redis_client.pipeline.return_value.execute.return_value = [
+        [json.dumps(turn).encode() for turn in history], summary]
+    return redis_client
+
+
+def test_window_keeps_the_tail_that_fits_the_budget():
+    history = turns(10)
+    per_turn = estimate_tokens(history[0]["content"])
+    memory = ConversationMemory(MagicMock(), "user", token_budget=4 * per_turn)
+    assert memory.window_start(history, None) == 6
+    # A window that would open on an assistant reply starts at the next question instead
+    memory = ConversationMemory(MagicMock(), "user", token_budget=3 * per_turn)
+    assert memory.window_start(history, None) == 8
+    # The summary takes its share of the budget
+    assert memory.window_start(history, "s" * 4 * per_turn) == 10
+
+
+def test_prompt_holds_summary_and_tail_and_only_new_turns_are_saved():
+    redis_client = redis_with(turns(4), summary=b"the user asked about active inference")
+    ai = AIGenerator("{context}", "some context", client=MagicMock(), redis_client=redis_client)
+    assert [message["role"] for message in ai.messages] == ["system", "system", "user", "assistant", "user", "assistant"]
+    assert "active inference" in ai.messages[1]["content"]
+
+    ai.client.chat.completions.create.return_value.choices[0].message.content = "an answer"
+    ai.run_conversation("{query}", "a question")
+    pipe = redis_client.pipeline.return_value
+    key, *saved = pipe.rpush.call_args[0]
+    assert key == "test-user_history"
+    assert [json.loads(turn)["content"] for turn in saved] == ["a question", "an answer"]
+    pipe.ltrim.assert_called_with("test-user_history", -64, -1)
+    pipe.expire.assert_any_call("test-user_history", 604800)
+    assert ai.client.chat.completions.create.call_count == 1
+
+
+def test_turns_outside_the_window_are_compacted_into_the_summary():
+    history = turns(20, length=400)
+    redis_client = redis_with(history)
+    client = MagicMock()
+    client.chat.completions.create.return_value.choices[0].message.content = "rolling summary"
+    ai = AIGenerator("{context}", "", client=client, redis_client=redis_client)
+    overflow = len(ai.overflow)
+    assert overflow >= 8
+    assert len(ai.messages) == 1 + len(history) - overflow
+
+    ai.run_conversation("{query}", "a question")
+    # Compaction runs off the request path
+    ai.compaction.result(timeout=5)
+    summary_call = client.chat.completions.create.call_args_list[-1]
+    assert history[0]["content"] in summary_call.kwargs["messages"][-1]["content"]
+    script, numkeys, *keys_and_args = redis_client.eval.call_args[0]
+    assert keys_and_args[:5] == ["test-user_history", "test-user_summary", "", "rolling summary", 604800]
+    # The compacted turns are passed by value, so only those still at the head are trimmed
+    assert [json.loads(turn) for turn in keys_and_args[5:]] == history[:overflow]
+
+
+def test_lost_compaction_race_is_not_an_error():
+    redis_client = redis_with(turns(20, length=400), summary=b"older summary")
+    redis_client.eval.return_value = -1
+    client = MagicMock()
+    client.chat.completions.create.return_value.choices[0].message.content = "rolling summary"
+    ai = AIGenerator("{context}", "", client=client, redis_client=redis_client)
+    ai.run_conversation("{query}", "a question")
+    ai.compaction.result(timeout=5)
+    assert redis_client.eval.call_args[0][4] == "older summary"
@@ -0,0 +1,37 @@
+import pathlib
+import sys
+
+current_dir = pathlib.Path(__file__).parent
+previous_dir = current_dir.parent.parent
+sys.path.append(str(previous_dir))
+
+import numpy as np
+import pytest
+from config.embedding_cache import EmbeddingCache
+
+@pytest.fixture
+def embedding_cache(tmp_path):
+    return EmbeddingCache(path=str(tmp_path / "embeddings.sqlite3"), max_entries=2)
+
+def test_put_and_get_many(embedding_cache):
+    vectors = np.arange(6, dtype=np.float32).reshape(2, 3)
+    embedding_cache.put_many("test-model", ["first", "second"], vectors)
+
+    found = embedding_cache.get_many("test-model", ["second", "unknown", "first"])
+    assert sorted(found) == [0, 2]
+    np.testing.assert_array_equal(found[0], vectors[1])
+    np.testing.assert_array_equal(found[2], vectors[0])
+    assert embedding_cache.stats()["hits"] == 2
+    assert embedding_cache.stats()["misses"] == 1
+
+def test_entries_are_scoped_by_model(embedding_cache):
+    embedding_cache.put_many("test-model", ["first"], np.ones((1, 3), dtype=np.float32))
+    assert embedding_cache.get_many("other-model", ["first"]) == {}
+
+def test_evicts_least_recently_used(embedding_cache):
+    embedding_cache.put_many("test-model", ["first", "second"], np.ones((2, 3), dtype=np.float32))
+    embedding_cache.get_many("test-model", ["first"])
+    embedding_cache.put_many("test-model", ["third"], np.ones((1, 3), dtype=np.float32))
+
+    assert embedding_cache.evict() == 1
+    assert sorted(embedding_cache.get_many("test-model", ["first", "second", "third"])) == [0, 2]
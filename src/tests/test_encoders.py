@@ -0,0 +1,26 @@
+import pathlib
+import sys
+
+current_dir = pathlib.Path(__file__).parent
+previous_dir = current_dir.parent.parent
+sys.path.append(str(previous_dir))
+
+import pytest
+import numpy as np
+from config.encoders import TorchEncoder, _pool, load_encoder
+
+def test_pool_cls_and_mean():
+    hidden_states = np.array([[[3.0, 4.0], [1.0, 1.0], [9.0, 9.0]]], dtype=np.float32)
+    attention_mask = np.array([[1, 1, 0]])
+
+    cls = _pool(hidden_states, attention_mask, "cls", normalize=True)
+    np.testing.assert_allclose(cls, [[0.6, 0.8]], rtol=1e-6)
+    # Padding tokens are left out of the mean
+    mean = _pool(hidden_states, attention_mask, "mean", normalize=False)
+    np.testing.assert_allclose(mean, [[2.0, 2.5]], rtol=1e-6)
+    assert mean.dtype == np.float32
+
+def test_load_encoder_backends():
+    assert isinstance(load_encoder("BAAI/bge-base-en-v1.5", "torch"), TorchEncoder)
+    with pytest.raises(ValueError):
+        load_encoder("BAAI/bge-base-en-v1.5", "tensorrt")
@@ -0,0 +1,61 @@
+import warnings
+warnings.filterwarnings("ignore", category=DeprecationWarning, message="Support for class-based `config` is deprecated")
+
+import pathlib
+import sys
+
+current_dir = pathlib.Path(__file__).parent
+previous_dir = current_dir.parent.parent
+sys.path.append(str(previous_dir))
+
+from config.filter_compiler import FilterCompiler
+from schemas.search_schemas import (
+    MatchAnyOrInterval,
+    NumericInterval,
+    DatetimeInterval,
+    FieldFilter,
+    FilterGroup
+)
+
+
+def test_compiles_nested_groups_on_the_metadata_payload():
+    compiler = FilterCompiler("metadata", max_size=8)
+    filters = FilterGroup(
+        must=(FieldFilter(key="document_type", any=("ai", "education")),),
+        should=(
+            FieldFilter(key="page", range=NumericInterval(gte=0, lt=5)),
+            FilterGroup(must=(FieldFilter(key="tags", all=("agents", "inference")),)),
+        ),
+        must_not=(FieldFilter(key="title", none=("Draft",)),)
+    )
+
+    query_filter = compiler.compile(filters).query_filter
+
+    assert query_filter.must[0].key == "metadata.document_type"
+    assert query_filter.must[0].match.any == ["ai", "education"]
+    assert query_filter.should[0].key == "metadata.page"
+    assert query_filter.should[0].range.gte == 0 and query_filter.should[0].range.lt == 5
+    assert [condition.match.value for condition in query_filter.should[1].must[0].must] == ["agents", "inference"]
+    assert query_filter.must_not[0].match.except_ == ["Draft"]
+
+
+def test_compiled_filters_are_memoized_by_value():
+    compiler = FilterCompiler("metadata", max_size=8)
+    first = compiler.compile(FilterGroup(must=(FieldFilter(key="document_type", any=("ai",)),)))
+    second = compiler.compile(FilterGroup(must=(FieldFilter(key="document_type", any=("ai",)),)))
+    assert first is second
+    assert compiler.stats()["hits"] == 1
+    assert compiler.compile(FilterGroup()) is None and compiler.compile(None) is None
+
+
+def test_legacy_filters_prefix_range_keys():
+    compiler = FilterCompiler("metadata", max_size=8)
+    compiled = compiler.compile({
+        "document_type": MatchAnyOrInterval(any=["ai"]),
+        "created_at": MatchAnyOrInterval(gte="2024-01-01T00:00:00Z"),
+    })
+    assert [condition.key for condition in compiled.query_filter.must] == ["metadata.document_type", "metadata.created_at"]
+    assert compiled.key == compiler.compile(FilterGroup(must=(
+        FieldFilter(key="document_type", any=("ai",)),
+        FieldFilter(key="created_at", datetime_range=DatetimeInterval(gte="2024-01-01T00:00:00Z")),
+    ))).key
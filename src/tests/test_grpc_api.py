@@ -3,9 +3,15 @@ warnings.filterwarnings("ignore", category=DeprecationWarning, message="Support
 
 import pytest
 from concurrent import futures
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
+import asyncio
 import pathlib
 import sys
+import hashlib
+import functools
+import time
+import json
+import signal
 
 current_dir = pathlib.Path(__file__).parent.parent
 previous_dir = current_dir.parent
@@ -16,11 +22,21 @@ from src.server.pdf_service_pb2 import (
     UploadPDFResponse, 
     SearchRequest, 
     SearchResponse,
+    SearchQuery,
+    SearchBatchRequest,
     SummarizeRequest, 
-    SummarizeResponse
+    SummarizeResponse,
+    FilterGroup,
+    FilterClause,
+    FieldFilter,
+    NumericInterval,
+    IngestionStatusRequest,
+    CancelIngestionRequest
 )
-from src.server.pdf_service import PDFServiceServicer
+from src.server.pdf_service import PDFServiceServicer, AsyncPDFServiceServicer, warm_up
 from pdf.services.pdf_service import PDFService
+from pdf.services.upload_spool import PDFUploadSpool
+from pdf.services.ingestion_queue import IngestionJob, IngestionQueue
 from src.server import pdf_service_pb2, pdf_service_pb2_grpc
 from grpc import StatusCode, RpcError
 
@@ -39,7 +55,14 @@ class TestPDFServiceServicer:
             filename="test.pdf"
         )
         response = self.pdf_service_servicer.UploadPDF(iter([request]), None)
-        assert response.message == "test.pdf embedded successfully"
+        assert response.message == "test.pdf queued for ingestion"
+        assert response.job_id
+
+        job = self.pdf_service_servicer.ingestion_queue.get(response.job_id)
+        assert job.wait(timeout=5)
+        status = self.pdf_service_servicer.GetIngestionStatus(IngestionStatusRequest(job_id=response.job_id), MagicMock())
+        assert status.status == "COMPLETED"
+        assert mock_embed_document.call_args.kwargs["job"] is job
 
     @patch("pdf.services.pdf_service.os.path.exists", return_value=False)
     def test_upload_pdf_file_not_found(self, mock_exists):
@@ -53,6 +76,68 @@ class TestPDFServiceServicer:
         assert context.set_code.call_args[0][0] == StatusCode.NOT_FOUND
         assert "File non_existent_file.pdf does not exist in the uploads directory" in context.set_details.call_args[0][0]
 
+    @patch.object(PDFService, 'embed_document', return_value={"message": "streamed.pdf embedded successfully"})
+    def test_upload_pdf_streamed_chunks(self, mock_embed_document):
+        data = b"%PDF-1.4 test content %%EOF"
+        requests = [
+            UploadPDFRequest(
+                collection_name="test_collection",
+                document_type="test_document",
+                filename="streamed.pdf",
+                chunk=data[:10],
+                sha256=hashlib.sha256(data).hexdigest()
+            ),
+            UploadPDFRequest(chunk=data[10:])
+        ]
+        response = self.pdf_service_servicer.UploadPDF(iter(requests), MagicMock())
+        assert response.message == "streamed.pdf queued for ingestion"
+        assert response.sha256 == hashlib.sha256(data).hexdigest()
+        assert response.size_bytes == len(data)
+
+        job = self.pdf_service_servicer.ingestion_queue.get(response.job_id)
+        assert job.wait(timeout=5)
+        spooled_path = mock_embed_document.call_args.kwargs["filepath"]
+        assert spooled_path.endswith(".pdf")
+        assert not pathlib.Path(spooled_path).exists()
+
+    @patch("src.server.pdf_service.PDFUploadSpool", functools.partial(PDFUploadSpool, max_file_size_mb=1e-6))
+    def test_upload_pdf_too_large(self):
+        request = UploadPDFRequest(
+            collection_name="test_collection",
+            document_type="test_document",
+            filename="large.pdf",
+            chunk=b"%PDF-1.4 too large"
+        )
+        context = MagicMock()
+        self.pdf_service_servicer.UploadPDF(iter([request]), context)
+        assert context.set_code.call_args[0][0] == StatusCode.RESOURCE_EXHAUSTED
+
+    def test_get_ingestion_status_not_found(self):
+        context = MagicMock()
+        self.pdf_service_servicer.GetIngestionStatus(IngestionStatusRequest(job_id="missing-job"), context)
+        assert context.set_code.call_args[0][0] == StatusCode.NOT_FOUND
+
+    def test_cancel_ingestion(self):
+        def slow_embed_document(*args, job=None, **kwargs):
+            job.add_pages_parsed(3)
+            while True:
+                job.raise_if_cancelled()
+                time.sleep(0.01)
+
+        with patch.object(PDFService, 'embed_document', side_effect=slow_embed_document):
+            request = UploadPDFRequest(
+                collection_name="test_collection",
+                document_type="test_document",
+                filename="test.pdf"
+            )
+            response = self.pdf_service_servicer.UploadPDF(iter([request]), MagicMock())
+            self.pdf_service_servicer.CancelIngestion(CancelIngestionRequest(job_id=response.job_id), MagicMock())
+            job = self.pdf_service_servicer.ingestion_queue.get(response.job_id)
+            assert job.wait(timeout=5)
+
+        status = self.pdf_service_servicer.GetIngestionStatus(IngestionStatusRequest(job_id=response.job_id), MagicMock())
+        assert status.status == "CANCELLED"
+
     @patch.object(PDFService, 'search', return_value={"data": ["Test search result"]})
     def test_search_success(self, mock_search):
         request = SearchRequest(query="test_query", filters="document_type:[artificial_intelligence_document]")
@@ -61,7 +146,7 @@ class TestPDFServiceServicer:
         assert response.message == "Search completed"
         assert response.search_result == '{"data": ["Test search result"]}'
 
-    @patch("pdf.services.pdf_service.vector_db.search", side_effect=RpcError("Test RPC error"))
+    @patch("config.qdrant_client.QdrantVectorDB.search", side_effect=RpcError("Test RPC error"))
     def test_search_rpc_error(self, mock_search):
         request = SearchRequest(query="test_query", filters="document_type:[artificial_intelligence_document]")
         context = MagicMock()
@@ -69,6 +154,77 @@ class TestPDFServiceServicer:
         assert context.set_code.call_args[0][0] == StatusCode.UNKNOWN
         assert "Test RPC error" in context.set_details.call_args[0][0]
 
+    @patch.object(PDFService, 'search', return_value={"data": ["Test search result"]})
+    def test_search_with_search_mode(self, mock_search):
+        request = SearchRequest(query="test_query", filters="document_type:[artificial_intelligence_document]", search_mode="hnsw", hnsw_ef=256)
+        response = self.pdf_service_servicer.Search(request, MagicMock())
+        assert response.message == "Search completed"
+        assert mock_search.call_args.kwargs["search_mode"] == "hnsw"
+        assert mock_search.call_args.kwargs["hnsw_ef"] == 256
+
+    def test_search_invalid_search_mode(self):
+        request = SearchRequest(query="test_query", filters="document_type:[artificial_intelligence_document]", search_mode="approximate")
+        context = MagicMock()
+        self.pdf_service_servicer.Search(request, context)
+        assert context.set_code.call_args[0][0] == StatusCode.INVALID_ARGUMENT
+
+    @patch.object(PDFService, 'search', return_value={"data": ["Test search result"]})
+    def test_search_with_typed_filter(self, mock_search):
+        request = SearchRequest(query="test_query", filter=FilterGroup(
+            must=[FilterClause(field=FieldFilter(key="document_type", any=["artificial_intelligence_document"]))],
+            must_not=[FilterClause(group=FilterGroup(
+                should=[FilterClause(field=FieldFilter(key="page", range=NumericInterval(gte=0, lt=2)))]
+            ))]
+        ))
+        response = self.pdf_service_servicer.Search(request, MagicMock())
+        assert response.message == "Search completed"
+        filters = mock_search.call_args.kwargs["filters"]
+        assert filters.must[0].any == ("artificial_intelligence_document",)
+        assert filters.must_not[0].should[0].range.model_dump() == {"gt": None, "gte": 0.0, "lt": 2.0, "lte": None}
+
+    def test_search_rejects_invalid_typed_filter(self):
+        context = MagicMock()
+        request = SearchRequest(query="test_query", filter=FilterGroup(must=[FilterClause(field=FieldFilter(key="page"))]))
+        self.pdf_service_servicer.Search(request, context)
+        assert context.set_code.call_args[0][0] == StatusCode.INVALID_ARGUMENT
+        assert "has no condition" in context.set_details.call_args[0][0]
+
+        context = MagicMock()
+        request.filters = "document_type:[artificial_intelligence_document]"
+        self.pdf_service_servicer.Search(request, context)
+        assert context.set_code.call_args[0][0] == StatusCode.INVALID_ARGUMENT
+
+    @patch.object(PDFService, 'search_batch', return_value=[{"data": ["first"]}, {"data": ["second"]}])
+    def test_search_batch_success(self, mock_search_batch):
+        request = SearchBatchRequest(queries=[
+            SearchQuery(query="first query", filters="document_type:[artificial_intelligence_document]", limit=3),
+            SearchQuery(query="second query", filters="document_type:[artificial_intelligence_document]"),
+        ])
+        response = self.pdf_service_servicer.SearchBatch(request, MagicMock())
+        assert response.message == "Search completed"
+        assert [result.search_result for result in response.results] == ['{"data": ["first"]}', '{"data": ["second"]}']
+        queries = mock_search_batch.call_args[0][0]
+        assert [(query, limit) for query, _, limit in queries] == [("first query", 3), ("second query", 0)]
+
+    def test_search_batch_invalid_filters(self):
+        request = SearchBatchRequest(queries=[SearchQuery(query="first query", filters="bad filter")])
+        context = MagicMock()
+        self.pdf_service_servicer.SearchBatch(request, context)
+        assert context.set_code.call_args[0][0] == StatusCode.INVALID_ARGUMENT
+
+    @patch.object(PDFService, 'search_batch')
+    def test_search_batch_rejects_empty_queries_and_negative_limits(self, mock_search_batch):
+        filters = "document_type:[artificial_intelligence_document]"
+        for queries, details in [
+            ([SearchQuery(query="first query", filters=filters), SearchQuery(query="", filters=filters)], "index 1"),
+            ([SearchQuery(query="first query", filters=filters, limit=-1)], "query 0"),
+        ]:
+            context = MagicMock()
+            self.pdf_service_servicer.SearchBatch(SearchBatchRequest(queries=queries), context)
+            assert context.set_code.call_args[0][0] == StatusCode.INVALID_ARGUMENT
+            assert details in context.set_details.call_args[0][0]
+        mock_search_batch.assert_not_called()
+
     @patch.object(PDFService, 'summarize', return_value="Test summary")
     def test_summarize_success(self, mock_summarize):
         request = SummarizeRequest(query="test_query", filters="document_type:[artificial_intelligence_document]", user_id="test-user")
@@ -77,10 +233,161 @@ class TestPDFServiceServicer:
         assert response.message == "Summarization completed"
         assert response.summary == "Test summary"
 
-    @patch("pdf.services.pdf_service.vector_db.search", side_effect=RpcError("Test RPC error"))
+    @patch("config.qdrant_client.QdrantVectorDB.search", side_effect=RpcError("Test RPC error"))
     def test_summarize_rpc_error(self, mock_search):
         request = SummarizeRequest(query="test_query", filters="document_type:[artificial_intelligence_document]", user_id="test-user")
         context = MagicMock()
         response = self.pdf_service_servicer.Summarize(request, context)
         assert context.set_code.call_args[0][0] == StatusCode.UNKNOWN
-        assert "Test RPC error" in context.set_details.call_args[0][0]
\ No newline at end of file
+        assert "Test RPC error" in context.set_details.call_args[0][0]
+
+    @patch.object(PDFService, 'summarize', return_value="Test summary")
+    def test_summarize_map_reduce_mode(self, mock_summarize):
+        request = SummarizeRequest(query="test_query", filters="document_type:[artificial_intelligence_document]", user_id="test-user", summarize_mode="map_reduce")
+        response = self.pdf_service_servicer.Summarize(request, MagicMock())
+        assert response.summary == "Test summary"
+        assert mock_summarize.call_args.kwargs["summarize_mode"] == "map_reduce"
+
+    def test_summarize_invalid_mode(self):
+        request = SummarizeRequest(query="test_query", filters="document_type:[artificial_intelligence_document]", user_id="test-user", summarize_mode="refine")
+        context = MagicMock()
+        self.pdf_service_servicer.Summarize(request, context)
+        assert context.set_code.call_args[0][0] == StatusCode.INVALID_ARGUMENT
+
+    @patch.object(PDFService, 'summarize_stream', return_value=(delta for delta in ["Test ", "summary"]))
+    def test_summarize_stream_success(self, mock_summarize_stream):
+        request = SummarizeRequest(query="test_query", filters="document_type:[artificial_intelligence_document]", user_id="test-user")
+        context = MagicMock()
+        context.is_active.return_value = True
+        responses = list(self.pdf_service_servicer.SummarizeStream(request, context))
+        assert [response.delta for response in responses[:-1]] == ["Test ", "summary"]
+        assert responses[-1].done
+        assert responses[-1].message == "Summarization completed"
+
+    @patch("pdf.services.pdf_service.get_redis_client")
+    @patch("pdf.services.pdf_service.get_groq_client")
+    @patch.object(PDFService, 'search_with_generation', return_value=(None, []))
+    def test_summarize_stream_cancel_saves_partial_answer(self, mock_search, mock_get_client, mock_get_redis_client):
+        mock_client, mock_redis_client = mock_get_client.return_value, mock_get_redis_client.return_value
+        def delta(text):
+            chunk = MagicMock()
+            chunk.choices[0].delta.content = text
+            return chunk
+        mock_redis_client.pipeline.return_value.execute.return_value = [[], None]
+        mock_client.chat.completions.create.return_value = iter([delta("Partial "), delta("answer"), delta(" never sent")])
+        request = SummarizeRequest(query="test_query", filters="document_type:[artificial_intelligence_document]", user_id="test-user")
+        context = MagicMock()
+        context.is_active.side_effect = [True, True, False]
+        responses = list(self.pdf_service_servicer.SummarizeStream(request, context))
+        assert [response.delta for response in responses] == ["Partial ", "answer"]
+        key, *turns = mock_redis_client.pipeline.return_value.rpush.call_args[0]
+        assert key == "test-user_history"
+        # The delta pulled after the client went away was never sent, so it is not saved
+        assert json.loads(turns[-1]) == {"role": "assistant", "content": "Partial answer"}
+
+class TestAsyncPDFServiceServicer:
+    def setup_method(self):
+        self.pdf_service_servicer = AsyncPDFServiceServicer()
+
+    @patch.object(PDFService, 'asearch', new_callable=AsyncMock, return_value={"data": ["Test search result"]})
+    def test_search_success(self, mock_asearch):
+        request = SearchRequest(query="test_query", filters="document_type:[artificial_intelligence_document]")
+        response = asyncio.run(self.pdf_service_servicer.Search(request, MagicMock()))
+        assert response.message == "Search completed"
+        assert response.search_result == '{"data": ["Test search result"]}'
+
+    @patch.object(PDFService, 'asummarize', new_callable=AsyncMock, return_value="Test summary")
+    def test_summarize_success(self, mock_asummarize):
+        request = SummarizeRequest(query="test_query", filters="document_type:[artificial_intelligence_document]", user_id="test-user")
+        response = asyncio.run(self.pdf_service_servicer.Summarize(request, MagicMock()))
+        assert response.message == "Summarization completed"
+        assert response.summary == "Test summary"
+        assert mock_asummarize.call_args.kwargs["user_id"] == "test-user"
+
+    def test_summarize_stream_success(self):
+        async def deltas(**kwargs):
+            for delta in ["Test ", "summary"]:
+                yield delta
+
+        async def collect(request):
+            return [response async for response in self.pdf_service_servicer.SummarizeStream(request, MagicMock())]
+
+        request = SummarizeRequest(query="test_query", filters="document_type:[artificial_intelligence_document]", user_id="test-user")
+        with patch.object(PDFService, 'asummarize_stream', side_effect=deltas):
+            responses = asyncio.run(collect(request))
+        assert [response.delta for response in responses[:-1]] == ["Test ", "summary"]
+        assert responses[-1].done
+
+    @patch("config.qdrant_client.QdrantVectorDB.asearch", new_callable=AsyncMock, side_effect=RpcError("Test RPC error"))
+    def test_search_rpc_error(self, mock_asearch):
+        request = SearchRequest(query="test_query", filters="document_type:[artificial_intelligence_document]")
+        context = MagicMock()
+        asyncio.run(self.pdf_service_servicer.Search(request, context))
+        assert context.set_code.call_args[0][0] == StatusCode.UNKNOWN
+        assert "Test RPC error" in context.set_details.call_args[0][0]
+
+def test_lazy_creates_resource_once():
+    from config import lazy
+
+    factory = MagicMock(return_value=object())
+    accessor = lazy(factory)
+    assert not accessor.initialized()
+    with futures.ThreadPoolExecutor(max_workers=8) as executor:
+        instances = list(executor.map(lambda _: accessor(), range(32)))
+    assert factory.call_count == 1
+    assert accessor.initialized()
+    assert all(instance is instances[0] for instance in instances)
+
+@patch("src.server.pdf_service.get_tokenizer")
+@patch("src.server.pdf_service.get_groq_client")
+@patch("src.server.pdf_service.get_redis_client")
+@patch("src.server.pdf_service.get_vector_db")
+def test_warm_up_tolerates_redis_but_not_qdrant(mock_get_vector_db, mock_get_redis_client, mock_get_groq_client, mock_get_tokenizer):
+    pdf_service = MagicMock(reranker_enabled=False)
+    mock_get_redis_client.return_value.ping.side_effect = ConnectionError("redis down")
+    warm_up(pdf_service)
+    mock_get_vector_db.return_value.warm_up.assert_called_once()
+
+    mock_get_vector_db.return_value.warm_up.side_effect = ConnectionError("qdrant down")
+    with pytest.raises(RuntimeError, match="qdrant"):
+        warm_up(pdf_service)
+
+@patch("src.server.pdf_service.warm_up", side_effect=RuntimeError("Warm-up failed for qdrant"))
+@patch("src.server.pdf_service.grpc.server")
+def test_serve_stops_the_server_when_warm_up_fails(mock_server, mock_warm_up):
+    from src.server.pdf_service import serve
+    with pytest.raises(RuntimeError, match="qdrant"):
+        serve()
+    mock_server.return_value.start.assert_called_once()
+    mock_server.return_value.stop.assert_called_once_with(0)
+    mock_server.return_value.wait_for_termination.assert_not_called()
+
+@patch("src.server.pdf_service.signal.signal")
+@patch("src.server.pdf_service.health.HealthServicer")
+@patch("src.server.pdf_service.warm_up")
+@patch("src.server.pdf_service.grpc.server")
+def test_sigterm_reports_not_serving_before_stopping(mock_server, mock_warm_up, mock_health, mock_signal):
+    from src.server.pdf_service import serve, config
+    serve()
+    handler = mock_signal.call_args.args[1]
+    calls = MagicMock()
+    calls.attach_mock(mock_health.return_value.enter_graceful_shutdown, "enter_graceful_shutdown")
+    calls.attach_mock(mock_server.return_value.stop, "stop")
+    handler(signal.SIGTERM, None)
+    assert [call[0] for call in calls.mock_calls] == ["enter_graceful_shutdown", "stop"]
+    mock_server.return_value.stop.assert_called_once_with(config['shutdown_grace_seconds'])
+
+def test_shutdown_cancels_queued_jobs_and_discards_their_spools():
+    import threading
+    release = threading.Event()
+    queue = IngestionQueue(lambda job: release.wait(5), max_workers=1, max_pending_jobs=4, max_finished_jobs=4)
+    running = queue.submit(IngestionJob("test_collection", "running.pdf", "test_document"))
+    discard = MagicMock()
+    queued = queue.submit(IngestionJob("test_collection", "queued.pdf", "test_document", on_finished=discard))
+
+    queue.shutdown(wait=False)
+    release.set()
+    assert running.wait(timeout=5)
+    assert running.status == IngestionJob.COMPLETED
+    assert queued.status == IngestionJob.CANCELLED
+    discard.assert_called_once()
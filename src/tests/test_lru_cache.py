@@ -0,0 +1,34 @@
+import pathlib
+import sys
+
+current_dir = pathlib.Path(__file__).parent
+previous_dir = current_dir.parent.parent
+sys.path.append(str(previous_dir))
+
+import time
+from config.lru_cache import LRUCache
+
+def test_evicts_least_recently_used():
+    cache = LRUCache(max_size=2)
+    cache.put("first", 1)
+    cache.put("second", 2)
+    assert cache.get("first") == 1
+    cache.put("third", 3)
+
+    assert cache.get("second") is None
+    assert cache.get("first") == 1
+    assert cache.get("third") == 3
+    assert len(cache) == 2
+
+def test_expired_entries_are_misses():
+    cache = LRUCache(max_size=2, ttl_seconds=0.01)
+    cache.put("query", [0.1, 0.2])
+    time.sleep(0.02)
+    assert cache.get("query") is None
+
+def test_stats():
+    cache = LRUCache(max_size=2)
+    cache.put("query", 1)
+    cache.get("query")
+    cache.get("other")
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 1, "hit_rate": 0.5}
@@ -0,0 +1,103 @@
+import pathlib
+import sys
+
+current_dir = pathlib.Path(__file__).parent
+previous_dir = current_dir.parent.parent
+sys.path.append(str(previous_dir))
+
+import time
+import threading
+import httpx
+import groq
+from types import SimpleNamespace
+
+from gen_ai.RAGLLM.map_reduce import ConcurrencyLimitedCompletions, MapReduceSummarizer
+
+
+class FakeGroq:
+    """
+    A local stand-in for the Groq client. Every completion takes `latency` seconds and
+    echoes the first words of its input; the first `rate_limited` calls get a 429.
+    """
+    def __init__(self, latency=0.0, rate_limited=0):
+        self.latency = latency
+        self.rate_limited = rate_limited
+        self.requests = []
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.__lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, messages, model, max_tokens, temperature):
+        with self.__lock:
+            self.requests.append(messages)
+            if self.rate_limited:
+                self.rate_limited -= 1
+                request = httpx.Request("POST", "https://api.groq.com/openai/v1/chat/completions")
+                response = httpx.Response(429, headers={"retry-after": "0.01"}, request=request)
+                raise groq.RateLimitError("Rate limit reached", response=response, body=None)
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        time.sleep(self.latency)
+        with self.__lock:
+            self.in_flight -= 1
+        summary = " ".join(messages[-1]["content"].split()[:3])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=f"summary of {summary}"))])
+
+
+def word_count(text):
+    return len(text.split())
+
+
+def chunk(title, page, text):
+    return {"page_content": text, "metadata": {"_id": f"{title}-{page}-{text}", "title": title, "page": page, "file_path": title}}
+
+
+def make_summarizer(client, max_concurrency=2, **kwargs):
+    completions = ConcurrencyLimitedCompletions(client, max_concurrency=max_concurrency, max_attempts=3, max_backoff_seconds=1)
+    options = dict(model="fake", group_max_tokens=8, map_max_tokens=64, reduce_max_context_tokens=1000,
+                   cache_size=64, cache_ttl_seconds=60, count_tokens=word_count)
+    options.update(kwargs)
+    return MapReduceSummarizer(lambda: completions, **options), completions
+
+
+def test_groups_by_document_and_page():
+    summarizer, _ = make_summarizer(FakeGroq())
+    docs = [chunk("B", 3, "b three"), chunk("A", 2, "a two two"), chunk("B", 1, "b one"), chunk("A", 0, "a zero zero")]
+    groups = summarizer.group(docs)
+    assert [[doc["metadata"]["_id"] for doc in group] for group in groups] == [
+        ["B-1-b one", "B-3-b three"],
+        ["A-0-a zero zero", "A-2-a two two"],
+    ]
+    assert summarizer.label(groups[0]) == "B, pages 2-4"
+
+
+def test_map_stage_runs_groups_concurrently_within_the_limit():
+    client = FakeGroq(latency=0.05)
+    summarizer, completions = make_summarizer(client, max_concurrency=2)
+    docs = [chunk(f"doc {i}", 0, f"text of document {i}") for i in range(6)]
+    context = summarizer.summarize(docs, max_workers=6)
+    assert len(client.requests) == 6
+    assert completions.stats() == {"calls": 6, "retries": 0}
+    # Groups overlap, but never beyond the concurrency limit
+    assert client.peak_in_flight == 2
+    assert "[doc 0, page 1]\nsummary of text of document" in context
+
+
+def test_group_summaries_are_cached_and_rate_limits_retried():
+    client = FakeGroq(rate_limited=1)
+    summarizer, completions = make_summarizer(client)
+    docs = [chunk("A", 0, "active inference"), chunk("B", 0, "free energy")]
+    first = summarizer.summarize(docs)
+    assert completions.stats() == {"calls": 2, "retries": 1}
+    assert summarizer.summarize(docs) == first
+    assert completions.stats()["calls"] == 2
+
+
+def test_partial_summaries_collapse_to_fit_the_reduce_context():
+    client = FakeGroq()
+    summarizer, _ = make_summarizer(client, group_max_tokens=20, reduce_max_context_tokens=20)
+    docs = [chunk(f"doc {i}", 0, f"text of document {i}") for i in range(6)]
+    context = summarizer.summarize(docs)
+    assert word_count(context) <= 20
+    assert len(client.requests) > 6
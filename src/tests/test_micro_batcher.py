@@ -0,0 +1,67 @@
+import pathlib
+import sys
+
+current_dir = pathlib.Path(__file__).parent
+previous_dir = current_dir.parent.parent
+sys.path.append(str(previous_dir))
+
+import time
+import pytest
+import threading
+from concurrent import futures
+from config.micro_batcher import MicroBatcher
+
+def test_concurrent_calls_are_batched_in_order():
+    batch_sizes = []
+
+    def process_batch(items):
+        batch_sizes.append(len(items))
+        time.sleep(0.02)
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(process_batch, max_batch_size=8, max_wait_ms=5)
+    with futures.ThreadPoolExecutor(max_workers=16) as executor:
+        results = list(executor.map(lambda item: batcher.submit(item).result(timeout=5), range(32)))
+
+    assert results == [item * 2 for item in range(32)]
+    assert max(batch_sizes) <= 8
+    assert len(batch_sizes) < 32
+    stats = batcher.stats()
+    assert stats["items"] == 32
+    assert stats["batches"] == len(batch_sizes)
+    assert stats["mean_batch_size"] > 1
+    assert stats["queue_depth"] == 0
+
+def test_lone_call_is_not_held_back():
+    batcher = MicroBatcher(lambda items: items, max_batch_size=32, max_wait_ms=2)
+    started = time.perf_counter()
+    assert batcher.submit("query").result(timeout=5) == "query"
+    assert time.perf_counter() - started < 1
+
+def test_errors_reach_every_caller_in_the_batch():
+    release = threading.Event()
+
+    def process_batch(items):
+        release.wait(5)
+        raise RuntimeError("encoder failed")
+
+    batcher = MicroBatcher(process_batch, max_batch_size=4, max_wait_ms=50)
+    pending = [batcher.submit(item) for item in range(3)]
+    release.set()
+    for future in pending:
+        with pytest.raises(RuntimeError):
+            future.result(timeout=5)
+
+def test_short_batch_results_fail_every_caller():
+    release = threading.Event()
+
+    def process_batch(items):
+        release.wait(5)
+        return items[:-1]
+
+    batcher = MicroBatcher(process_batch, max_batch_size=4, max_wait_ms=50)
+    pending = [batcher.submit(item) for item in range(3)]
+    release.set()
+    for future in pending:
+        with pytest.raises(RuntimeError, match="2 results for a batch of 3"):
+            future.result(timeout=5)
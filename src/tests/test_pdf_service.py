@@ -11,7 +11,10 @@ previous_dir = current_dir.parent
 sys.path.append(str(previous_dir))
 
 from pdf.services.pdf_service import PDFService
+from gen_ai.RAGLLM.context_builder import ContextBuilder
+from gen_ai.RAGLLM.map_reduce import MapReduceSummarizer
 from pathlib import Path
+import numpy as np
 
 @pytest.fixture
 def pdf_service():
@@ -63,3 +66,332 @@ def test_generate_id(pdf_service):
     _id = pdf_service.generate_id(content)
     assert isinstance(_id, str)
     assert len(_id) == 36  # UUID length
+
+def test_preprocessor_pipe_matches_full_pipeline():
+    import spacy
+    from pdf.services.text_preprocessor import TextPreprocessor
+
+    texts = [
+        "Active Inference agents minimize variational free energy by updating their beliefs.",
+        "The results, shown in Table 2, were obtained on 12 January 2024."
+    ]
+    preprocessor = TextPreprocessor(batch_size=2)
+    full_nlp = spacy.load("en_core_web_sm")
+
+    expected = [preprocessor.normalize(full_nlp(text)) for text in texts]
+    assert list(preprocessor.pipe(texts)) == expected
+    assert "parser" not in preprocessor.nlp.pipe_names
+    assert "ner" not in preprocessor.nlp.pipe_names
+
+def test_page_extractor_matches_pymupdf_loader():
+    from langchain_community.document_loaders import PyMuPDFLoader
+    from pdf.services.page_extractor import PageExtractor
+
+    filepath = str(Path(__file__).parent.parent / "pdf" / "uploads" / "test.pdf")
+    extractor = PageExtractor(max_workers=2, pages_per_shard=2, min_parallel_pages=0)
+    try:
+        pages = list(extractor.extract(filepath))
+    finally:
+        extractor.shutdown()
+    expected = PyMuPDFLoader(filepath).load()
+
+    assert [page.metadata["page"] for page in pages] == list(range(len(expected)))
+    assert [page.page_content for page in pages] == [doc.page_content for doc in expected]
+    assert [page.metadata for page in pages] == [doc.metadata for doc in expected]
+
+def test_iter_clean_text_streams_documents(pdf_service):
+    filepath = str(Path(__file__).parent.parent / "pdf" / "uploads" / "test.pdf")
+    documents = pdf_service.iter_clean_text("test_document", "test_collection", filepath)
+    first = next(documents)
+    assert first.metadata["document_type"] == "test_document"
+    assert first.metadata["_collection_name"] == "test_collection"
+    assert first.metadata["_id"] == pdf_service.generate_id(first.page_content)
+
+def test_chunks_keep_their_own_page_and_map_reduce_groups_by_page(pdf_service):
+    filepath = str(Path(__file__).parent.parent / "pdf" / "uploads" / "test.pdf")
+    documents = pdf_service.clean_text("test_document", "test_collection", filepath)
+    pages = [doc.metadata["page"] for doc in documents]
+    assert pages == sorted(pages) and len(set(pages)) > 1
+    assert {doc.metadata["file_path"] for doc in documents} == {filepath}
+
+    summarizer = MapReduceSummarizer(lambda: None, group_max_tokens=256, count_tokens=lambda text: len(text.split()))
+    docs = [{"page_content": doc.page_content, "metadata": doc.metadata} for doc in reversed(documents)]
+    groups = summarizer.group(docs)
+    spans = [(group[0]["metadata"]["page"], group[-1]["metadata"]["page"]) for group in groups]
+    assert len(groups) > 1
+    assert spans == sorted(spans) and spans[0][1] <= spans[-1][0]
+    labels = {summarizer.label(group) for group in groups}
+    assert len(labels) == len(groups) and not all(label.endswith("page 1") for label in labels)
+
+def test_context_cites_the_page_of_each_cleaned_chunk(pdf_service):
+    filepath = str(Path(__file__).parent.parent / "pdf" / "uploads" / "test.pdf")
+    documents = pdf_service.clean_text("test_document", "test_collection", filepath)
+    builder = ContextBuilder(max_tokens=100000, fields=["title", "page"], similarity_threshold=1.1, count_tokens=lambda text: len(text.split()))
+    context = builder.build([{"page_content": doc.page_content, "metadata": doc.metadata} for doc in documents])
+    headers = [chunk.split("\n")[0] for chunk in context.split("\n\n")]
+    cited_pages = {header.rsplit("page: ", 1)[1] for header in headers}
+    assert len(headers) == len(documents)
+    assert cited_pages == {str(doc.metadata["page"] + 1) for doc in documents} and len(cited_pages) > 1
+
+def test_with_next():
+    assert list(PDFService.with_next([1, 2, 3])) == [(1, 2), (2, 3), (3, None)]
+    assert list(PDFService.with_next([])) == []
+
+def test_concurrent_ingestions_do_not_share_state(pdf_service):
+    from concurrent.futures import ThreadPoolExecutor
+
+    filepath = str(Path(__file__).parent.parent / "pdf" / "uploads" / "test.pdf")
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        first, second = pool.map(
+            lambda document_type: pdf_service.clean_text(document_type, "test_collection", filepath),
+            ["first_type", "second_type"]
+        )
+
+    assert len(first) == len(second)
+    assert {doc.metadata["document_type"] for doc in first} == {"first_type"}
+    assert {doc.metadata["document_type"] for doc in second} == {"second_type"}
+    assert len(pdf_service.clean_text("first_type", "test_collection", filepath)) == len(first)
+
+def test_search_results_cached_until_collection_changes(pdf_service):
+    from unittest.mock import patch
+    from langchain.docstore.document import Document
+    from schemas.search_schemas import MatchAnyOrInterval
+
+    filters = {"document_type": MatchAnyOrInterval(any=["test_document"])}
+    hit = Document(page_content="cached chunk", metadata={"_id": "1"})
+    with patch("config.qdrant_client.QdrantVectorDB.search", return_value=[hit]) as mock_search, \
+            patch("config.qdrant_client.QdrantVectorDB.collection_generation", return_value=1) as mock_generation:
+        first = pdf_service.search("what is  active inference", filters)
+        second = pdf_service.search("what is active inference", filters)
+        assert first == second
+        assert mock_search.call_count == 1
+
+        mock_generation.return_value = 2
+        pdf_service.search("what is active inference", filters)
+        assert mock_search.call_count == 2
+
+def test_failed_generation_bump_drops_cached_searches(pdf_service):
+    from unittest.mock import patch, MagicMock
+    import redis
+    from langchain.docstore.document import Document
+    from config.collection_generations import CollectionGenerations
+    from schemas.search_schemas import MatchAnyOrInterval
+
+    redis_client = MagicMock()
+    redis_client.incr.side_effect = redis.ConnectionError("down")
+    with pytest.raises(redis.ConnectionError):
+        CollectionGenerations(redis_client).bump("test_collection")
+
+    filters = {"document_type": MatchAnyOrInterval(any=["test_document"])}
+    hit = Document(page_content="cached chunk", metadata={"_id": "1"})
+    with patch("config.qdrant_client.QdrantVectorDB.search", return_value=[hit]) as mock_search, \
+            patch("config.qdrant_client.QdrantVectorDB.collection_generation", return_value=1), \
+            patch("config.qdrant_client.QdrantVectorDB.run", side_effect=redis.ConnectionError("down")):
+        pdf_service.search("what is active inference", filters)
+        with pytest.raises(redis.ConnectionError):
+            pdf_service.embed_document("test_collection", "test.pdf", "test_document")
+        pdf_service.search("what is active inference", filters)
+        assert mock_search.call_count == 2
+
+def test_search_batch_uses_one_encode_and_one_qdrant_call(pdf_service):
+    from unittest.mock import patch, MagicMock
+    from schemas.search_schemas import MatchAnyOrInterval
+    from config.qdrant_client import get_vector_db
+    vector_db = get_vector_db()
+
+    def hit(text):
+        return MagicMock(payload={"page_content": text, "metadata": {"_id": text}})
+
+    filters = {"document_type": MatchAnyOrInterval(any=["test_document"])}
+    qdrant = MagicMock()
+    qdrant.search_batch.return_value = [[hit("first")], [hit("second")]]
+    with patch.object(vector_db, "_QdrantVectorDB__client", qdrant), \
+            patch.object(vector_db, "collection_generation", return_value=None), \
+            patch.object(vector_db._QdrantVectorDB__sentence_model, "encode",
+                         wraps=vector_db._QdrantVectorDB__sentence_model.encode) as mock_encode:
+        results = pdf_service.search_batch([("batch query one", filters, 3), ("batch query two", filters, 0)])
+
+    assert mock_encode.call_count == 1
+    assert qdrant.search_batch.call_count == 1
+    requests = qdrant.search_batch.call_args.kwargs["requests"]
+    assert [request.limit for request in requests] == [3, vector_db.limit]
+    assert [result["data"][0] for result in results] == [
+        '{"id": null, "metadata": {"_id": "first"}, "page_content": "first", "type": "Document"}',
+        '{"id": null, "metadata": {"_id": "second"}, "page_content": "second", "type": "Document"}',
+    ]
+
+def test_search_params_per_mode():
+    from config.search_params import build_search_params
+
+    exact = build_search_params("exact", 128, 2.0, True)
+    assert exact.exact and exact.quantization.ignore
+    hnsw = build_search_params("hnsw", 64, 2.0, True)
+    assert not hnsw.exact and hnsw.hnsw_ef == 64 and hnsw.quantization.ignore
+    quantized = build_search_params("quantized", 256, 3.0, True)
+    assert quantized.hnsw_ef == 256
+    assert quantized.quantization.rescore and quantized.quantization.oversampling == 3.0
+    with pytest.raises(ValueError):
+        build_search_params("approximate", 128, 2.0, True)
+
+def test_sparse_encoder_bm25_weights():
+    from config.sparse_encoder import SparseEncoder
+
+    encoder = SparseEncoder(k1=1.2, b=0.75, avg_doc_length=10)
+    document = encoder.encode_document("Friston active inference active")
+    weights = dict(zip(document.indices, document.values))
+    active, friston = encoder.term_index("active"), encoder.term_index("friston")
+    assert weights[active] > weights[friston]
+    assert weights[active] < 2 * weights[friston]
+    query = encoder.encode_query("FRISTON friston")
+    assert query.indices == [friston] and query.values == [1.0]
+
+def test_reciprocal_rank_fusion():
+    from types import SimpleNamespace
+    from config.search_params import reciprocal_rank_fusion
+
+    dense = [SimpleNamespace(id=point_id) for point_id in ["a", "b", "c"]]
+    sparse = [SimpleNamespace(id=point_id) for point_id in ["c", "b", "d"]]
+    fused = reciprocal_rank_fusion([dense, sparse], k=60, limit=3)
+    assert [hit.id for hit in fused] == ["c", "b", "a"]
+
+def test_hybrid_search_fuses_dense_and_sparse_hits(pdf_service):
+    from unittest.mock import patch, MagicMock
+    from config.qdrant_client import get_vector_db
+    vector_db = get_vector_db()
+
+    def hit(point_id):
+        return MagicMock(id=point_id, payload={"page_content": point_id, "metadata": {"_id": point_id}})
+
+    qdrant = MagicMock()
+    qdrant.search_batch.return_value = [[hit("dense-only"), hit("both")], [hit("issn 1234"), hit("both")]]
+    with patch.object(vector_db, "_QdrantVectorDB__client", qdrant), \
+            patch.object(vector_db, "collection_generation", return_value=None):
+        result = pdf_service.search("papers with ISSN 1234", search_mode="hybrid")
+
+    dense_request, sparse_request = qdrant.search_batch.call_args.kwargs["requests"]
+    assert sparse_request.vector.name == "bm25"
+    assert dense_request.limit == sparse_request.limit >= vector_db.limit
+    assert '"page_content": "both"' in result["data"][0]
+    assert len(result["data"]) == 3
+
+def test_async_hybrid_search_normalizes_the_query_off_the_event_loop(pdf_service):
+    import asyncio
+    import threading
+    from unittest.mock import patch, AsyncMock
+
+    threads = []
+    lexical_query = pdf_service.lexical_query
+
+    def record_thread(query, search_mode):
+        threads.append(threading.get_ident())
+        return lexical_query(query, search_mode)
+
+    async def search():
+        with patch.object(pdf_service, "lexical_query", side_effect=record_thread), \
+                patch("config.qdrant_client.QdrantVectorDB.asearch", new_callable=AsyncMock, return_value=[]) as mock_asearch, \
+                patch("config.qdrant_client.QdrantVectorDB.acollection_generation", new_callable=AsyncMock, return_value=None):
+            await pdf_service.asearch("papers with ISSN 1234", search_mode="hybrid")
+        return threading.get_ident(), mock_asearch.call_args.args[4]
+
+    loop_thread, sent_lexical_query = asyncio.run(search())
+    assert len(threads) == 1 and threads[0] != loop_thread
+    assert sent_lexical_query == lexical_query("papers with ISSN 1234", "hybrid")
+
+def test_search_reranks_over_fetched_candidates(pdf_service):
+    from unittest.mock import patch, MagicMock
+    from langchain.docstore.document import Document
+
+    hits = [Document(page_content=f"chunk {i}", metadata={"_id": str(i)}) for i in range(30)]
+    reranker = MagicMock()
+    reranker.rerank.return_value = (hits[::-1][:5], True)
+    with patch.object(pdf_service, "_PDFService__get_reranker", lambda: reranker), \
+            patch("config.qdrant_client.QdrantVectorDB.search", return_value=hits) as mock_search, \
+            patch("config.qdrant_client.QdrantVectorDB.collection_generation", return_value=None):
+        result = pdf_service.search("what is active inference")
+
+    assert mock_search.call_args[0][-1] == 30
+    assert reranker.rerank.call_args[0][2] == 5
+    assert len(result["data"]) == 5
+    assert '"_id": "29"' in result["data"][0]
+
+def test_token_budget_batches_group_by_length():
+    from config.qdrant_client import _token_budget_batches
+
+    lengths = [10, 500, 12, 480, 11, 700]
+    batches = list(_token_budget_batches(lengths, token_budget=1024, max_batch_size=3))
+    assert batches == [[5], [1, 3], [2, 4, 0]]
+    assert sorted(i for batch in batches for i in batch) == list(range(len(lengths)))
+
+def test_encode_restores_order_and_merges_cached_vectors():
+    from unittest.mock import patch
+    from config.qdrant_client import get_vector_db
+    vector_db = get_vector_db()
+
+    model = vector_db._QdrantVectorDB__sentence_model
+    texts = ["short", "a much longer chunk of text " * 40, "medium sized chunk " * 5, "short"]
+    expected = np.stack([model.encode(text) for text in texts])
+    with patch.object(vector_db, "_QdrantVectorDB__embedding_cache", None), \
+            patch.object(vector_db, "_QdrantVectorDB__encode_token_budget", 64):
+        embeddings = vector_db.encode(texts)
+    assert embeddings.dtype == np.float32
+    np.testing.assert_allclose(embeddings, expected, rtol=1e-6)
+
+def test_run_encodes_windows_larger_than_the_upsert_batch():
+    from unittest.mock import patch, MagicMock
+    from langchain.docstore.document import Document
+    from config.qdrant_client import get_vector_db
+    vector_db = get_vector_db()
+
+    docs = [Document(page_content=f"chunk number {i}", metadata={"_id": str(i)}) for i in range(40)]
+    qdrant = MagicMock()
+    with patch.object(vector_db, "_QdrantVectorDB__client", qdrant), \
+            patch.object(vector_db, "_QdrantVectorDB__embedding_cache", None), \
+            patch.object(vector_db, "_QdrantVectorDB__generations"), \
+            patch.object(vector_db, "_QdrantVectorDB__batch_size", 16), \
+            patch.object(vector_db, "_QdrantVectorDB__encode_max_batch_size", 32), \
+            patch.object(vector_db._QdrantVectorDB__sentence_model, "encode",
+                         wraps=vector_db._QdrantVectorDB__sentence_model.encode) as mock_encode:
+        vector_db.run(iter(docs))
+
+    assert [len(call.args[0]) for call in mock_encode.call_args_list] == [32, 8]
+    assert [len(call.kwargs["points"].ids) for call in qdrant.upsert.call_args_list] == [16, 16, 8]
+
+def test_summarize_serves_paraphrase_from_answer_cache(pdf_service):
+    import json
+    from unittest.mock import patch, MagicMock
+    from config.answer_cache import InMemoryAnswerStore, SemanticAnswerCache
+    from config.qdrant_client import get_vector_db
+
+    vector_db = get_vector_db()
+    cache = SemanticAnswerCache(InMemoryAnswerStore(max_keys=8, max_entries_per_key=4, ttl_seconds=60), 0.95)
+    result = {"data": [json.dumps({"page_content": "agents minimise free energy", "metadata": {"_id": "1"}})]}
+    vectors = {"what is active inference": np.array([1.0, 0.0]), "explain active inference": np.array([0.99, 0.05])}
+    redis_client = MagicMock()
+    redis_client.pipeline.return_value.execute.return_value = [[], None]
+    groq = MagicMock()
+    groq.chat.completions.create.return_value.choices[0].message.content = "It minimises free energy."
+    with patch.object(pdf_service, "_PDFService__get_answer_cache", lambda: cache), \
+            patch.object(pdf_service, "search_with_generation", return_value=(1, result)) as mock_search, \
+            patch.object(vector_db, "encode_query", side_effect=lambda query: vectors[query]) as mock_encode, \
+            patch("pdf.services.pdf_service.get_redis_client", return_value=redis_client), \
+            patch("pdf.services.pdf_service.get_groq_client", return_value=groq):
+        first = pdf_service.summarize("what is active inference")
+        second = pdf_service.summarize("explain active inference")
+        assert first == second == "It minimises free energy."
+        assert groq.chat.completions.create.call_count == 1
+        # The history and the answer are written in one transaction per request
+        assert redis_client.pipeline.call_args_list[-1].kwargs == {"transaction": True}
+
+        mock_search.return_value = (2, result)
+        pdf_service.summarize("explain active inference")
+        assert groq.chat.completions.create.call_count == 2
+
+        # Follow-up turns do not encode the query for the cache
+        redis_client.pipeline.return_value.execute.return_value = [
+            [json.dumps({"role": "user", "content": "earlier question"}), json.dumps({"role": "assistant", "content": "earlier answer"})],
+            None
+        ]
+        encodes = mock_encode.call_count
+        pdf_service.summarize("explain active inference")
+        assert groq.chat.completions.create.call_count == 3
+        assert mock_encode.call_count == encodes
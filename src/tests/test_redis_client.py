@@ -0,0 +1,65 @@
+import pathlib
+import sys
+
+current_dir = pathlib.Path(__file__).parent
+previous_dir = current_dir.parent.parent
+sys.path.append(str(previous_dir))
+
+import pytest
+import redis
+from unittest.mock import MagicMock
+
+from config.redis_client import PipelineStep, RedisLatency, run_pipeline
+
+
+def test_run_pipeline_sends_one_round_trip_and_splits_results():
+    redis_client = MagicMock()
+    pipe = redis_client.pipeline.return_value
+    pipe.execute.return_value = ["a", "b", "c"]
+    received = []
+    steps = [
+        PipelineStep(lambda pipe: pipe.get("x"), received.append, 1),
+        PipelineStep(lambda pipe: None, received.append, 0),
+        PipelineStep(lambda pipe: (pipe.get("y"), pipe.get("z")), received.append, 2),
+    ]
+
+    run_pipeline(redis_client, steps, transaction=True)
+
+    redis_client.pipeline.assert_called_once_with(transaction=True)
+    assert pipe.execute.call_count == 1
+    assert received == [["a"], [], ["b", "c"]]
+
+
+def test_run_pipeline_skips_empty_round_trips():
+    redis_client = MagicMock()
+    received = []
+    run_pipeline(redis_client, [PipelineStep(lambda pipe: None, received.append, 0)])
+    redis_client.pipeline.return_value.execute.assert_not_called()
+    assert received == [[]]
+
+
+def test_only_required_step_errors_raise():
+    redis_client = MagicMock()
+    redis_client.pipeline.return_value.execute.return_value = [redis.ResponseError("WRONGTYPE"), "b"]
+    received = []
+    optional = PipelineStep(lambda pipe: pipe.get("x"), received.append, 1, True)
+    required = PipelineStep(lambda pipe: pipe.get("y"), received.append, 1)
+
+    run_pipeline(redis_client, [optional, required])
+    assert received == [["b"]]
+
+    redis_client.pipeline.return_value.execute.return_value = ["a", redis.ResponseError("WRONGTYPE")]
+    with pytest.raises(redis.ResponseError):
+        run_pipeline(redis_client, [optional, required])
+
+
+def test_latency_percentiles_per_command():
+    latency = RedisLatency(window=100)
+    for ms in range(1, 101):
+        latency.record("GET", ms / 1000)
+    latency.record("PIPELINE", 0.002)
+
+    stats = latency.stats()
+    assert stats["GET"]["calls"] == 100
+    assert stats["GET"]["p50_ms"] == 51 and stats["GET"]["p99_ms"] == 100 and stats["GET"]["max_ms"] == 100
+    assert stats["PIPELINE"]["calls"] == 1
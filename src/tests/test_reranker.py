@@ -0,0 +1,53 @@
+import pathlib
+import sys
+
+current_dir = pathlib.Path(__file__).parent
+previous_dir = current_dir.parent.parent
+sys.path.append(str(previous_dir))
+
+import numpy as np
+from unittest.mock import patch, MagicMock
+from langchain.docstore.document import Document
+
+from config.reranker import CrossEncoderReranker
+
+
+def make_reranker():
+    model = MagicMock()
+    # Score a pair by the number of query words found in the chunk
+    model.predict.side_effect = lambda pairs, batch_size: np.array(
+        [len(set(query.split()) & set(text.split())) for query, text in pairs], dtype=np.float32)
+    with patch("config.reranker.CrossEncoder", return_value=model):
+        return CrossEncoderReranker(model_name="test-model", batch_size=8, cache_size=100, cache_ttl_seconds=None), model
+
+
+def make_docs():
+    texts = ["unrelated chunk", "free energy chunk", "active inference free energy"]
+    return [Document(page_content=text, metadata={"_id": str(i)}) for i, text in enumerate(texts)]
+
+
+def test_rerank_orders_by_score_and_keeps_top_k():
+    reranker, model = make_reranker()
+    docs, reranked = reranker.rerank("active inference free energy", make_docs(), top_k=2)
+    assert reranked
+    assert [doc.metadata["_id"] for doc in docs] == ["2", "1"]
+    assert model.predict.call_count == 1
+    assert len(model.predict.call_args[0][0]) == 3
+
+
+def test_rerank_scores_are_cached_by_id():
+    reranker, model = make_reranker()
+    reranker.rerank("active inference", make_docs(), top_k=2)
+    docs, _ = reranker.rerank("active  inference", make_docs(), top_k=2)
+    assert model.predict.call_count == 1
+    assert docs[0].metadata["_id"] == "2"
+    assert reranker.cache_stats()["hits"] == 3
+
+
+def test_rerank_skipped_when_budget_is_tight():
+    reranker, model = make_reranker()
+    reranker.rerank("active inference", make_docs(), top_k=2)
+    docs, reranked = reranker.rerank("free energy", make_docs(), top_k=2, budget_seconds=0.0)
+    assert not reranked
+    assert [doc.metadata["_id"] for doc in docs] == ["0", "1"]
+    assert model.predict.call_count == 1
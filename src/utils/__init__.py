@@ -1,4 +1,12 @@
-from schemas.search_schemas import MatchAnyOrInterval
+from schemas.search_schemas import (
+    MatchAnyOrInterval,
+    NumericInterval,
+    DatetimeInterval,
+    FieldFilter,
+    FilterGroup
+)
+from config.search_params import SEARCH_MODES
+from gen_ai.RAGLLM.map_reduce import SUMMARIZE_MODES
 import grpc
 
 from config.logger import Logger
@@ -15,6 +23,72 @@ def _parse_filters(filters_str):
         logger.warning("Invalid filter format")
         return None
     
+def _field_filter_from_proto(field):
+    return FieldFilter(
+        key=field.key,
+        any=tuple(field.any) or None,
+        all=tuple(field.all) or None,
+        none=tuple(field.none) or None,
+        range=NumericInterval(**{
+            bound: getattr(field.range, bound)
+            for bound in ("gt", "gte", "lt", "lte") if field.range.HasField(bound)
+        }) if field.HasField("range") else None,
+        datetime_range=DatetimeInterval(**{
+            bound: getattr(field.datetime_range, bound) or None
+            for bound in ("gt", "gte", "lt", "lte")
+        }) if field.HasField("datetime_range") else None
+    )
+
+def _filter_group_from_proto(group):
+    def clauses(items):
+        converted = []
+        for item in items:
+            kind = item.WhichOneof("clause")
+            if kind is None:
+                raise ValueError("A filter clause needs a field or a group")
+            converted.append(_field_filter_from_proto(item.field) if kind == "field" else _filter_group_from_proto(item.group))
+        return tuple(converted)
+    return FilterGroup(must=clauses(group.must), should=clauses(group.should), must_not=clauses(group.must_not))
+
+def _parse_request_filters(request, context):
+    """
+    Filters of a Search, SearchQuery or Summarize request: the typed `filter` when it
+    is set, otherwise the legacy `filters` string. Returns None after setting
+    INVALID_ARGUMENT when they are malformed.
+    """
+    if request.HasField("filter"):
+        if request.filters:
+            context.set_details("Set either filter or filters, not both")
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            return None
+        try:
+            return _filter_group_from_proto(request.filter)
+        except ValueError as ex:
+            logger.warning(f"Invalid filter: {str(ex)}")
+            context.set_details(f"Invalid filter: {str(ex)}")
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            return None
+    filters = _parse_filters(request.filters)
+    if filters is None:
+        context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+    return filters
+
+def _check_search_mode(search_mode, context):
+    if search_mode and search_mode not in SEARCH_MODES:
+        logger.warning(f"Invalid search mode '{search_mode}'")
+        context.set_details(f"Unknown search mode '{search_mode}', expected one of {', '.join(SEARCH_MODES)}")
+        context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+        return False
+    return True
+
+def _check_summarize_mode(summarize_mode, context):
+    if summarize_mode and summarize_mode not in SUMMARIZE_MODES:
+        logger.warning(f"Invalid summarize mode '{summarize_mode}'")
+        context.set_details(f"Unknown summarize mode '{summarize_mode}', expected one of {', '.join(SUMMARIZE_MODES)}")
+        context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+        return False
+    return True
+
 def _handle_exception(api_name, context, ex):
     logger.error(f"Error in {api_name}: {str(ex)}")
     context.set_details(str(ex))